@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Rate limiter microbenchmark
+
+Compares the GCRA limiter used by SecurityManager against the previous
+implementation, which kept per-user lists of request datetimes and rebuilt
+them on every check.
+
+Usage:
+    python benchmarks/rate_limit_benchmark.py --calls 200000 --users 1 1000 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from brain.rate_limiter import GCRARateLimiter  # noqa: E402
+
+# Generous limits so the benchmark measures bookkeeping, not rejections
+MAX_PER_MINUTE = 10 ** 6
+MAX_PER_HOUR = 1000
+
+
+class LegacyRateLimiter:
+    """The timestamp-list limiter SecurityManager used before GCRA"""
+
+    def __init__(self, max_per_minute: int, max_per_hour: int):
+        self.max_per_minute = max_per_minute
+        self.max_per_hour = max_per_hour
+        self.rate_limits = {}
+
+    def allow(self, user_id: str) -> bool:
+        now = datetime.now()
+        if user_id not in self.rate_limits:
+            self.rate_limits[user_id] = {"requests_this_minute": [], "requests_this_hour": []}
+        user_limits = self.rate_limits[user_id]
+
+        minute_ago = now - timedelta(minutes=1)
+        hour_ago = now - timedelta(hours=1)
+        user_limits["requests_this_minute"] = [t for t in user_limits["requests_this_minute"] if t > minute_ago]
+        user_limits["requests_this_hour"] = [t for t in user_limits["requests_this_hour"] if t > hour_ago]
+
+        if len(user_limits["requests_this_minute"]) >= self.max_per_minute:
+            return False
+        if len(user_limits["requests_this_hour"]) >= self.max_per_hour:
+            return False
+
+        user_limits["requests_this_minute"].append(now)
+        user_limits["requests_this_hour"].append(now)
+        return True
+
+
+def run(limiter, users: int, calls: int) -> float:
+    """Return nanoseconds per check"""
+    keys = [f"user-{i}" for i in range(users)]
+    start = time.perf_counter()
+    for i in range(calls):
+        limiter.allow(keys[i % users])
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 1000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'users':>8} {'legacy ns/check':>16} {'gcra ns/check':>14} {'legacy keys':>12} {'gcra keys':>10}")
+    for users in args.users:
+        legacy = LegacyRateLimiter(MAX_PER_MINUTE, MAX_PER_HOUR)
+        gcra = GCRARateLimiter([(MAX_PER_MINUTE, 60.0), (MAX_PER_HOUR, 3600.0)])
+        legacy_ns = run(legacy, users, args.calls)
+        gcra_ns = run(gcra, users, args.calls)
+        print(f"{users:>8} {legacy_ns:>16.0f} {gcra_ns:>14.0f} {len(legacy.rate_limits):>12} {len(gcra):>10}")
+
+
+if __name__ == "__main__":
+    main()
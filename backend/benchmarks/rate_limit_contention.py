@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Shared rate limiter contention benchmark
+
+Runs several processes hammering one SQLite-backed rate limiter and reports
+per-check latency and aggregate throughput against the in-process limiter.
+It also checks correctness: when every process hits the same key, the total
+number of admitted requests must equal the configured limit, however many
+processes there are.
+
+Usage:
+    python benchmarks/rate_limit_contention.py --processes 1 2 4 8 --checks 20000
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from brain.rate_limiter import GCRARateLimiter, SQLiteRateLimiter  # noqa: E402
+
+GENEROUS_LIMITS = [(10 ** 9, 60.0)]
+
+
+def worker(path: str, limits, keys: int, checks: int, start_event, results):
+    limiter = SQLiteRateLimiter(path, limits)
+    key_names = [f"user-{i}" for i in range(keys)]
+    allowed = 0
+    start_event.wait()
+    start = time.perf_counter()
+    for i in range(checks):
+        allowed += limiter.allow(key_names[i % keys])
+    results.put((time.perf_counter() - start, allowed, limiter.stats["errors"]))
+    limiter.close()
+
+
+def run_shared(processes: int, keys: int, checks: int, limits):
+    """Returns (per-check latency us, total checks/s, admitted, errors)"""
+    path = os.path.join(tempfile.mkdtemp(), "rate_limits.sqlite3")
+    SQLiteRateLimiter(path, limits).close()  # Create the schema before the race
+
+    start_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=worker, args=(path, limits, keys, checks, start_event, results))
+        for _ in range(processes)
+    ]
+    for proc in procs:
+        proc.start()
+    wall_start = time.perf_counter()
+    start_event.set()
+    outcomes = [results.get() for _ in procs]
+    wall = time.perf_counter() - wall_start
+    for proc in procs:
+        proc.join()
+
+    latency = sum(elapsed for elapsed, _, _ in outcomes) / (processes * checks) * 1e6
+    return latency, processes * checks / wall, sum(a for _, a, _ in outcomes), sum(e for _, _, e in outcomes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--checks", type=int, default=20000, help="Checks per process")
+    parser.add_argument("--keys", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=500, help="Per-key limit for the correctness run")
+    args = parser.parse_args()
+
+    memory = GCRARateLimiter(GENEROUS_LIMITS)
+    keys = [f"user-{i}" for i in range(args.keys)]
+    start = time.perf_counter()
+    for i in range(args.checks):
+        memory.allow(keys[i % args.keys])
+    print(f"in-process limiter: {(time.perf_counter() - start) / args.checks * 1e6:.2f}us per check")
+
+    print(f"\n{'processes':>9} {'us/check':>9} {'checks/s':>10} {'errors':>7}")
+    for processes in args.processes:
+        latency, throughput, _, errors = run_shared(processes, args.keys, args.checks, GENEROUS_LIMITS)
+        print(f"{processes:>9} {latency:>9.1f} {throughput:>10.0f} {errors:>7}")
+
+    print(f"\nCorrectness: one key, limit {args.limit} per minute")
+    for processes in args.processes:
+        _, _, admitted, errors = run_shared(processes, 1, args.limit, [(args.limit, 60.0)])
+        print(f"{processes:>9} processes admitted {admitted} (errors {errors})")
+
+
+if __name__ == "__main__":
+    main()
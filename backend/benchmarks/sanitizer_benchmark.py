@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Worst-case input benchmark for SecurityManager.sanitize_input
+
+Times the previous regex pipeline (run on the full input, truncated at the
+end) against the linear-time sanitizer (truncated first) on inputs built to
+make the regexes rescan: many unclosed script openings, many '<' with no
+closing '>', and a well-formed page for reference.
+
+Usage:
+    python benchmarks/sanitizer_benchmark.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from brain.input_sanitizer import sanitize_text  # noqa: E402
+
+
+def legacy_sanitize(input_text: str) -> str:
+    """The regex implementation SecurityManager used before"""
+    sanitized = re.sub(r'<script[^>]*>.*?</script>', '', input_text, flags=re.IGNORECASE | re.DOTALL)
+    sanitized = re.sub(r'<[^>]+>', '', sanitized)
+    if len(sanitized) > 10000:
+        sanitized = sanitized[:10000]
+    return sanitized.strip()
+
+
+def build_inputs(size: int):
+    return {
+        "unclosed <script>": ("<script>" * (size // 8 + 1))[:size],
+        "unclosed '<'": ("<a " * (size // 3 + 1))[:size],
+        "well-formed html": ("<p>Hello <b>there</b></p><script>x()</script>" * (size // 45 + 1))[:size]
+    }
+
+
+def timed(fn, text: str, budget: float) -> float:
+    """Seconds per call, averaged over at least one call and up to `budget` seconds"""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        fn(text)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= budget or calls >= 1000:
+            return elapsed / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--legacy-max-size", type=int, default=200000,
+                        help="Skip the quadratic legacy implementation above this size")
+    args = parser.parse_args()
+
+    print(f"{'input':>18} {'size':>9} {'legacy ms':>11} {'linear ms':>10}")
+    for size in args.sizes:
+        for name, text in build_inputs(size).items():
+            legacy = timed(legacy_sanitize, text, 0.5) * 1000 if size <= args.legacy_max_size else None
+            linear = timed(sanitize_text, text, 0.5) * 1000
+            legacy_column = f"{legacy:11.2f}" if legacy is not None else f"{'skipped':>11}"
+            print(f"{name:>18} {size:>9} {legacy_column} {linear:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Sharded vs single-process benchmark for the Zoe chat path
+
+Starts the backend once as a single uvicorn process and once behind the shard
+dispatcher with N workers, both using the local stand-in provider, and drives
+each with concurrent multi-turn conversations through /api/zoe/chat.
+
+Usage:
+    python benchmarks/shard_benchmark.py --workers 4 --users 200 --turns 10
+"""
+
+import argparse
+import asyncio
+import os
+import secrets
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from shard_dispatcher import launch_workers, wait_for_workers  # noqa: E402
+
+BENCHMARK_ENV = {
+    "OPENAI_API_KEY": "",
+    "BRAIN_LOCAL_PROVIDER": "true",
+    "ZOE_SNAPSHOT_PATH": ""
+}
+
+MESSAGES = [
+    "I have been feeling anxious about my family lately and I am not sure why.",
+    "Sometimes I feel like nobody understands what I went through growing up.",
+    "Today was a little better, I went for a walk and felt calmer afterwards.",
+    "I keep thinking about a conversation I had with my sister last week."
+]
+
+
+async def run_conversations(base_url: str, users: int, turns: int, concurrency: int):
+    """Drive multi-turn conversations and collect per-request latencies"""
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+        async def conversation(user_index: int):
+            nonlocal errors
+            session_id = None
+            for turn in range(turns):
+                payload = {
+                    "message": MESSAGES[(user_index + turn) % len(MESSAGES)],
+                    "user_id": f"bench-user-{user_index}",
+                    "session_id": session_id,
+                    "user_context": {"ace_score": 1}
+                }
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post("/api/zoe/chat", json=payload)
+                    latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+                session_id = response.json().get("session_id", session_id)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[conversation(i) for i in range(users)])
+        elapsed = time.perf_counter() - start
+
+    return latencies, errors, elapsed
+
+
+def report(label: str, latencies, errors: int, elapsed: float):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{label:>16}: {len(latencies) / elapsed:8.1f} req/s  "
+        f"p50 {p50 * 1000:7.1f}ms  p99 {p99 * 1000:7.1f}ms  "
+        f"mean {statistics.mean(latencies) * 1000:7.1f}ms  errors {errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+
+    os.environ.update(BENCHMARK_ENV)
+
+    # Single process
+    single = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=dict(os.environ)
+    )
+    try:
+        wait_for_workers([f"http://127.0.0.1:{args.port}"])
+        results = asyncio.run(run_conversations(f"http://127.0.0.1:{args.port}", args.users, args.turns, args.concurrency))
+        report("single process", *results)
+    finally:
+        single.terminate()
+        single.wait()
+
+    # Dispatcher plus workers
+    shard_token = secrets.token_hex(16)
+    workers = launch_workers(args.workers, args.port + 1, shard_token)
+    dispatcher = subprocess.Popen(
+        [
+            sys.executable, "-c",
+            "import sys, uvicorn; from shard_dispatcher import ShardDispatcher; "
+            "uvicorn.run(ShardDispatcher(sys.argv[1].split(','), shard_token=sys.argv[2]), "
+            "port=int(sys.argv[3]), log_level='warning')",
+            ",".join(f"http://127.0.0.1:{args.port + 1 + i}" for i in range(args.workers)),
+            shard_token,
+            str(args.port)
+        ],
+        cwd=BACKEND_DIR,
+        env=dict(os.environ)
+    )
+    try:
+        wait_for_workers([f"http://127.0.0.1:{args.port + 1 + i}" for i in range(args.workers)])
+        wait_for_workers([f"http://127.0.0.1:{args.port}"])  # Health checks pass through the dispatcher
+        results = asyncio.run(run_conversations(f"http://127.0.0.1:{args.port}", args.users, args.turns, args.concurrency))
+        report(f"{args.workers} shards", *results)
+    finally:
+        for process in [dispatcher, *workers]:
+            process.terminate()
+        for process in [dispatcher, *workers]:
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
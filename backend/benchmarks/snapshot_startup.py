@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for Zoe session snapshots
+
+Builds a conversation manager with synthetic sessions, writes a snapshot and
+compares lazy (memory-mapped) restore against eagerly decoding every session.
+
+Usage:
+    python benchmarks/snapshot_startup.py --sessions 20000 --messages 30
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zoe.conversation_manager import ZoeConversationManager
+from zoe.session_snapshot import SessionSnapshot, write_snapshot
+
+
+def build_manager(sessions: int, messages: int) -> ZoeConversationManager:
+    """Create a manager populated with synthetic conversations"""
+    manager = ZoeConversationManager()
+    manager.max_memory_bytes = None
+    manager.max_sessions_per_user = sessions
+    text = "I have been thinking a lot about how I felt growing up and what it means now. " * 3
+    for i in range(sessions):
+        session_id = manager.create_session(f"user-{i % 1000}", {"ace_score": i % 4})
+        for j in range(messages):
+            manager.add_message(session_id, "user" if j % 2 == 0 else "assistant", text)
+    return manager
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"Building {args.sessions} sessions with {args.messages} messages each...")
+    manager = build_manager(args.sessions, args.messages)
+    session_ids = list(manager.sessions)
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.snapshot")
+    stats = write_snapshot(path, manager.iter_session_records())
+    print(f"Snapshot: {stats['bytes'] / 1e6:.1f} MB written in {stats['seconds'] * 1000:.0f}ms")
+
+    # Lazy restore: map the file and read the index only
+    start = time.perf_counter()
+    restored_manager = ZoeConversationManager()
+    restored = restored_manager.attach_snapshot(SessionSnapshot.open(path))
+    lazy_seconds = time.perf_counter() - start
+    print(f"Lazy restore: {restored} sessions ready in {lazy_seconds * 1000:.1f}ms")
+
+    start = time.perf_counter()
+    restored_manager.get_session(session_ids[len(session_ids) // 2])
+    print(f"First access to a restored session: {(time.perf_counter() - start) * 1e6:.0f}us")
+
+    # Eager restore: decode every session up front
+    start = time.perf_counter()
+    eager_manager = ZoeConversationManager()
+    eager_manager.max_memory_bytes = None
+    eager_manager.attach_snapshot(SessionSnapshot.open(path))
+    for session_id in session_ids:
+        eager_manager.get_session(session_id)
+    eager_seconds = time.perf_counter() - start
+    print(f"Eager restore: {len(eager_manager.sessions)} sessions decoded in {eager_seconds * 1000:.0f}ms")
+
+    print(f"Lazy restore is {eager_seconds / max(lazy_seconds, 1e-9):.1f}x faster to become ready")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Replay a captured traffic file against the backend
+
+Reads the captures written with TRAFFIC_CAPTURE_PATH set (see
+brain/traffic_capture.py; one file per worker process) and sends the same
+requests at the same relative times, compressed by --speed: same endpoints,
+applications, message lengths, avatar mode and conversation structure. Runs
+captured side by side by several workers are replayed side by side; idle time
+between runs is cut to RUN_GAP_MS. Requests the server rejected (429, 503)
+are replayed too, so the offered load is the captured one. Turns of one conversation are sent in
+order, each after the previous one has been answered, so session continuity
+holds even when the server falls behind.
+
+Message text is generated from a fixed word list with a seeded generator, so
+two replays of the same capture send byte-identical requests and releases can
+be compared on the same workload. By default the backend is started with the
+local stand-in provider and rate limits off; pass --url to target a server
+that is already running instead.
+
+Usage:
+    python benchmarks/traffic_replay.py logs/traffic.*.jsonl.gz --speed 10
+    python benchmarks/traffic_replay.py capture.jsonl.gz --speed 100 --url http://127.0.0.1:8000
+"""
+
+import argparse
+import asyncio
+import bisect
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from brain.traffic_capture import read_captures  # noqa: E402
+from shard_dispatcher import wait_for_workers  # noqa: E402
+
+REPLAY_ENV = {
+    "OPENAI_API_KEY": "",
+    "BRAIN_LOCAL_PROVIDER": "true",
+    "ZOE_SNAPSHOT_PATH": "",
+    "RATE_LIMIT_ENABLED": "false",
+    "TRAFFIC_CAPTURE_PATH": ""
+}
+
+ENDPOINTS = {"zoe": "/api/zoe/chat", "chat": "/api/chat", "brain": "/api/brain"}
+
+WORDS = (
+    "I have been feeling anxious about my family lately and not sure why sometimes "
+    "it seems like nobody understands what went through growing up today was a little "
+    "better walked outside felt calmer afterwards keep thinking about conversation with "
+    "sister last week work school friends sleep tired hopeful trying"
+).split()
+
+# Gap left between capture runs that did not overlap in time
+RUN_GAP_MS = 1000
+
+
+def make_message(rng: random.Random, length: int) -> str:
+    """Deterministic text of exactly `length` characters"""
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length] or "hi"
+
+
+def schedule(events: List[Dict[str, Any]], headers: List[Dict[str, Any]]) -> List[float]:
+    """
+    Replay offsets in seconds at 1x
+
+    Each run is placed on the common clock by its header's "start_ms"; runs
+    that overlap there keep their relative timing, and the groups they form
+    are placed one after another. A run without a start time follows the
+    previous one.
+    """
+    durations = defaultdict(int)
+    for event in events:
+        durations[event["run"]] = max(durations[event["run"]], event["t_ms"])
+    starts = []
+    for run, header in enumerate(headers):
+        start = header.get("start_ms")
+        if start is None:
+            start = starts[-1] + durations[run - 1] + 1 if starts else 0
+        starts.append(start)
+
+    times = [starts[event["run"]] + event["t_ms"] for event in events]
+    spans: Dict[int, List[float]] = {}
+    for event, at in zip(events, times):
+        span = spans.setdefault(event["run"], [at, at])
+        span[0], span[1] = min(span[0], at), max(span[1], at)
+
+    # Overlapping runs form one group; each group starts RUN_GAP_MS after the last
+    groups: List[List[float]] = []
+    for first, last in sorted(spans.values()):
+        if groups and first <= groups[-1][1]:
+            groups[-1][1] = max(groups[-1][1], last)
+        else:
+            groups.append([first, last])
+    group_starts = [first for first, _ in groups]
+    shifts = []
+    position = 0.0
+    for first, last in groups:
+        shifts.append(position - first)
+        position += last - first + RUN_GAP_MS
+
+    return [(at + shifts[bisect.bisect_right(group_starts, at) - 1]) / 1000.0 for at in times]
+
+
+async def replay(
+    base_url: str,
+    events: List[Dict[str, Any]],
+    headers: List[Dict[str, Any]],
+    speed: float,
+    seed: int
+) -> Dict[str, Any]:
+    """Send every event at its scheduled time and collect latencies per endpoint"""
+    offsets = schedule(events, headers)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    slips: List[float] = []
+    session_ids: Dict[Tuple[int, int], Optional[str]] = {}
+    last_turn: Dict[Tuple[int, int], asyncio.Task] = {}
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0) as client:
+        async def send(index: int, event: Dict[str, Any], due: float, previous: Optional[asyncio.Task]):
+            if previous is not None:
+                await asyncio.gather(previous, return_exceptions=True)
+            key = (event["run"], event["session"]) if event["session"] is not None else None
+            message = make_message(random.Random(seed * 1_000_003 + index), event["message_chars"])
+            user = f"replay-{event['run']}-{event['session'] if key else index}"
+            if event["endpoint"] == "brain":
+                payload = {
+                    "message": message,
+                    "application": event["application"],
+                    "user_context": {"user_id": user},
+                    "session_id": user if key else None
+                }
+            else:
+                session_id = None if key is None or event["new_session"] else session_ids.get(key)
+                payload = {
+                    "message": message,
+                    "user_id": user,
+                    "session_id": session_id,
+                    "user_context": {"ace_score": 1, "avatar_mode": bool(event["avatar_mode"])}
+                }
+
+            sent = time.perf_counter()
+            slips.append(sent - started - due)
+            try:
+                response = await client.post(ENDPOINTS[event["endpoint"]], json=payload)
+            except httpx.HTTPError:
+                statuses[event["endpoint"]][0] += 1
+                return
+            latencies[event["endpoint"]].append(time.perf_counter() - sent)
+            statuses[event["endpoint"]][response.status_code] += 1
+            if key is not None and event["endpoint"] != "brain" and response.status_code == 200:
+                session_ids[key] = response.json().get("session_id") or session_ids.get(key)
+
+        tasks = []
+        started = time.perf_counter()
+        for index in sorted(range(len(events)), key=offsets.__getitem__):
+            event = events[index]
+            due = offsets[index] / speed
+            delay = due - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            key = (event["run"], event["session"]) if event["session"] is not None else None
+            task = asyncio.create_task(send(index, event, due, last_turn.get(key) if key else None))
+            if key is not None:
+                last_turn[key] = task
+            tasks.append(task)
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    return {
+        "latencies": latencies,
+        "statuses": statuses,
+        "slips": slips,
+        "elapsed": elapsed,
+        "offered_seconds": (max(offsets) / speed) if offsets else 0.0
+    }
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def report(results: Dict[str, Any], count: int, speed: float):
+    elapsed = results["elapsed"]
+    print(
+        f"replayed {count} requests at {speed:g}x in {elapsed:.1f}s "
+        f"(schedule {results['offered_seconds']:.1f}s, {count / elapsed if elapsed else 0:.1f} req/s)"
+    )
+    for endpoint, latencies in sorted(results["latencies"].items()):
+        latencies = sorted(latencies)
+        statuses = dict(sorted(results["statuses"][endpoint].items()))
+        print(
+            f"{ENDPOINTS[endpoint]:>14}: {len(latencies):6d} req  "
+            f"p50 {percentile(latencies, 0.5) * 1000:7.1f}ms  p90 {percentile(latencies, 0.9) * 1000:7.1f}ms  "
+            f"p99 {percentile(latencies, 0.99) * 1000:7.1f}ms  status {statuses}"
+        )
+    slips = sorted(results["slips"])
+    print(
+        f"{'send delay':>14}: p50 {percentile(slips, 0.5) * 1000:7.1f}ms  "
+        f"p99 {percentile(slips, 0.99) * 1000:7.1f}ms  max {(slips[-1] if slips else 0) * 1000:7.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("captures", nargs="+", help="Traffic capture files, one per worker")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier (1-100)")
+    parser.add_argument("--limit", type=int, default=None, help="Replay only the first N requests")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for generated message text")
+    parser.add_argument("--url", default=None, help="Target a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8095)
+    parser.add_argument("--provider-latency-ms", type=float, default=300.0,
+                        help="Simulated LLM latency of the local stand-in provider")
+    args = parser.parse_args()
+
+    if not 1.0 <= args.speed <= 100.0:
+        parser.error("--speed must be between 1 and 100")
+
+    headers, events = read_captures(args.captures)
+    events = events[:args.limit] if args.limit else events
+    if not events:
+        parser.error("the capture files have no requests")
+    print(f"{len(events)} requests from {len(headers)} capture run(s) in {len(args.captures)} file(s)")
+
+    if args.url:
+        report(asyncio.run(replay(args.url, events, headers, args.speed, args.seed)), len(events), args.speed)
+        return
+
+    env = {
+        **os.environ,
+        **REPLAY_ENV,
+        "BRAIN_LOCAL_PROVIDER_LATENCY_MS": str(args.provider_latency_ms)
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env
+    )
+    try:
+        wait_for_workers([f"http://127.0.0.1:{args.port}"])
+        results = asyncio.run(replay(f"http://127.0.0.1:{args.port}", events, headers, args.speed, args.seed))
+        report(results, len(events), args.speed)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Security Audit Log for ThinkxLife Brain
+
+Structured security events are queued in memory on the request path and
+written to size-rotated JSONL files in batches by a background task, with the
+file I/O done in a worker thread. The queue is bounded: when it is full new
+events are dropped and counted rather than slowing requests down. Repeats of
+the same event for the same user within a short window are folded into a
+suppressed count carried by the next event that is written, or by a summary
+event written when the window expires (and on stop) with no later event.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SecurityAuditLog:
+    """
+    Bounded, batched, deduplicating JSONL audit log
+
+    record() is synchronous and O(1); start() launches the writer task on the
+    running event loop and stop() flushes what is left.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_file_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        dedup_window: float = 10.0,
+        max_dedup_keys: int = 10000
+    ):
+        self.path = path
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self.backup_count = backup_count
+        self.dedup_window = dedup_window
+        self.max_dedup_keys = max_dedup_keys
+
+        self._queue: deque = deque()
+        # (event_type, user_id) -> [last_written_monotonic, suppressed_since]
+        self._recent: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "recorded": 0,
+            "written": 0,
+            "dropped": 0,
+            "suppressed": 0,
+            "batches": 0,
+            "rotations": 0,
+            "write_errors": 0
+        }
+
+    def record(self, event_type: str, user_id: Optional[str], details: Optional[Dict[str, Any]] = None):
+        """Queue a security event without blocking"""
+        now = time.monotonic()
+        key = (event_type, user_id or "")
+        recent = self._recent.get(key)
+        suppressed = 0
+        if recent is not None:
+            if now - recent[0] < self.dedup_window:
+                recent[1] += 1
+                self.stats["suppressed"] += 1
+                return
+            suppressed = int(recent[1])
+            recent[0], recent[1] = now, 0
+            self._recent.move_to_end(key)
+        else:
+            if len(self._recent) >= self.max_dedup_keys:
+                self._summarize(*self._recent.popitem(last=False))
+            self._recent[key] = [now, 0]
+
+        event = {
+            "timestamp": datetime.now().isoformat(),
+            "event": event_type,
+            "user_id": user_id,
+            "details": details or {}
+        }
+        if suppressed:
+            event["suppressed_repeats"] = suppressed
+        self._enqueue(event)
+
+    def _enqueue(self, event: Dict[str, Any]):
+        if len(self._queue) >= self.max_queue:
+            self.stats["dropped"] += 1
+            return
+        self._queue.append(event)
+        self.stats["recorded"] += 1
+
+        if self._wakeup is not None and len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    def _summarize(self, key: Tuple[str, str], recent: List[float]):
+        """Queue the repeats suppressed for a key that no later event will carry"""
+        if recent[1]:
+            self._enqueue({
+                "timestamp": datetime.now().isoformat(),
+                "event": key[0],
+                "user_id": key[1] or None,
+                "details": {},
+                "suppressed_repeats": int(recent[1]),
+                "summary": True
+            })
+
+    def expire(self, now: Optional[float] = None):
+        """Forget keys whose window has passed, summarizing their suppressed repeats"""
+        now = time.monotonic() if now is None else now
+        # Keys are ordered by when they were last written, oldest first
+        while self._recent:
+            key, recent = next(iter(self._recent.items()))
+            if now - recent[0] < self.dedup_window:
+                break
+            del self._recent[key]
+            self._summarize(key, recent)
+
+    def start(self):
+        """Start the background writer on the running event loop"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._writer_loop())
+
+    async def stop(self):
+        """Stop the writer and flush queued events"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.expire(float("inf"))
+        await self.flush()
+
+    async def flush(self):
+        """Write every queued event"""
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            await asyncio.to_thread(self._write_batch, batch)
+
+    async def _writer_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            self.expire()
+            await self.flush()
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        """Append a batch to the current file, rotating it when it grows too large"""
+        data = "".join(json.dumps(event, default=str) + "\n" for event in batch)
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(data) > self.max_file_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+        except OSError as e:
+            self.stats["write_errors"] += 1
+            self.stats["dropped"] += len(batch)
+            logger.error(f"Failed to write security audit batch: {str(e)}")
+
+    def _rotate(self):
+        """Shift path.N-1 to path.N and the current file to path.1"""
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.stats["rotations"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get audit log statistics"""
+        return {"path": self.path, "queued": len(self._queue), **self.stats}
@@ -8,6 +8,13 @@ import time
 import uuid
 from datetime import datetime
 
+from .load_shedder import AdaptiveConcurrencyLimiter, LoadLevel, current_load_level
+from .metrics import registry
+from .slow_request_journal import SlowRequestJournal
+from .tracing import begin_stage_timer, current_trace, end_trace, span
+from .usage_ledger import UsageLedger
+from .token_budget import TokenBudgetManager
+
 # Types are used in other modules but not directly in brain_core
 # Providers are imported dynamically in _initialize_providers()
 
@@ -22,9 +29,17 @@ class ThinkxLifeBrain:
     - OpenAI provider integration
     - Application-specific routing and context
     - Security and rate limiting
+    - Per-user and per-application token budgets
+    - Adaptive concurrency limits with graded load shedding
+    - Latency histograms and usage counters
     - Health monitoring
     """
     
+    APPLICATIONS = (
+        "healing-rooms", "inside-our-ai", "chatbot",
+        "compliance", "exterior-spaces", "general"
+    )
+    
     _instance = None
     _initialized = False
     
@@ -42,18 +57,22 @@ class ThinkxLifeBrain:
         self.config = config or self._get_default_config()
         self.providers = {}
         
-        # Analytics
-        self.analytics = {
-            "total_requests": 0,
-            "success_rate": 0.0,
-            "average_response_time": 0.0,
-            "provider_usage": {},
-            "application_usage": {},
-            "error_rate": 0.0,
-            "uptime": 0.0
-        }
+        # Analytics are derived from these metrics, which /metrics also exposes
+        self.request_seconds, self.tokens = self._metrics(registry)
         self.start_time = datetime.now()
         
+        # Token spend limits
+        self.token_budget = TokenBudgetManager(self.config.get("token_budgets"))
+        
+        # Per-day token usage and cost; None unless configured with a path
+        self.usage_ledger = UsageLedger.from_config(self.config.get("usage_ledger"))
+        
+        # Concurrency limit shared by Zoe turns and direct Brain requests
+        self.load_shedder = AdaptiveConcurrencyLimiter.from_config(self.config.get("load_shedding"), registry)
+        
+        # Stage timings and fingerprints of requests over the latency threshold
+        self.slow_journal = SlowRequestJournal.from_config(self.config.get("slow_request_journal"))
+        
         # Initialize providers
         self._initialize_providers()
         
@@ -110,6 +129,12 @@ class ThinkxLifeBrain:
                 logger.info("OpenAI provider initialized")
         except ImportError:
             logger.warning("OpenAI provider not available")
+        
+        # Offline stand-in provider, only when explicitly enabled
+        if provider_configs.get("local", {}).get("enabled", False):
+            from .providers.local import LocalProvider
+            self.providers["local"] = LocalProvider(provider_configs["local"])
+            logger.info("Local stand-in provider initialized")
     
     async def process_request(self, request_data):
         """
@@ -120,19 +145,39 @@ class ThinkxLifeBrain:
             
         Returns:
             Dictionary with the AI's response
+        
+        Raises:
+            OverloadedError: When load shedding rejects the request
         """
-        start_time = time.time()
+        if self.load_shedder is None:
+            return await self._process_request(request_data)
+        async with self.load_shedder.admit():
+            return await self._process_request(request_data)
+    
+    async def _process_request(self, request_data):
+        """Process a Brain request under its load shedding admission, if any"""
+        start_time = time.perf_counter()
         request_id = request_data.get("id", str(uuid.uuid4()))
+        application = request_data.get("application", "general")
+        # Unknown applications are routed to the general handler; keep label values bounded
+        application_label = application if application in self.APPLICATIONS else "other"
+        provider = "none"
+        outcome = "exception"
+        metadata = {}
+        error = None
+        reservation = None
+        
+        # The journal needs stage timings for every request; unsampled ones get a
+        # bare stage timer rather than a trace
+        trace = current_trace()
+        trace_token = None
+        if trace is None and self.slow_journal is not None:
+            trace, trace_token = begin_stage_timer()
         
         try:
-            # Update analytics
-            self.analytics["total_requests"] += 1
-            application = request_data.get("application", "general")
-            self.analytics["application_usage"][application] = \
-                self.analytics["application_usage"].get(application, 0) + 1
-            
             # Basic security validation
             if not self._validate_request(request_data):
+                outcome = "invalid"
                 return {
                     "id": request_id,
                     "success": False,
@@ -140,35 +185,63 @@ class ThinkxLifeBrain:
                     "timestamp": datetime.now().isoformat()
                 }
             
-            # Route to appropriate handler
-            response = await self._route_request(request_data)
+            # Reserve the expected token cost; over-budget requests run degraded
+            with span("budget"):
+                reservation = self.token_budget.reserve(request_data.get("user_id"), application, request_data)
+            if reservation.rejected:
+                outcome = "budget_rejected"
+                return {
+                    "id": request_id,
+                    "success": False,
+                    "error": "Token budget exceeded, please try again later",
+                    "timestamp": datetime.now().isoformat()
+                }
+            overrides = dict(reservation.overrides) if reservation.degraded else {}
+            # Near the concurrency limit, send less history to keep prompts and latency down
+            load_degraded = current_load_level() >= LoadLevel.SHORT_HISTORY
+            if load_degraded:
+                overrides["history_limit"] = min(
+                    overrides.get("history_limit", 10), self.load_shedder.short_history_limit
+                )
+            if overrides:
+                request_data = {**request_data, "overrides": overrides}
             
-            # Update analytics
-            processing_time = time.time() - start_time
-            self.analytics["average_response_time"] = (
-                (self.analytics["average_response_time"] * (self.analytics["total_requests"] - 1) + processing_time) 
-                / self.analytics["total_requests"]
-            )
+            # Route to appropriate handler, then settle the reservation with actual usage
+            actual_tokens = 0
+            try:
+                with span("provider"):
+                    response = await self._route_request(request_data)
+                if response.get("success", False):
+                    actual_tokens = (response.get("metadata") or {}).get("tokens_used")
+            finally:
+                self.token_budget.settle(reservation, actual_tokens)
             
-            if response.get("success", False):
-                self.analytics["success_rate"] = (
-                    (self.analytics["success_rate"] * (self.analytics["total_requests"] - 1) + 1.0) 
-                    / self.analytics["total_requests"]
-                )
-            else:
-                self.analytics["error_rate"] = (
-                    (self.analytics["error_rate"] * (self.analytics["total_requests"] - 1) + 1.0) 
-                    / self.analytics["total_requests"]
-                )
+            metadata = response.get("metadata")
+            if reservation.degraded and metadata is not None:
+                metadata["budget_degraded"] = True
+            if load_degraded and metadata is not None:
+                metadata["load_degraded"] = True
+            
+            metadata = metadata or {}
+            provider = metadata.get("provider", "none")
+            outcome = "success" if response.get("success", False) else "error"
+            error = response.get("error")
+            if actual_tokens:
+                self.tokens.inc(application_label, provider, amount=actual_tokens)
+                if self.usage_ledger is not None:
+                    self.usage_ledger.record(
+                        request_data.get("user_id"),
+                        application_label,
+                        metadata.get("model"),
+                        metadata.get("prompt_tokens"),
+                        metadata.get("completion_tokens")
+                    )
             
             return response
             
         except Exception as e:
-            logger.error(f"Error processing Brain request {request_id}: {str(e)}")
-            self.analytics["error_rate"] = (
-                (self.analytics["error_rate"] * (self.analytics["total_requests"] - 1) + 1.0) 
-                / self.analytics["total_requests"]
-            )
+            logger.error(f"Error processing Brain request {request_id}: {str(e)}", exc_info=True)
+            error = str(e)
             
             return {
                 "id": request_id,
@@ -176,6 +249,25 @@ class ThinkxLifeBrain:
                 "error": f"Internal Brain error: {str(e)}",
                 "timestamp": datetime.now().isoformat()
             }
+        
+        finally:
+            elapsed = time.perf_counter() - start_time
+            self.request_seconds.observe(elapsed, application_label, provider, outcome)
+            if trace_token is not None:
+                end_trace(trace_token)
+            if self.slow_journal is not None and self.slow_journal.is_slow(elapsed):
+                self.slow_journal.record(elapsed, request_data, {
+                    "request_id": request_id,
+                    "application": application_label,
+                    "outcome": outcome,
+                    "provider": provider,
+                    "model": metadata.get("model"),
+                    "error": error[:300] if error else None,
+                    "prompt_tokens": metadata.get("prompt_tokens"),
+                    "completion_tokens": metadata.get("completion_tokens"),
+                    "estimated_tokens": (reservation.reserved_tokens or None) if reservation is not None else None,
+                    "budget_degraded": bool(reservation is not None and reservation.degraded)
+                }, trace.span_records() if trace is not None else [])
     
     def _validate_request(self, request_data):
         """Basic request validation"""
@@ -213,6 +305,7 @@ class ThinkxLifeBrain:
             "message": request_data["message"],
             "system_prompt": system_prompt,
             "user_context": request_data.get("user_context", {}),
+            "overrides": request_data.get("overrides", {}),
             "application": "healing-rooms",
             "trauma_safe": True
         }
@@ -238,6 +331,7 @@ class ThinkxLifeBrain:
             "message": request_data["message"],
             "system_prompt": system_prompt,
             "user_context": request_data.get("user_context", {}),
+            "overrides": request_data.get("overrides", {}),
             "application": "inside-our-ai",
             "educational": True
         }
@@ -261,6 +355,7 @@ class ThinkxLifeBrain:
             "message": request_data["message"],
             "system_prompt": system_prompt,
             "user_context": request_data.get("user_context", {}),
+            "overrides": request_data.get("overrides", {}),
             "application": "chatbot"
         }
         
@@ -276,6 +371,7 @@ class ThinkxLifeBrain:
             "message": request_data["message"],
             "system_prompt": system_prompt,
             "user_context": request_data.get("user_context", {}),
+            "overrides": request_data.get("overrides", {}),
             "application": "compliance",
             "regulatory_focus": True
         }
@@ -298,6 +394,7 @@ class ThinkxLifeBrain:
             "message": request_data["message"],
             "system_prompt": system_prompt,
             "user_context": request_data.get("user_context", {}),
+            "overrides": request_data.get("overrides", {}),
             "application": "exterior-spaces",
             "creative": True
         }
@@ -314,6 +411,7 @@ class ThinkxLifeBrain:
             "message": request_data["message"],
             "system_prompt": system_prompt,
             "user_context": request_data.get("user_context", {}),
+            "overrides": request_data.get("overrides", {}),
             "application": "general"
         }
         
@@ -326,6 +424,10 @@ class ThinkxLifeBrain:
         if "openai" in self.providers:
             return self.providers["openai"]
         
+        # Fall back to the local stand-in when it is enabled
+        if "local" in self.providers:
+            return self.providers["local"]
+        
         raise RuntimeError("No available providers")
     
     def _get_healing_rooms_prompt(self, user_context):
@@ -459,6 +561,64 @@ class ThinkxLifeBrain:
         
         Assist users with warmth and understanding while maintaining appropriate boundaries."""
     
+    async def summarize_conversation(self, previous_summary, turns, user_id=None):
+        """
+        Fold conversation turns into a rolling summary using a cheap model
+        
+        Summary calls are admitted by load shedding and charged to the user's
+        token budget, the token counter and the usage ledger under the
+        "summary" application, like any other request.
+        
+        Args:
+            previous_summary: Existing summary to extend, if any
+            turns: List of {"role", "content"} dictionaries
+            user_id: User whose conversation is summarized
+            
+        Returns:
+            Updated summary text
+        
+        Raises:
+            OverloadedError: When load shedding rejects the call
+        """
+        provider = self._select_provider("summary")
+        if not hasattr(provider, "summarize"):
+            raise RuntimeError("Selected provider does not support summarization")
+        
+        if self.load_shedder is None:
+            return await self._summarize(provider, previous_summary, turns, user_id)
+        async with self.load_shedder.admit():
+            return await self._summarize(provider, previous_summary, turns, user_id)
+    
+    async def _summarize(self, provider, previous_summary, turns, user_id):
+        """Run a summary call against the token budget and record its usage"""
+        request_data = {
+            "message": "\n".join(turn.get("content", "") for turn in turns),
+            "user_context": {"conversation_summary": previous_summary}
+        }
+        reservation = self.token_budget.reserve(user_id, "summary", request_data)
+        if reservation.rejected:
+            raise RuntimeError("Token budget exceeded")
+        
+        actual_tokens = 0
+        try:
+            result = await provider.summarize(previous_summary, turns)
+            metadata = result["metadata"]
+            actual_tokens = metadata.get("tokens_used")
+        finally:
+            self.token_budget.settle(reservation, actual_tokens)
+        
+        if actual_tokens:
+            self.tokens.inc("summary", metadata.get("provider", "none"), amount=actual_tokens)
+            if self.usage_ledger is not None:
+                self.usage_ledger.record(
+                    user_id,
+                    "summary",
+                    metadata.get("model"),
+                    metadata.get("prompt_tokens"),
+                    metadata.get("completion_tokens")
+                )
+        return result["summary"]
+    
     async def _ensure_trauma_safety(self, response, user_context):
         """Ensure response is trauma-safe"""
         # Implement trauma safety checks
@@ -475,8 +635,14 @@ class ThinkxLifeBrain:
         
         return response
     
-    async def get_health_status(self):
-        """Get overall Brain health status"""
+    async def get_health_status(self, metrics=None):
+        """
+        Get overall Brain health status
+        
+        Args:
+            metrics: Registry to compute request totals from, such as one merged
+                across worker processes; defaults to this process's metrics
+        """
         
         provider_health = {}
         overall_status = "healthy"
@@ -496,12 +662,13 @@ class ThinkxLifeBrain:
         
         # System health
         uptime = (datetime.now() - self.start_time).total_seconds()
+        totals = self._request_totals(self._metrics(metrics or registry)[0])
         system_health = {
             "uptime_seconds": uptime,
-            "total_requests": self.analytics["total_requests"],
-            "success_rate": self.analytics["success_rate"],
-            "error_rate": self.analytics["error_rate"],
-            "average_response_time": self.analytics["average_response_time"]
+            "total_requests": totals["total_requests"],
+            "success_rate": totals["success_rate"],
+            "error_rate": totals["error_rate"],
+            "average_response_time": totals["average_response_time"]
         }
         
         return {
@@ -511,14 +678,63 @@ class ThinkxLifeBrain:
             "timestamp": datetime.now().isoformat()
         }
     
-    async def get_analytics(self):
-        """Get Brain analytics"""
+    @staticmethod
+    def _metrics(metrics):
+        """The request latency histogram and token counter in a metrics registry"""
+        return (
+            metrics.histogram(
+                "thinkxlife_brain_request_seconds",
+                "Brain request latency in seconds",
+                ("application", "provider", "outcome")
+            ),
+            metrics.counter(
+                "thinkxlife_brain_tokens_total",
+                "Tokens reported by providers",
+                ("application", "provider")
+            )
+        )
+    
+    @staticmethod
+    def _request_totals(histogram):
+        """Request count, success and error rates and mean latency"""
+        overall = histogram.merged()
+        total = overall.count
+        successes = histogram.merged(outcome="success").count
+        return {
+            "total_requests": total,
+            "success_rate": successes / total if total else 0.0,
+            "error_rate": (total - successes) / total if total else 0.0,
+            "average_response_time": overall.sum / total if total else 0.0
+        }
+    
+    async def get_analytics(self, metrics=None):
+        """
+        Get Brain analytics
+        
+        Args:
+            metrics: Registry to compute request figures from, such as one merged
+                across worker processes; defaults to this process's metrics
+        """
         
-        # Update uptime
         uptime = (datetime.now() - self.start_time).total_seconds()
-        self.analytics["uptime"] = uptime / 3600  # Convert to hours
+        histogram, tokens = self._metrics(metrics or registry)
         
-        return self.analytics
+        return {
+            **self._request_totals(histogram),
+            "provider_usage": {name: data.count for name, data in histogram.by_label("provider").items()},
+            "application_usage": {name: data.count for name, data in histogram.by_label("application").items()},
+            "outcomes": {name: data.count for name, data in histogram.by_label("outcome").items()},
+            "latency": histogram.summary(),
+            "latency_by_application": {
+                name: histogram.summary(data) for name, data in histogram.by_label("application").items()
+            },
+            "tokens_by_application": tokens.by_label("application"),
+            "usage_ledger": self.usage_ledger.get_stats() if self.usage_ledger is not None else None,
+            "slow_requests": self.slow_journal.get_stats() if self.slow_journal is not None else None,
+            "uptime": uptime / 3600,  # Convert to hours
+            "token_budgets": self.token_budget.get_stats(),
+            "load_shedding": self.load_shedder.get_stats() if self.load_shedder else None
+        }
     
     async def shutdown(self):
         """Gracefully shutdown the Brain"""
@@ -530,4 +746,10 @@ class ThinkxLifeBrain:
             if hasattr(provider, 'close'):
                 await provider.close()
         
+        # Write out usage recorded since the last flush
+        if self.usage_ledger is not None:
+            await self.usage_ledger.stop()
+        if self.slow_journal is not None:
+            self.slow_journal.close()
+        
         logger.info("ThinkxLife Brain shutdown complete") 
\ No newline at end of file
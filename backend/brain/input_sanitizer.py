@@ -0,0 +1,114 @@
+"""
+Input Sanitizer for ThinkxLife Brain
+
+Linear-time replacement for the regex-based tag stripping in SecurityManager.
+Input is truncated to its character and byte limits before any scanning, and
+script blocks and tags are then stripped in a single forward pass, so the work
+done is bounded by the truncated length whatever the input looks like.
+
+The output matches the previous two-regex pipeline on the truncated text:
+    re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.I | re.S)
+    re.sub(r'<[^>]+>', '', text)
+"""
+
+from typing import Optional, Tuple
+
+# Lowercases ASCII only, so indices in the folded copy match the original
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+SCRIPT_OPEN = "<script"
+SCRIPT_CLOSE = "</script>"
+
+
+def truncate_text(text: str, max_chars: Optional[int] = None, max_bytes: Optional[int] = None) -> str:
+    """Cut text to at most max_chars characters and max_bytes UTF-8 bytes"""
+    if max_chars is not None and len(text) > max_chars:
+        text = text[:max_chars]
+    # A character is at most 4 bytes, so short text cannot exceed the byte limit
+    if max_bytes is not None and len(text) * 4 > max_bytes:
+        encoded = text.encode("utf-8", errors="surrogatepass")
+        if len(encoded) > max_bytes:
+            # Dropping a partial trailing character keeps the result valid UTF-8
+            text = encoded[:max_bytes].decode("utf-8", errors="ignore")
+    return text
+
+
+def strip_markup(text: str) -> str:
+    """
+    Remove script blocks and tags in one forward pass
+
+    A small state machine walks the text once: outside a tag it looks for the
+    next '<', inside one for the '>' that closes it, and a script block ahead
+    is skipped whole whichever state it interrupts. Pieces of a tag are held in
+    the output until its '>' arrives, then dropped; a tag still open at the end
+    stays as text. Searches never reach past the next script block, and the
+    block itself is located once, so the work is linear in the text length.
+    """
+    folded = text.translate(_ASCII_LOWER)
+    length = len(text)
+    parts = []
+    position = 0
+    in_tag = False
+    tag_mark = 0  # Index in parts where the open tag starts
+    tag_chars = 0  # Characters of the open tag emitted so far, '<' included
+    script_start, script_end = _next_script(folded, 0)
+
+    while True:
+        if in_tag:
+            end = text.find(">", position, script_start)
+            if end >= 0:
+                piece = text[position:end]
+                parts.append(piece)
+                position = end + 1
+                in_tag = False
+                if tag_chars + len(piece) > 1:
+                    del parts[tag_mark:]
+                else:
+                    parts.append(">")  # "<>" is not a tag
+                continue
+        else:
+            start = text.find("<", position, script_start)
+            if start >= 0:
+                parts.append(text[position:start])
+                position = start
+                in_tag = True
+                tag_mark = len(parts)
+                tag_chars = 0
+                continue
+
+        # Nothing more before the next script block (or the end of the text)
+        parts.append(text[position:script_start])
+        if in_tag:
+            tag_chars += script_start - position
+        if script_start == length:
+            break
+        position = script_end
+        script_start, script_end = _next_script(folded, position)
+
+    return "".join(parts)
+
+
+def _next_script(folded: str, position: int) -> Tuple[int, int]:
+    """
+    Span of the next removable <script ...>...</script> block from position
+
+    Returns (len, len) when there is none. When a block's '>' or closing tag
+    is missing, no later block can be complete either, so searching stops.
+    """
+    length = len(folded)
+    start = folded.find(SCRIPT_OPEN, position)
+    if start < 0:
+        return length, length
+    open_end = folded.find(">", start + len(SCRIPT_OPEN))
+    if open_end < 0:
+        return length, length
+    close = folded.find(SCRIPT_CLOSE, open_end + 1)
+    if close < 0:
+        return length, length
+    return start, close + len(SCRIPT_CLOSE)
+
+
+def sanitize_text(text: str, max_chars: Optional[int] = 10000, max_bytes: Optional[int] = None) -> str:
+    """Truncate, strip scripts and tags, and trim whitespace"""
+    text = truncate_text(text, max_chars, max_bytes)
+    return strip_markup(text).strip()
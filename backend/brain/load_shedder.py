@@ -0,0 +1,198 @@
+"""
+Load Shedder for ThinkxLife Brain
+
+Adaptive concurrency limit in front of Zoe turns and Brain requests. The limit
+follows a gradient of observed latency, as in Netflix's Gradient2: a short
+moving average of request latency is compared with a long one, and while the
+short one stays within `tolerance` of the long one the limit grows by a queue
+allowance of sqrt(limit); when latency climbs (an upstream slowing down, or
+requests piling up behind each other) the limit shrinks in proportion. Event
+loop lag above a threshold shrinks it the same way, since a blocked loop slows
+every request regardless of upstream latency.
+
+Requests are admitted in levels as in-flight work approaches the limit, so
+service degrades before it fails:
+    NORMAL          full service
+    SKIP_TTS        no avatar speech synthesis
+    SHORT_HISTORY   also a shorter conversation history in the prompt
+    REJECT          at the limit; OverloadedError, served as 503
+
+A request admits once. Nested calls (a Zoe turn calling the Brain) run under
+the outer admission and its level without taking a second slot.
+"""
+
+import contextvars
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, Callable, Dict, Optional
+
+from .metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class LoadLevel(IntEnum):
+    NORMAL = 0
+    SKIP_TTS = 1
+    SHORT_HISTORY = 2
+    REJECT = 3
+
+
+class OverloadedError(RuntimeError):
+    """Raised when a request arrives while in-flight work is at the concurrency limit"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# Level of the admission the current request runs under, if any
+_admission: contextvars.ContextVar = contextvars.ContextVar("load_admission", default=None)
+
+
+def current_load_level() -> LoadLevel:
+    """Level of the current request's admission; NORMAL outside one"""
+    level = _admission.get()
+    return level if level is not None else LoadLevel.NORMAL
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Gradient-based concurrency limit with graded degradation
+
+    Configuration:
+        enabled: Turn load shedding on or off
+        initial_limit / min_limit / max_limit: Concurrent requests allowed
+        tolerance: Short-term latency may reach this multiple of the long-term
+            average before the limit shrinks
+        smoothing: Weight of each new limit estimate
+        lag_threshold_ms: Event loop lag above this shrinks the limit
+        skip_tts_at / short_history_at: Fractions of the limit at which
+            admissions degrade
+        short_history_limit: History messages sent under SHORT_HISTORY
+    """
+
+    def __init__(
+        self,
+        metrics: MetricsRegistry,
+        initial_limit: float = 32,
+        min_limit: float = 4,
+        max_limit: float = 256,
+        tolerance: float = 2.0,
+        smoothing: float = 0.2,
+        lag_threshold_ms: float = 100.0,
+        skip_tts_at: float = 0.7,
+        short_history_at: float = 0.85,
+        short_history_limit: int = 4,
+        loop_lag: Optional[Callable[[], float]] = None
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.lag_threshold = lag_threshold_ms / 1000.0
+        self.skip_tts_at = skip_tts_at
+        self.short_history_at = short_history_at
+        self.short_history_limit = short_history_limit
+        # Latest event loop lag in seconds; set once a loop monitor exists
+        self.loop_lag = loop_lag
+
+        self.in_flight = 0
+        self.short_rtt: Optional[float] = None
+        self.long_rtt: Optional[float] = None
+        self.admissions = metrics.counter(
+            "thinkxlife_load_admissions_total",
+            "Requests by load shedding level at admission",
+            ("level",)
+        )
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], metrics: MetricsRegistry) -> Optional["AdaptiveConcurrencyLimiter"]:
+        """Create a limiter from the Brain's "load_shedding" config, or None if disabled"""
+        config = config or {}
+        if not config.get("enabled", True):
+            return None
+        options = ("initial_limit", "min_limit", "max_limit", "tolerance", "smoothing",
+                   "lag_threshold_ms", "skip_tts_at", "short_history_at", "short_history_limit")
+        return cls(metrics, **{key: config[key] for key in options if key in config})
+
+    def level(self) -> LoadLevel:
+        """Level a request arriving now would be admitted at"""
+        if self.in_flight >= int(self.limit):
+            return LoadLevel.REJECT
+        used = self.in_flight / self.limit
+        if used >= self.short_history_at:
+            return LoadLevel.SHORT_HISTORY
+        if used >= self.skip_tts_at:
+            return LoadLevel.SKIP_TTS
+        return LoadLevel.NORMAL
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Hold a concurrency slot for the duration of a request
+
+        Yields the request's LoadLevel; raises OverloadedError at the limit.
+        Inside an existing admission, yields its level without a new slot.
+        """
+        outer = _admission.get()
+        if outer is not None:
+            yield outer
+            return
+
+        level = self.level()
+        self.admissions.inc(level.name.lower())
+        if level is LoadLevel.REJECT:
+            raise OverloadedError(
+                "The server is busy, please try again shortly",
+                retry_after=max(1.0, math.ceil(self.long_rtt or 1.0))
+            )
+
+        self.in_flight += 1
+        token = _admission.set(level)
+        start = time.perf_counter()
+        try:
+            yield level
+        finally:
+            _admission.reset(token)
+            self._update(time.perf_counter() - start, self.in_flight)
+            self.in_flight -= 1
+
+    def _update(self, rtt: float, in_flight: int):
+        """Fold one request's latency into the limit"""
+        if self.long_rtt is None:
+            self.short_rtt = self.long_rtt = rtt
+            return
+        self.short_rtt += (rtt - self.short_rtt) * 0.1
+        self.long_rtt += (rtt - self.long_rtt) * 0.01
+        # Under sustained overload the long average drifts up towards the short one;
+        # pull it back down once latency recovers so the limit can grow again
+        if self.long_rtt > 2 * self.short_rtt:
+            self.long_rtt *= 0.95
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / self.short_rtt))
+        lag = self.loop_lag() if self.loop_lag is not None else 0.0
+        if lag > self.lag_threshold:
+            gradient = min(gradient, max(0.5, self.lag_threshold / lag))
+
+        estimate = self.limit * gradient + math.sqrt(self.limit)
+        # Only grow a limit the traffic is actually using
+        if estimate > self.limit and in_flight < self.limit / 2:
+            return
+        limit = self.limit * (1 - self.smoothing) + estimate * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limit, load and admission statistics"""
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "level": self.level().name.lower(),
+            "short_rtt": self.short_rtt,
+            "long_rtt": self.long_rtt,
+            "admissions": self.admissions.by_label("level")
+        }
@@ -0,0 +1,193 @@
+"""
+Event Loop Monitor for ThinkxLife Brain
+
+Measures event-loop scheduling lag continuously: a background task sleeps for
+a fixed interval and records how much later than requested it woke up. Any
+callback that holds the loop (personality filters, serializing a long history,
+encoding TTS audio) shows up as lag for every connection, so the lag histogram
+is the loop's own latency as seen by all requests at once.
+
+With a block threshold set, a watchdog thread also notices when the loop has
+not woken up for longer than the threshold and captures the loop thread's
+stack while it is still blocked, so the blocking code is named rather than
+guessed. Blocks are grouped by the innermost frame in the backend's own
+source, giving a ranked list of blocking hotspots.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Frames under this directory are the backend's own code
+SOURCE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LoopMonitor:
+    """
+    Event-loop lag histogram and blocking-call watchdog
+
+    Configuration:
+        interval: Seconds between lag measurements
+        block_threshold_ms: Capture the stack of callbacks blocking longer than
+            this; 0 leaves the watchdog off (it is meant for debugging)
+        max_blocks: Captured blocks kept in memory
+    """
+
+    def __init__(
+        self,
+        metrics: MetricsRegistry,
+        interval: float = 0.25,
+        block_threshold_ms: float = 0.0,
+        max_blocks: int = 100
+    ):
+        self.interval = interval
+        self.block_threshold = block_threshold_ms / 1000.0
+        self.lag = metrics.histogram(
+            "thinkxlife_event_loop_lag_seconds",
+            "Delay between when the event loop should have woken a task and when it did"
+        )
+        self.blocks_total = metrics.counter(
+            "thinkxlife_event_loop_blocks_total",
+            "Lag measurements over the block threshold"
+        )
+        # Written by the watchdog thread, read by admin requests on the loop
+        self.blocks: deque = deque(maxlen=max_blocks)
+        self.hotspots: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._loop_thread: Optional[int] = None
+        # perf_counter time the loop last ran the monitor task
+        self._heartbeat = 0.0
+        # Most recent lag measurement in seconds
+        self.last_lag = 0.0
+
+    def start(self):
+        """Start measuring on the running event loop"""
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._measure_loop())
+        if self.block_threshold > 0:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self):
+        """Stop measuring and the watchdog thread"""
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+    async def _measure_loop(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self._heartbeat = now
+            lag = self.last_lag = max(0.0, now - expected)
+            self.lag.observe(lag)
+            if self.block_threshold and lag > self.block_threshold:
+                self.blocks_total.inc()
+
+    def _watch(self):
+        """Watchdog thread: capture the loop's stack once per block"""
+        poll = max(0.005, self.block_threshold / 4)
+        allowed = self.interval + self.block_threshold
+        captured_for = None
+        block = None
+        while not self._stopping.wait(poll):
+            heartbeat = self._heartbeat
+            if block is not None and heartbeat != captured_for:
+                # The loop is running again: the block lasted from one interval after
+                # the last heartbeat before it until this one
+                self._finish_block(block, heartbeat - captured_for - self.interval)
+                block = None
+            stalled = time.perf_counter() - heartbeat
+            if stalled > allowed and heartbeat != captured_for:
+                captured_for = heartbeat
+                block = self._capture(stalled - self.interval)
+        if block is not None:
+            self._finish_block(block, time.perf_counter() - captured_for - self.interval)
+
+    def _capture(self, blocked: float) -> Optional[Dict[str, Any]]:
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return None
+        stack = traceback.extract_stack(frame)
+        site = self._site(stack)
+        block = {
+            "timestamp": datetime.now().isoformat(),
+            "blocked_ms_at_capture": round(blocked * 1000, 3),
+            "blocked_ms": None,
+            "site": site,
+            "stack": traceback.format_list(stack)
+        }
+        with self._lock:
+            self.blocks.append(block)
+        logger.warning(f"Event loop blocked for over {block['blocked_ms_at_capture']:.0f}ms in {site}")
+        return block
+
+    def _finish_block(self, block: Dict[str, Any], blocked: float):
+        blocked_ms = round(max(blocked * 1000, block["blocked_ms_at_capture"]), 3)
+        with self._lock:
+            block["blocked_ms"] = blocked_ms
+            hotspot = self.hotspots.get(block["site"])
+            if hotspot is None:
+                hotspot = self.hotspots[block["site"]] = {"site": block["site"], "blocks": 0, "blocked_ms": 0.0, "max_ms": 0.0}
+            hotspot["blocks"] += 1
+            hotspot["blocked_ms"] += blocked_ms
+            hotspot["max_ms"] = max(hotspot["max_ms"], blocked_ms)
+
+    @staticmethod
+    def _site(stack: traceback.StackSummary) -> str:
+        """Innermost frame in the backend's own code, else the innermost frame"""
+        for entry in reversed(stack):
+            filename = os.path.abspath(entry.filename)
+            if filename.startswith(SOURCE_ROOT) and "site-packages" not in filename:
+                return f"{entry.name} ({os.path.relpath(filename, SOURCE_ROOT)}:{entry.lineno})"
+        entry = stack[-1]
+        return f"{entry.name} ({entry.filename}:{entry.lineno})"
+
+    def query(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent captured blocks, newest first"""
+        with self._lock:
+            return [dict(block) for block in reversed(self.blocks)][:limit]
+
+    def top_hotspots(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Blocking sites by total time blocked"""
+        with self._lock:
+            ranked = sorted(self.hotspots.values(), key=lambda hotspot: hotspot["blocked_ms"], reverse=True)
+        return [{**hotspot, "blocked_ms": round(hotspot["blocked_ms"], 3)} for hotspot in ranked[:limit]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get lag summary and watchdog statistics"""
+        return {
+            "interval": self.interval,
+            "lag": self.lag.summary(),
+            "watchdog": self.block_threshold > 0,
+            "block_threshold_ms": self.block_threshold * 1000,
+            "blocks": int(self.blocks_total.get())
+        }
@@ -0,0 +1,288 @@
+"""
+Metrics for ThinkxLife Brain
+
+Fixed-memory counters and log-bucketed histograms with Prometheus text
+exposition. Histograms use geometric bucket bounds, so every bucket has the
+same relative width and percentiles stay within a bounded relative error from
+a fraction of a millisecond to minutes, however many values are observed.
+
+Updates are plain dict and list operations on the event loop thread; no locks
+are taken on the request path.
+"""
+
+import math
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+
+def log_buckets(start: float, factor: float, count: int) -> List[float]:
+    """Geometric bucket upper bounds: start, start*factor, ... (count bounds)"""
+    return [start * factor ** i for i in range(count)]
+
+
+# 100us to about 2.5 minutes in steps of sqrt(2)
+DEFAULT_LATENCY_BUCKETS = log_buckets(0.0001, math.sqrt(2), 42)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        """Add amount to the counter for these label values"""
+        self.values[labelvalues] = self.values.get(labelvalues, 0) + amount
+
+    def get(self, *labelvalues: str) -> float:
+        return self.values.get(labelvalues, 0)
+
+    def by_label(self, labelname: str) -> Dict[str, float]:
+        """Totals grouped by one label"""
+        index = self.labelnames.index(labelname)
+        totals: Dict[str, float] = {}
+        for labels, value in self.values.items():
+            totals[labels[index]] = totals.get(labels[index], 0) + value
+        return totals
+
+    def render(self) -> Iterable[str]:
+        for labels, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+    def dump_values(self) -> List[list]:
+        return [[list(labels), value] for labels, value in self.values.items()]
+
+    def merge_values(self, values: List[list]):
+        for labels, value in values:
+            self.inc(*labels, amount=value)
+
+
+class HistogramData:
+    """Bucket counts, sum and count for one label set"""
+
+    __slots__ = ("counts", "sum", "count", "max")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def merge(self, other: "HistogramData"):
+        for i, value in enumerate(other.counts):
+            self.counts[i] += value
+        self.sum += other.sum
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+
+class Histogram:
+    """
+    Log-bucketed histogram keyed by label values
+
+    Memory per label set is one integer per bucket, independent of how many
+    values are observed.
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.bounds = list(buckets)
+        self.values: Dict[LabelValues, HistogramData] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        """Record one value for these label values"""
+        data = self.values.get(labelvalues)
+        if data is None:
+            data = self.values[labelvalues] = HistogramData(len(self.bounds) + 1)
+        # The last slot counts values above the largest bound
+        data.counts[bisect_left(self.bounds, value)] += 1
+        data.sum += value
+        data.count += 1
+        if value > data.max:
+            data.max = value
+
+    def merged(self, **match: str) -> HistogramData:
+        """Combine every label set matching the given label values"""
+        indexes = {self.labelnames.index(name): value for name, value in match.items()}
+        combined = HistogramData(len(self.bounds) + 1)
+        for labels, data in self.values.items():
+            if all(labels[i] == value for i, value in indexes.items()):
+                combined.merge(data)
+        return combined
+
+    def by_label(self, labelname: str) -> Dict[str, HistogramData]:
+        """Histograms combined per value of one label"""
+        index = self.labelnames.index(labelname)
+        grouped: Dict[str, HistogramData] = {}
+        for labels, data in self.values.items():
+            combined = grouped.get(labels[index])
+            if combined is None:
+                combined = grouped[labels[index]] = HistogramData(len(self.bounds) + 1)
+            combined.merge(data)
+        return grouped
+
+    def percentile(self, q: float, data: Optional[HistogramData] = None) -> float:
+        """
+        Estimate the q-th quantile (0 < q <= 1) from bucket counts
+
+        Interpolates geometrically inside the bucket holding the quantile, so
+        the estimate is within one bucket's relative width of the true value
+        (linearly from zero in the first bucket).
+        """
+        data = data if data is not None else self.merged()
+        if not data.count:
+            return 0.0
+        rank = q * data.count
+        cumulative = 0
+        for i, count in enumerate(data.counts):
+            if count and cumulative + count >= rank:
+                if i == len(self.bounds):
+                    return data.max
+                upper = min(self.bounds[i], data.max)
+                fraction = (rank - cumulative) / count
+                if i == 0:
+                    return upper * fraction
+                lower = self.bounds[i - 1]
+                if upper <= lower:
+                    return upper
+                return lower * (upper / lower) ** fraction
+            cumulative += count
+        return data.max
+
+    def summary(self, data: Optional[HistogramData] = None) -> Dict[str, float]:
+        """Count, mean, max and common percentiles"""
+        data = data if data is not None else self.merged()
+        return {
+            "count": data.count,
+            "mean": data.sum / data.count if data.count else 0.0,
+            "p50": self.percentile(0.5, data),
+            "p90": self.percentile(0.9, data),
+            "p99": self.percentile(0.99, data),
+            "max": data.max
+        }
+
+    def dump_values(self) -> List[list]:
+        return [[list(labels), [list(data.counts), data.sum, data.count, data.max]] for labels, data in self.values.items()]
+
+    def merge_values(self, values: List[list]):
+        for labels, (counts, total, count, maximum) in values:
+            labels = tuple(labels)
+            data = self.values.get(labels)
+            if data is None:
+                data = self.values[labels] = HistogramData(len(self.bounds) + 1)
+            for i, value in enumerate(counts):
+                data.counts[i] += value
+            data.sum += total
+            data.count += count
+            data.max = max(data.max, maximum)
+
+    def render(self) -> Iterable[str]:
+        for labels, data in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.bounds + [math.inf], data.counts):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(data.sum)}"
+            yield f"{self.name}_count{label_text} {data.count}"
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in Prometheus text format"""
+
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Get or create a counter"""
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> Histogram:
+        """Get or create a histogram"""
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(name, documentation, labelnames, **kwargs)
+        elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"Metric {name} is already registered with a different type or labels")
+        return metric
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain-data copy of every metric, for merging into another registry"""
+        return {
+            name: {
+                "type": metric.type_name,
+                "documentation": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "buckets": getattr(metric, "bounds", None),
+                "values": metric.dump_values()
+            }
+            for name, metric in self.metrics.items()
+        }
+
+    def merge(self, snapshot: Dict[str, Any]):
+        """Add a snapshot's counts into this registry"""
+        for name, data in snapshot.items():
+            if data["type"] == Histogram.type_name:
+                metric = self.histogram(name, data["documentation"], data["labelnames"], data["buckets"])
+                if metric.bounds != data["buckets"]:
+                    raise ValueError(f"Histogram {name} has different buckets in the snapshot")
+            else:
+                metric = self.counter(name, data["documentation"], data["labelnames"])
+            metric.merge_values(data["values"])
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Shared by the Brain, Zoe and the HTTP layer of this process
+registry = MetricsRegistry()
@@ -0,0 +1,48 @@
+"""
+Private Files for ThinkxLife Brain
+
+Helpers for files that hold conversation data or metrics and must not be
+readable, replaceable or redirected by other local users: directories are
+0700 and owned by this user, files are created 0600 without following
+symlinks.
+"""
+
+import os
+import stat
+
+
+def ensure_private_dir(path: str):
+    """
+    Create a directory only this user can access (0700), or check that an
+    existing one is
+
+    A directory created in advance by someone else, one open to other users,
+    or a symlink in its place is refused with PermissionError.
+    """
+    try:
+        os.makedirs(path, mode=0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077:
+        raise PermissionError(f"{path} must be a directory owned by this user with mode 0700")
+
+
+def create_private_file(path: str, mode: str = "w+b"):
+    """
+    Create a new file readable only by this user (0600) and open it
+
+    O_EXCL and O_NOFOLLOW refuse to follow a symlink or reuse a file planted at
+    the path. A stale regular file of our own (left by a crashed process) is
+    replaced.
+    """
+    flags = os.O_CREAT | os.O_EXCL | os.O_RDWR | getattr(os, "O_NOFOLLOW", 0) | getattr(os, "O_BINARY", 0)
+    try:
+        fd = os.open(path, flags, 0o600)
+    except FileExistsError:
+        info = os.lstat(path)
+        if not stat.S_ISREG(info.st_mode) or info.st_uid != os.getuid():
+            raise
+        os.remove(path)
+        fd = os.open(path, flags, 0o600)
+    return os.fdopen(fd, mode)
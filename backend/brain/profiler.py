@@ -0,0 +1,175 @@
+"""
+Sampling Profiler for ThinkxLife Brain
+
+Samples the stacks of every thread in the process at a fixed interval from a
+background thread, for a bounded duration. Nothing is instrumented and the
+profiled code runs unmodified; the cost is one sys._current_frames() walk per
+tick, so overhead scales with the sampling rate rather than with request load.
+
+Results are collapsed stacks ("thread;outer;...;inner count" per line, the
+input format of flamegraph.pl, speedscope and inferno) plus the top functions
+by self and total samples.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Each tick walks every thread's stack while holding the GIL; below about 5ms
+# the profiler itself starts to slow the event loop it is measuring
+MIN_INTERVAL = 0.005
+MAX_DURATION = 120.0
+
+# Leaf frames of threads that are blocked waiting rather than running
+IDLE_LEAVES = (
+    ("select", "selectors.py"), ("poll", "selectors.py"),
+    ("wait", "threading.py"), ("get", "queue.py"), ("accept", "socket.py")
+)
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running"""
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler over all threads
+
+    Only one profile runs at a time. run() blocks for the whole duration, so
+    call it from a worker thread (asyncio.to_thread) rather than the event
+    loop, which is itself one of the threads being sampled.
+    """
+
+    def __init__(self, max_duration: float = MAX_DURATION):
+        self.max_duration = max_duration
+        self._lock = threading.Lock()
+        self._labels: Dict[Any, str] = {}  # code object -> frame label
+
+    def run(self, duration: float, interval: float = 0.005, include_idle: bool = False) -> Dict[str, Any]:
+        """
+        Sample every thread for `duration` seconds
+
+        Args:
+            duration: Seconds to sample, capped at max_duration
+            interval: Seconds between samples (at least MIN_INTERVAL, 5ms)
+            include_idle: Keep samples of threads waiting in selectors, locks
+                and queues, which otherwise dominate the output
+
+        Returns:
+            {"ticks", "samples", "duration", "interval",
+             "stacks": Counter of collapsed stacks}
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running")
+        try:
+            duration = max(0.0, min(duration, self.max_duration))
+            interval = max(interval, MIN_INTERVAL)
+            own_thread = threading.get_ident()
+            stacks: Counter = Counter()
+            ticks = 0
+
+            start = time.perf_counter()
+            deadline = start + duration
+            next_tick = start
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                if now < next_tick:
+                    time.sleep(next_tick - now)
+                next_tick += interval
+
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_thread:
+                        continue
+                    stack = self._collapse(frame)
+                    if not include_idle and self._is_idle(stack):
+                        continue
+                    stacks[f"{names.get(thread_id, thread_id)};{stack}"] += 1
+                ticks += 1
+
+            return {
+                "ticks": ticks,
+                "samples": sum(stacks.values()),
+                "duration": time.perf_counter() - start,
+                "interval": interval,
+                "stacks": stacks
+            }
+        finally:
+            # Labels hold code objects; don't keep them (or their modules) alive between runs
+            self._labels.clear()
+            self._lock.release()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            # Keep the last two path components: enough to tell modules apart
+            short = os.sep.join(filename.rsplit(os.sep, 2)[-2:])
+            label = self._labels[code] = f"{code.co_name} ({short}:{code.co_firstlineno})"
+        return label
+
+    def _collapse(self, frame) -> str:
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.reverse()
+        return ";".join(labels)
+
+    @staticmethod
+    def _is_idle(stack: str) -> bool:
+        leaf = stack.rsplit(";", 1)[-1]
+        return any(leaf.startswith(f"{name} (") and f"{filename}:" in leaf for name, filename in IDLE_LEAVES)
+
+
+def collapsed_text(stacks: Counter) -> str:
+    """Collapsed-stack lines, most frequent first"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def top_functions(stacks: Counter, limit: int = 20) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Functions with the most samples
+
+    "self" counts samples where the function was on top of the stack;
+    "total" counts samples where it appeared anywhere (once per sample).
+    """
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    samples = sum(stacks.values()) or 1
+    for stack, count in stacks.items():
+        frames = stack.split(";")[1:]  # Drop the thread name
+        if not frames:
+            continue
+        self_counts[frames[-1]] += count
+        for frame in set(frames):
+            total_counts[frame] += count
+
+    def rows(counts: Counter) -> List[Dict[str, Any]]:
+        return [
+            {"function": function, "samples": count, "percent": round(100.0 * count / samples, 2)}
+            for function, count in counts.most_common(limit)
+        ]
+
+    return {"self": rows(self_counts), "total": rows(total_counts)}
+
+
+def write_collapsed(stacks: Counter, directory: str) -> str:
+    """Write collapsed stacks to a timestamped file and return its path"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.collapsed")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(collapsed_text(stacks))
+    return path
@@ -2,9 +2,9 @@
 Brain Providers - AI provider implementations for ThinkxLife Brain
 """
 
-# Local provider removed
+from .local import LocalProvider
 
-__all__ = []  # All providers removed except OpenAI
+__all__ = ["LocalProvider"]  # Offline stand-in for benchmarks and local development
 
 # Optional providers
 try:
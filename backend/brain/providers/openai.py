@@ -6,7 +6,9 @@ import asyncio
 import logging
 import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+
+from ..tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +41,7 @@ class OpenAIProvider:
         self.timeout = config.get("timeout", 30.0)
         self.enabled = config.get("enabled", False)
         self.organization = config.get("organization")
+        self.summary_model = config.get("summary_model", "gpt-4o-mini")
         
         if not self.api_key:
             raise ValueError("OpenAI API key is required")
@@ -78,6 +81,12 @@ class OpenAIProvider:
             user_context = request_data.get("user_context", {})
             application = request_data.get("application", "general")
             
+            # Token budgets may ask for a cheaper call
+            overrides = request_data.get("overrides") or {}
+            model = overrides.get("model") or self.model
+            history_limit = overrides.get("history_limit", 10)
+            max_tokens = overrides.get("max_tokens", self.max_tokens)
+            
             # Build messages for OpenAI
             messages = []
             
@@ -87,32 +96,42 @@ class OpenAIProvider:
                     "content": system_prompt
                 })
             
-            # Add conversation history if available
-            history = user_context.get("conversation_history", [])
-            for msg in history[-10:]:  # Last 10 messages
+            # Add the rolling summary of older turns if available
+            conversation_summary = user_context.get("conversation_summary")
+            if conversation_summary:
                 messages.append({
-                    "role": msg.get("role", "user"),
-                    "content": msg.get("content", "")
+                    "role": "system",
+                    "content": f"Summary of the earlier conversation:\n{conversation_summary}"
                 })
             
-            # Add current message
-            messages.append({
-                "role": "user",
-                "content": message
-            })
+            # Add conversation history if available. Zoe hands over provider-ready
+            # {"role", "content"} dicts, which are used as-is.
+            history = user_context.get("conversation_history", [])
+            if history_limit:
+                messages.extend(history[-history_limit:])  # Last 10 messages unless degraded
+            
+            # Add current message unless the history already ends with it
+            last = history[-1] if history else None
+            if not last or last.get("role") != "user" or last.get("content") != message:
+                messages.append({
+                    "role": "user",
+                    "content": message
+                })
             
             # Make API call
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                stream=False
-            )
+            with span("openai"):
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=self.temperature,
+                    stream=False
+                )
             
             # Extract response
             ai_message = response.choices[0].message.content
-            tokens_used = response.usage.total_tokens if response.usage else None
+            usage = response.usage
+            tokens_used = usage.total_tokens if usage else None
             
             # Build Brain response
             brain_response = {
@@ -121,8 +140,10 @@ class OpenAIProvider:
                 "timestamp": datetime.now().isoformat(),
                 "metadata": {
                     "provider": "openai",
-                    "model": self.model,
+                    "model": model,
                     "tokens_used": tokens_used,
+                    "prompt_tokens": usage.prompt_tokens if usage else None,
+                    "completion_tokens": usage.completion_tokens if usage else None,
                     "processing_time": time.time() - start_time,
                     "application": application,
                     "sources": ["OpenAI API"]
@@ -146,6 +167,65 @@ class OpenAIProvider:
                 }
             }
     
+    async def summarize(
+        self,
+        previous_summary: Optional[str],
+        turns: List[Dict[str, str]],
+        max_tokens: int = 400
+    ) -> Dict[str, Any]:
+        """
+        Fold conversation turns into a rolling summary using the summary model
+        
+        Args:
+            previous_summary: Existing summary to extend, if any
+            turns: Conversation turns as {"role", "content"} dicts
+            max_tokens: Maximum summary length in tokens
+            
+        Returns:
+            {"summary": updated summary text, "metadata": provider, model and token usage}
+        """
+        if not self.enabled:
+            raise RuntimeError("OpenAI provider is disabled")
+        
+        transcript = "\n".join(
+            f"{'User' if turn.get('role') == 'user' else 'Zoe'}: {turn.get('content', '')}"
+            for turn in turns
+        )
+        
+        response = await self.client.chat.completions.create(
+            model=self.summary_model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "You maintain a running summary of a supportive conversation between a user "
+                        "and Zoe, a trauma-informed AI companion. Update the summary with the new turns. "
+                        "Keep the feelings, concerns and personal details the user shared, stay factual, "
+                        "do not add advice, and answer with the summary only."
+                    )
+                },
+                {
+                    "role": "user",
+                    "content": f"Current summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}"
+                }
+            ],
+            max_tokens=max_tokens,
+            temperature=0.2,
+            stream=False
+        )
+        
+        usage = response.usage
+        return {
+            "summary": response.choices[0].message.content or "",
+            "metadata": {
+                "provider": "openai",
+                "model": self.summary_model,
+                "tokens_used": usage.total_tokens if usage else None,
+                "prompt_tokens": usage.prompt_tokens if usage else None,
+                "completion_tokens": usage.completion_tokens if usage else None
+            }
+        }
+    
     def _add_application_metadata(self, response: Dict[str, Any], application: str):
         """Add application-specific metadata"""
         
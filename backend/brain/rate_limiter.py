@@ -0,0 +1,333 @@
+"""
+Rate Limiter for ThinkxLife Brain
+
+Generic cell rate algorithm (GCRA) limiters. Each key keeps one float per limit,
+its theoretical arrival time (TAT), so a check is O(1) regardless of how many
+requests fall inside the window.
+
+GCRARateLimiter keeps state in process memory. SQLiteRateLimiter keeps it in a
+SQLite file so that every worker process on a host shares the same limits.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tolerance for float drift when a burst lands exactly on the limit
+_EPSILON = 1e-9
+
+
+class GCRARateLimiter:
+    """
+    In-process GCRA rate limiter with bounded memory
+
+    A limit of `count` requests per `period` seconds allows a burst of `count`
+    requests and then one request every `period / count` seconds. Like a token
+    bucket, it bounds any span of T seconds to `count + T * count / period`
+    requests: the long-run rate is `count` per `period`, but a burst right
+    after an idle spell can put up to `2 * count` requests in one `period`.
+
+    Keys are kept in LRU order. A key whose TATs have all passed is
+    indistinguishable from a new key and is dropped lazily; when `max_keys` is
+    reached the least recently seen key is evicted.
+    """
+
+    def __init__(
+        self,
+        limits: List[Tuple[int, float]],
+        max_keys: int = 100000,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            limits: (count, period_seconds) pairs that must all be satisfied
+            max_keys: Maximum number of tracked keys
+            clock: Monotonic time source in seconds
+        """
+        if not limits:
+            raise ValueError("At least one rate limit is required")
+
+        # (emission interval, period) per limit
+        self.limits = [(period / count, period) for count, period in limits]
+        self.max_keys = max_keys
+        self.clock = clock
+        self._tats: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.stats = {"allowed": 0, "rejected": 0, "evicted": 0}
+
+    @classmethod
+    def from_config(cls, config: Dict, clock: Callable[[], float] = time.monotonic) -> "GCRARateLimiter":
+        """Build a limiter from the SecurityManager rate_limiting config"""
+        return cls(rate_limits_from_config(config), config.get("max_tracked_users", 100000), clock)
+
+    def hit(self, key: str) -> float:
+        """
+        Record a request for a key if it is within all limits
+
+        Returns:
+            0.0 if the request is allowed, otherwise seconds until it would be
+        """
+        now = self.clock()
+        tats = self._tats.get(key)
+        if tats is None:
+            self._evict_idle(now)
+            tats = self._tats[key] = [now] * len(self.limits)
+        else:
+            self._tats.move_to_end(key)
+
+        new_tats = []
+        retry_after = 0.0
+        for (interval, period), tat in zip(self.limits, tats):
+            new_tat = (tat if tat > now else now) + interval
+            wait = new_tat - now - period
+            if wait > retry_after:
+                retry_after = wait
+            new_tats.append(new_tat)
+
+        if retry_after > _EPSILON:
+            self.stats["rejected"] += 1
+            return retry_after
+
+        tats[:] = new_tats
+        self.stats["allowed"] += 1
+        return 0.0
+
+    def allow(self, key: str) -> bool:
+        """Record a request and report whether it is allowed"""
+        return self.hit(key) == 0.0
+
+    def reset(self, key: Optional[str] = None):
+        """Forget one key, or every key"""
+        if key is None:
+            self._tats.clear()
+        else:
+            self._tats.pop(key, None)
+
+    def _evict_idle(self, now: float):
+        """Drop a couple of idle keys from the LRU head, and the oldest key if full"""
+        for _ in range(2):
+            if not self._tats:
+                return
+            key, tats = next(iter(self._tats.items()))
+            if max(tats) > now:
+                break
+            del self._tats[key]
+
+        if len(self._tats) >= self.max_keys:
+            self._tats.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get limiter statistics"""
+        return {"backend": "memory", "tracked_keys": len(self._tats), "max_keys": self.max_keys, **self.stats}
+
+
+class SQLiteRateLimiter:
+    """
+    GCRA rate limiter shared by every process using the same SQLite file
+
+    Each check is a single UPSERT ... RETURNING statement, so it is atomic
+    across processes without an explicit transaction. The database runs in WAL
+    mode with synchronous=OFF: losing recent limiter state in a crash is
+    harmless, and it keeps a check to one short write lock.
+
+    Processes share wall-clock time rather than a monotonic clock, because
+    monotonic time is not comparable across reboots and the file outlives them.
+    Expired rows are pruned periodically and the table is capped at `max_keys`
+    rows, evicting the keys closest to expiry. If the database is unavailable
+    requests are allowed and the failure is counted.
+
+    A check can wait up to `busy_timeout_ms` for the write lock, so callers on
+    an event loop should run hit() in a worker thread (SecurityManager does).
+    The connection may be used from any thread and is serialized by a lock.
+    The file is created readable only by this user (0600); its directory
+    should not be writable by others, or they could pre-create it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        limits: List[Tuple[int, float]],
+        max_keys: int = 100000,
+        namespace: str = "",
+        prune_interval: int = 1000,
+        busy_timeout_ms: int = 250,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            path: SQLite database file shared by the worker processes
+            limits: (count, period_seconds) pairs that must all be satisfied
+            max_keys: Maximum number of rows kept
+            namespace: Prefix separating limiters that share a file
+            prune_interval: Checks between pruning passes in this process
+            busy_timeout_ms: How long a check may wait for the write lock
+            clock: Wall-clock time source in seconds
+        """
+        if not limits:
+            raise ValueError("At least one rate limit is required")
+
+        self.path = path
+        self.limits = [(period / count, period) for count, period in limits]
+        self.max_keys = max_keys
+        self.namespace = namespace
+        self.prune_interval = prune_interval
+        self.clock = clock
+        self.stats = {"allowed": 0, "rejected": 0, "pruned": 0, "errors": 0}
+        self._checks_since_prune = 0
+
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        # Create the file 0600 before SQLite does; its WAL files take the same mode
+        os.close(os.open(path, os.O_CREAT | os.O_RDWR, 0o600))
+        self._conn = sqlite3.connect(
+            path, timeout=busy_timeout_ms / 1000.0, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        self._create_table()
+        self._hit_sql = self._build_hit_sql()
+
+    @classmethod
+    def from_config(cls, config: Dict, namespace: str = "user", multiplier: int = 1) -> "SQLiteRateLimiter":
+        """Build a limiter from the SecurityManager rate_limiting config"""
+        return cls(
+            config["sqlite_path"],
+            [(count * multiplier, period) for count, period in rate_limits_from_config(config)],
+            config.get("max_tracked_users", 100000),
+            namespace=namespace
+        )
+
+    def _create_table(self):
+        columns = ", ".join(f"tat{i} REAL NOT NULL" for i in range(len(self.limits)))
+        self.table = f"rate_limits_{len(self.limits)}"
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            f"key TEXT PRIMARY KEY, {columns}, expires REAL NOT NULL, allowed INTEGER NOT NULL"
+            ")"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_expires ON {self.table} (expires)")
+
+    def _build_hit_sql(self) -> str:
+        """
+        One statement per check. :now and the per-limit :iN/:pN parameters are
+        bound; a row is only advanced when every limit admits the request, and
+        `allowed` records which branch was taken so RETURNING can report it.
+        """
+        count = len(self.limits)
+        new_tats = [f"(max(tat{i}, :now) + :i{i})" for i in range(count)]
+        admitted = " AND ".join(f"{new_tats[i]} - :now <= :p{i} + {_EPSILON}" for i in range(count))
+        assignments = ", ".join(
+            f"tat{i} = CASE WHEN {admitted} THEN {new_tats[i]} ELSE tat{i} END" for i in range(count)
+        )
+        expires = f"max({', '.join(new_tats)})" if count > 1 else new_tats[0]
+        initial_tats = [f":now + :i{i}" for i in range(count)]
+        initial_expires = f"max({', '.join(initial_tats)})" if count > 1 else initial_tats[0]
+        return (
+            f"INSERT INTO {self.table} (key, {', '.join(f'tat{i}' for i in range(count))}, expires, allowed) "
+            f"VALUES (:key, {', '.join(initial_tats)}, {initial_expires}, 1) "
+            f"ON CONFLICT(key) DO UPDATE SET "
+            # Evaluated against the old row, so expires and allowed see the old TATs
+            f"expires = CASE WHEN {admitted} THEN {expires} ELSE expires END, "
+            f"allowed = CASE WHEN {admitted} THEN 1 ELSE 0 END, "
+            f"{assignments} "
+            f"RETURNING allowed, {', '.join(f'tat{i}' for i in range(count))}"
+        )
+
+    def hit(self, key: str) -> float:
+        """
+        Record a request for a key if it is within all limits
+
+        Returns:
+            0.0 if the request is allowed, otherwise seconds until it would be
+        """
+        now = self.clock()
+        params = {"key": f"{self.namespace}:{key}", "now": now}
+        for i, (interval, period) in enumerate(self.limits):
+            params[f"i{i}"] = interval
+            params[f"p{i}"] = period
+
+        try:
+            with self._lock:
+                row = self._conn.execute(self._hit_sql, params).fetchone()
+            self._checks_since_prune += 1
+            if self._checks_since_prune >= self.prune_interval:
+                self._checks_since_prune = 0
+                self.prune(now)
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            if self.stats["errors"] % 1000 == 1:
+                logger.warning(
+                    f"Shared rate limiter unavailable, allowing request "
+                    f"({self.stats['errors']} failures so far): {str(e)}"
+                )
+            return 0.0
+
+        if row[0]:
+            self.stats["allowed"] += 1
+            return 0.0
+
+        self.stats["rejected"] += 1
+        retry_after = 0.0
+        for (interval, period), tat in zip(self.limits, row[1:]):
+            retry_after = max(retry_after, max(tat, now) + interval - now - period)
+        return max(retry_after, _EPSILON)
+
+    def allow(self, key: str) -> bool:
+        """Record a request and report whether it is allowed"""
+        return self.hit(key) == 0.0
+
+    def prune(self, now: Optional[float] = None):
+        """Delete expired rows, then the rows closest to expiry beyond max_keys"""
+        now = self.clock() if now is None else now
+        with self._lock:
+            pruned = self._conn.execute(f"DELETE FROM {self.table} WHERE expires <= ?", (now,)).rowcount
+            excess = self._conn.execute(f"SELECT count(*) FROM {self.table}").fetchone()[0] - self.max_keys
+            if excess > 0:
+                pruned += self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY expires LIMIT ?)",
+                    (excess,)
+                ).rowcount
+        self.stats["pruned"] += pruned
+
+    def reset(self, key: Optional[str] = None):
+        """Forget one key, or every key in this namespace"""
+        with self._lock:
+            if key is None:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key LIKE ?", (f"{self.namespace}:%",))
+            else:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (f"{self.namespace}:{key}",))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT count(*) FROM {self.table} WHERE key LIKE ?", (f"{self.namespace}:%",)
+            ).fetchone()[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter statistics"""
+        return {"backend": "sqlite", "path": self.path, "max_keys": self.max_keys, **self.stats}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def rate_limits_from_config(config: Dict) -> List[Tuple[int, float]]:
+    """Translate the rate_limiting config section into (count, period) pairs"""
+    return [
+        (config.get("max_requests_per_minute", 60), 60.0),
+        (config.get("max_requests_per_hour", 1000), 3600.0)
+    ]
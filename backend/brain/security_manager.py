@@ -2,11 +2,17 @@
 Security Manager for ThinkxLife Brain
 """
 
-from typing import Dict, Any
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+import asyncio
 import logging
 import re
 
+from .audit_log import SecurityAuditLog
+from .input_sanitizer import sanitize_text
+from .metrics import MetricsRegistry, registry
+from .rate_limiter import GCRARateLimiter, SQLiteRateLimiter, rate_limits_from_config
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,7 +23,30 @@ class SecurityManager:
     
     def __init__(self, config: Dict[str, Any] = None):
         self.config = config or self._get_default_config()
-        self.rate_limits = {}  # user_id -> rate limit data
+        rate_config = self.config.get("rate_limiting", {})
+        # Per-IP limits are looser (several users may share an address) but cannot be
+        # dodged by sending a different user ID with every request
+        ip_multiplier = rate_config.get("ip_limit_multiplier", 5)
+        if rate_config.get("backend", "memory") == "sqlite":
+            # Shared by every worker process on the host
+            self.rate_limiter = SQLiteRateLimiter.from_config(rate_config, namespace="user")
+            self.ip_rate_limiter = SQLiteRateLimiter.from_config(rate_config, namespace="ip", multiplier=ip_multiplier)
+            # Checks may wait on the database's write lock; they run here, off the event loop
+            self._limit_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rate-limit")
+        else:
+            self.rate_limiter = GCRARateLimiter.from_config(rate_config)
+            self.ip_rate_limiter = GCRARateLimiter(
+                [(count * ip_multiplier, period) for count, period in rate_limits_from_config(rate_config)],
+                rate_config.get("max_tracked_users", 100000)
+            )
+            self._limit_executor = None
+        self.max_body_bytes = self.config.get("max_body_bytes", 64 * 1024)
+        # Tighter limits for specific paths, e.g. chat endpoints whose bodies are small
+        self.path_body_limits: Dict[str, int] = self.config.get("path_body_limits", {})
+        self.check_seconds = self._check_histogram(registry)
+        self.rejections: Dict[str, int] = {}
+        # Set by the application to move security logging off the request path
+        self.audit_log: Optional[SecurityAuditLog] = None
         self.blocked_words = self.config.get("content_filtering", {}).get("blocked_words", [])
         self.trauma_safe_mode = self.config.get("content_filtering", {}).get("trauma_safe_mode", True)
     
@@ -37,7 +66,12 @@ class SecurityManager:
             "user_validation": {
                 "require_auth": True,
                 "allow_anonymous": False
-            }
+            },
+            "input_limits": {
+                "max_chars": 10000,
+                "max_bytes": 40000
+            },
+            "max_body_bytes": 64 * 1024
         }
     
     def check_rate_limit(self, user_id: str) -> bool:
@@ -45,48 +79,76 @@ class SecurityManager:
         if not self.config.get("rate_limiting", {}).get("enabled", True):
             return True
         
-        now = datetime.now()
-        
-        if user_id not in self.rate_limits:
-            self.rate_limits[user_id] = {
-                "requests_this_minute": [],
-                "requests_this_hour": []
-            }
-        
-        user_limits = self.rate_limits[user_id]
-        
-        # Clean old requests
-        minute_ago = now - timedelta(minutes=1)
-        hour_ago = now - timedelta(hours=1)
-        
-        user_limits["requests_this_minute"] = [
-            req_time for req_time in user_limits["requests_this_minute"]
-            if req_time > minute_ago
-        ]
-        
-        user_limits["requests_this_hour"] = [
-            req_time for req_time in user_limits["requests_this_hour"]
-            if req_time > hour_ago
-        ]
-        
-        # Check limits
-        max_per_minute = self.config.get("rate_limiting", {}).get("max_requests_per_minute", 60)
-        max_per_hour = self.config.get("rate_limiting", {}).get("max_requests_per_hour", 1000)
-        
-        if len(user_limits["requests_this_minute"]) >= max_per_minute:
-            logger.warning(f"Rate limit exceeded for user {user_id}: {len(user_limits['requests_this_minute'])} requests per minute")
+        retry_after = self.rate_limiter.hit(user_id)
+        if retry_after:
+            self.log_security_event("rate_limit_exceeded", user_id, {"retry_after": round(retry_after, 1)})
             return False
         
-        if len(user_limits["requests_this_hour"]) >= max_per_hour:
-            logger.warning(f"Rate limit exceeded for user {user_id}: {len(user_limits['requests_this_hour'])} requests per hour")
-            return False
-        
-        # Record this request
-        user_limits["requests_this_minute"].append(now)
-        user_limits["requests_this_hour"].append(now)
-        
         return True
     
+    def check_request_limits(self, client_ip: Optional[str], user_id: Optional[str] = None) -> float:
+        """
+        Rate limit an incoming request by client address and, if known, user
+        
+        Returns:
+            0.0 if the request may proceed, otherwise seconds until it may
+        """
+        if not self.config.get("rate_limiting", {}).get("enabled", True):
+            return 0.0
+        
+        if client_ip:
+            retry_after = self.ip_rate_limiter.hit(client_ip)
+            if retry_after:
+                return retry_after
+        if user_id:
+            return self.rate_limiter.hit(user_id)
+        return 0.0
+    
+    async def check_request_limits_async(self, client_ip: Optional[str], user_id: Optional[str] = None) -> float:
+        """check_request_limits for the event loop: shared (SQLite) limiters run in a worker thread"""
+        if self._limit_executor is None:
+            return self.check_request_limits(client_ip, user_id)
+        return await asyncio.get_running_loop().run_in_executor(
+            self._limit_executor, self.check_request_limits, client_ip, user_id
+        )
+    
+    def record_check(self, check: str, seconds: float):
+        """Record how long a request-path security check took"""
+        self.check_seconds.observe(seconds, check)
+    
+    @staticmethod
+    def _check_histogram(metrics: MetricsRegistry):
+        """The security check latency histogram in a metrics registry"""
+        return metrics.histogram(
+            "thinkxlife_security_check_seconds",
+            "Request-path security check duration in seconds",
+            ("check",)
+        )
+    
+    def check_stats(self, metrics: Optional[MetricsRegistry] = None) -> Dict[str, Dict[str, float]]:
+        """Count, mean, percentiles and max of each check, from a (merged) registry or this worker's"""
+        histogram = self._check_histogram(metrics if metrics is not None else registry)
+        return {check: histogram.summary(data) for check, data in histogram.by_label("check").items()}
+    
+    def body_limit_for(self, path: str) -> int:
+        """Get the request body limit for a path (0 means unlimited)"""
+        return self.path_body_limits.get(path, self.max_body_bytes)
+    
+    def record_rejection(self, reason: str, subject: Optional[str] = None, details: Optional[Dict[str, Any]] = None):
+        """Count a request rejected by a security check and audit it"""
+        self.rejections[reason] = self.rejections.get(reason, 0) + 1
+        self.log_security_event(reason, subject, details or {})
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get rate limiter state, check timings and rejection counts"""
+        return {
+            "user_rate_limiter": self.rate_limiter.get_stats(),
+            "ip_rate_limiter": self.ip_rate_limiter.get_stats(),
+            "checks": self.check_stats(),
+            "rejections": dict(self.rejections),
+            "audit_log": self.audit_log.get_stats() if self.audit_log is not None else None
+        }
+    
     def filter_content(self, content: str) -> Dict[str, Any]:
         """Filter content for inappropriate material"""
         if not self.config.get("content_filtering", {}).get("enabled", True):
@@ -135,7 +197,7 @@ class SecurityManager:
         if config.get("require_auth", True):
             if not user_context.get("is_authenticated", False):
                 if not config.get("allow_anonymous", False):
-                    logger.warning("Authentication required but user not authenticated")
+                    self.log_security_event("authentication_required", user_context.get("user_id"), {})
                     return False
         
         # Additional validation logic can be added here
@@ -143,17 +205,17 @@ class SecurityManager:
     
     def sanitize_input(self, input_text: str) -> str:
         """Sanitize user input"""
-        # Remove potential script tags and other dangerous content
-        sanitized = re.sub(r'<script[^>]*>.*?</script>', '', input_text, flags=re.IGNORECASE | re.DOTALL)
-        sanitized = re.sub(r'<[^>]+>', '', sanitized)  # Remove HTML tags
-        
-        # Limit length
-        max_length = 10000
-        if len(sanitized) > max_length:
-            sanitized = sanitized[:max_length]
-        
-        return sanitized.strip()
+        # Truncate first, then strip script blocks and HTML tags in linear time
+        limits = self.config.get("input_limits", {})
+        return sanitize_text(
+            input_text,
+            max_chars=limits.get("max_chars", 10000),
+            max_bytes=limits.get("max_bytes", 40000)
+        )
     
-    def log_security_event(self, event_type: str, user_id: str, details: Dict[str, Any]):
+    def log_security_event(self, event_type: str, user_id: Optional[str], details: Dict[str, Any]):
         """Log security-related events"""
-        logger.warning(f"Security event: {event_type} for user {user_id}: {details}") 
\ No newline at end of file
+        if self.audit_log is not None:
+            self.audit_log.record(event_type, user_id, details)
+            return
+        logger.warning(f"Security event: {event_type} for user {user_id}: {details}")
@@ -0,0 +1,329 @@
+"""
+Shared Metrics for ThinkxLife Brain
+
+Combines the metrics of every worker process on a host. Each worker writes a
+snapshot of its registry to its own file in a shared directory at a fixed
+interval; reading merges the other workers' latest files with this worker's
+live registry. Workers never write to the same file and the request path is
+untouched, so no locks are needed there.
+
+Besides the registry, a snapshot carries named stats sections (token budgets,
+usage ledger, load shedding, security, slow requests): the dicts their
+get_stats() methods return. Sections are merged field by field: counters are
+summed, "*_max" fields take the maximum, "*_avg" fields are recomputed from
+the matching "*_total" and "count", gauges (GAUGE_KEYS) are summed over the
+live workers, and settings and per-process estimates (SETTING_KEYS, strings,
+flags) are this worker's own.
+
+Counters must never go down when a worker restarts, so a worker that stops
+folds its final counters into a retired base file (retired.json) that every
+reader adds in; the file of a worker that died without stopping is folded in
+by the first reader that finds it stale. Gauges are left out of the base. A
+worker that starts with no other worker running discards the base, so a full
+restart resets counters like a single process would. Folding takes a file
+lock, and only runs on POSIX systems; elsewhere stale files are skipped.
+
+The directory must be private to this user (0700, see ensure_private_dir) and
+files are created without following symlinks, so another local user can
+neither read the snapshots nor plant files that get folded in.
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+from .metrics import MetricsRegistry
+from .private_files import create_private_file, ensure_private_dir
+
+logger = logging.getLogger(__name__)
+
+FILE_PREFIX = "metrics-"
+FILE_SUFFIX = ".json"
+RETIRED_FILE = "retired.json"
+LOCK_FILE = "retired.lock"
+
+# Configuration and per-process estimates: reported as this worker's value
+SETTING_KEYS = frozenset({"max_keys", "max_entries", "threshold_ms", "short_rtt", "long_rtt"})
+# Current levels: summed over live workers, not kept for retired ones
+GAUGE_KEYS = frozenset({
+    "tracked_keys", "tracked_buckets", "pending_keys", "pending", "queued", "buffered", "in_flight", "limit"
+})
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def merge_stats(into: Dict[str, Any], other: Dict[str, Any]) -> Dict[str, Any]:
+    """Add another worker's stats section into `into`, in place"""
+    for key, value in other.items():
+        current = into.get(key)
+        if isinstance(value, dict):
+            if isinstance(current, dict):
+                merge_stats(current, value)
+            elif current is None:
+                into[key] = copy.deepcopy(value)
+        elif _is_number(value) and _is_number(current):
+            if key.endswith("_max"):
+                into[key] = max(current, value)
+            elif key not in SETTING_KEYS and not key.endswith("_avg"):
+                into[key] = current + value
+        elif key not in into:
+            into[key] = value
+    return into
+
+
+def recompute_averages(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Set each "x_avg" field to x_total / count after merging"""
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            recompute_averages(value)
+        elif key.endswith("_avg") and _is_number(stats.get(f"{key[:-4]}_total")) and _is_number(stats.get("count")):
+            stats[key] = stats[f"{key[:-4]}_total"] / stats["count"] if stats["count"] else 0.0
+    return stats
+
+
+def counters_only(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """The fields of a stats section that only ever grow"""
+    kept = {}
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            kept[key] = counters_only(value)
+        elif _is_number(value) and key not in SETTING_KEYS and key not in GAUGE_KEYS and not key.endswith("_avg"):
+            kept[key] = value
+    return kept
+
+
+class SharedMetrics:
+    """Periodic per-worker metric and stats snapshots merged on read"""
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        directory: str,
+        flush_interval: float = 5.0,
+        stale_after: Optional[float] = None
+    ):
+        self.registry = registry
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.stale_after = stale_after if stale_after is not None else max(30.0, flush_interval * 6)
+        self.path = os.path.join(directory, f"{FILE_PREFIX}{os.getpid()}{FILE_SUFFIX}")
+        self.sections: Dict[str, Callable[[], Optional[Dict[str, Any]]]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._write_future: Optional[asyncio.Future] = None
+        self.stats = {
+            "flushes": 0, "flush_errors": 0, "merges": 0, "skipped_files": 0, "retired_workers": 0, "workers": 1
+        }
+
+    def add_section(self, name: str, get_stats: Callable[[], Optional[Dict[str, Any]]]):
+        """Share a component's get_stats() output under `name`"""
+        self.sections[name] = get_stats
+
+    def start(self):
+        """Start writing snapshots on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop writing snapshots and fold this worker's counters into the retired base"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._write_future is not None:
+            # A cancelled flush leaves its thread running; let it finish before this file is retired
+            await asyncio.wait([self._write_future])
+        snapshot = self._snapshot()
+        try:
+            await asyncio.to_thread(self._retire_self, snapshot)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to retire metrics snapshot: {str(e)}")
+
+    async def _flush_loop(self):
+        try:
+            await asyncio.to_thread(self._reset_if_alone)
+        except OSError as e:
+            logger.error(f"Failed to check for other workers' metrics: {str(e)}")
+        while True:
+            await self.flush()
+            await asyncio.sleep(self.flush_interval)
+
+    def _snapshot(self) -> Dict[str, Any]:
+        """This worker's registry and sections; taken on the loop"""
+        sections = {}
+        for name, get_stats in self.sections.items():
+            stats = get_stats()
+            if stats is not None:
+                sections[name] = stats
+        return {
+            "pid": os.getpid(),
+            "written_at": time.time(),
+            "metrics": self.registry.snapshot(),
+            "sections": copy.deepcopy(sections)
+        }
+
+    async def flush(self):
+        """Write this worker's snapshot; the copy is taken on the loop, the write in a thread"""
+        snapshot = self._snapshot()
+        try:
+            self._write_future = asyncio.ensure_future(asyncio.to_thread(self._write, self.path, snapshot))
+            await asyncio.shield(self._write_future)
+            self.stats["flushes"] += 1
+        except OSError as e:
+            self.stats["flush_errors"] += 1
+            logger.error(f"Failed to write metrics snapshot: {str(e)}")
+
+    def _write(self, path: str, data: Dict[str, Any]):
+        ensure_private_dir(self.directory)
+        temp_path = f"{path}.tmp"
+        with create_private_file(temp_path, "wb") as f:
+            f.write(json.dumps(data).encode("utf-8"))
+        os.replace(temp_path, path)
+
+    def _lock(self):
+        """Exclusive lock on the retired base; a no-op without fcntl"""
+        ensure_private_dir(self.directory)
+        flags = os.O_CREAT | os.O_RDWR | getattr(os, "O_NOFOLLOW", 0)
+        lock = os.fdopen(os.open(os.path.join(self.directory, LOCK_FILE), flags, 0o600), "r+b")
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def _read_retired(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.directory, RETIRED_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"metrics": {}, "sections": {}, "workers": 0}
+
+    def _retire(self, snapshot: Dict[str, Any]):
+        """Add a finished worker's counters to the retired base; call with the lock held"""
+        retired = self._read_retired()
+        base = MetricsRegistry()
+        base.merge(retired["metrics"])
+        base.merge(snapshot.get("metrics", {}))
+        sections = retired["sections"]
+        for name, stats in snapshot.get("sections", {}).items():
+            merge_stats(sections.setdefault(name, {}), counters_only(stats))
+        self._write(os.path.join(self.directory, RETIRED_FILE), {
+            "metrics": base.snapshot(),
+            "sections": sections,
+            "workers": retired.get("workers", 0) + 1
+        })
+        self.stats["retired_workers"] += 1
+
+    def _retire_self(self, snapshot: Dict[str, Any]):
+        with self._lock():
+            self._retire(snapshot)
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def _retire_file(self, path: str, pid: Optional[int]):
+        """Fold in the file of a worker that exited without stopping, once"""
+        if fcntl is None or pid is None or _pid_alive(pid):
+            return
+        with self._lock():
+            try:
+                with open(path, encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except FileNotFoundError:
+                return  # Another reader folded it in first
+            self._retire(snapshot)
+            os.remove(path)
+        logger.info(f"Folded metrics of exited worker {pid} into the retired base")
+
+    def _reset_if_alone(self):
+        """Discard the retired base when no other worker is running"""
+        if not self._read_others()[0]:
+            with self._lock():
+                try:
+                    os.remove(os.path.join(self.directory, RETIRED_FILE))
+                except FileNotFoundError:
+                    pass
+
+    def _read_others(self) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Snapshots of the other live workers, and the retired base"""
+        snapshots = []
+        now = time.time()
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return snapshots, {}
+        for name in names:
+            if not (name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX)):
+                continue
+            path = os.path.join(self.directory, name)
+            if path == self.path:
+                continue
+            try:
+                if now - os.path.getmtime(path) > self.stale_after:
+                    self.stats["skipped_files"] += 1
+                    pid = name[len(FILE_PREFIX):-len(FILE_SUFFIX)]
+                    self._retire_file(path, int(pid) if pid.isdigit() else None)
+                    continue
+                with open(path, encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                self.stats["skipped_files"] += 1
+        try:
+            retired = self._read_retired()
+        except (OSError, ValueError):
+            retired = {}
+        return snapshots, retired
+
+    async def merged(self) -> MetricsRegistry:
+        """A registry combining this worker's live metrics with every other worker's latest snapshot"""
+        return (await self.merged_all())[0]
+
+    async def merged_all(self) -> Tuple[MetricsRegistry, Dict[str, Dict[str, Any]]]:
+        """The merged registry and stats sections of every worker, retired ones included"""
+        local = self._snapshot()
+        others, retired = await asyncio.to_thread(self._read_others)
+        combined = MetricsRegistry()
+        combined.merge(local["metrics"])
+        sections = local["sections"]
+        for snapshot in [retired, *others]:
+            try:
+                combined.merge(snapshot.get("metrics", {}))
+            except (KeyError, ValueError) as e:
+                # A worker running a different version; leave it out rather than fail
+                self.stats["skipped_files"] += 1
+                logger.warning(f"Skipping metrics snapshot from pid {snapshot.get('pid')}: {str(e)}")
+                continue
+            for name, stats in snapshot.get("sections", {}).items():
+                if name in sections:
+                    merge_stats(sections[name], stats)
+        for stats in sections.values():
+            recompute_averages(stats)
+        self.stats["merges"] += 1
+        self.stats["workers"] = 1 + len(others)
+        return combined, sections
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get shared metrics statistics"""
+        return {"directory": self.directory, "path": self.path, **self.stats}
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Exists, owned by someone else
+    return True
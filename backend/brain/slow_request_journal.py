@@ -0,0 +1,161 @@
+"""
+Slow Request Journal for ThinkxLife Brain
+
+Keeps a bounded ring buffer of Brain requests that took longer than a
+threshold, mirrored to a size-rotated JSONL file. Each entry has the request's
+stage timings, token counts, history length, application and provider status.
+
+Message content is never stored. Messages and user IDs are replaced by keyed
+BLAKE2 fingerprints, so repeats of the same slow message can be spotted
+without the text (healing-rooms conversations are sensitive). A fingerprint
+is only comparable between processes that share the same hash key.
+
+File writes go through a logging QueueListener thread, so the event loop
+never waits on disk.
+"""
+
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SlowRequestJournal:
+    """
+    Ring buffer and rotating file of slow Brain requests
+
+    Configuration:
+        enabled: Turn the journal on or off
+        threshold_ms: Requests slower than this are recorded
+        max_entries: Ring buffer size
+        path: JSONL file mirroring the buffer (optional)
+        max_file_bytes / backup_count: File rotation
+        hash_key: Key for message and user fingerprints; random per process
+            unless set
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = 2000.0,
+        max_entries: int = 500,
+        path: Optional[str] = None,
+        max_file_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 3,
+        hash_key: Optional[str] = None
+    ):
+        self.threshold = threshold_ms / 1000.0
+        self.entries: deque = deque(maxlen=max_entries)
+        self.path = path
+        self._hash_key = hash_key.encode("utf-8") if hash_key else os.urandom(16)
+        self.stats = {"recorded": 0}
+
+        self._file_logger: Optional[logging.Logger] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_file_bytes, backupCount=backup_count, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            records: queue.Queue = queue.Queue()
+            self._listener = logging.handlers.QueueListener(records, handler)
+            self._listener.start()
+
+            self._file_logger = logging.getLogger(f"thinkxlife.slow_requests.{id(self)}")
+            self._file_logger.propagate = False
+            self._file_logger.setLevel(logging.INFO)
+            self._file_logger.addHandler(logging.handlers.QueueHandler(records))
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> Optional["SlowRequestJournal"]:
+        """Create a journal from the Brain's "slow_request_journal" config, or None if disabled"""
+        config = config or {}
+        if not config.get("enabled", True):
+            return None
+        return cls(
+            threshold_ms=config.get("threshold_ms", 2000.0),
+            max_entries=config.get("max_entries", 500),
+            path=config.get("path"),
+            max_file_bytes=config.get("max_file_bytes", 10 * 1024 * 1024),
+            backup_count=config.get("backup_count", 3),
+            hash_key=config.get("hash_key")
+        )
+
+    def fingerprint(self, text: str) -> str:
+        """Keyed hash of a message or identifier"""
+        return hashlib.blake2b(text.encode("utf-8"), key=self._hash_key, digest_size=8).hexdigest()
+
+    def is_slow(self, seconds: float) -> bool:
+        return seconds >= self.threshold
+
+    def record(self, seconds: float, request_data: Dict[str, Any], fields: Dict[str, Any], spans: List[Dict[str, Any]]):
+        """
+        Record a slow request
+
+        Args:
+            seconds: Request duration
+            request_data: The Brain request; only lengths and fingerprints are kept
+            fields: Outcome details (application, provider, status, tokens...)
+            spans: Stage timings from the request's trace
+        """
+        message = request_data.get("message") or ""
+        user_context = request_data.get("user_context") or {}
+        user_id = request_data.get("user_id")
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "duration_ms": round(seconds * 1000, 3),
+            **fields,
+            "message_hash": self.fingerprint(message),
+            "message_chars": len(message),
+            "history_length": len(user_context.get("conversation_history") or ()),
+            "has_summary": bool(user_context.get("conversation_summary")),
+            "user_hash": self.fingerprint(user_id) if user_id else None,
+            "spans": spans
+        }
+        self.entries.append(entry)
+        self.stats["recorded"] += 1
+        if self._file_logger is not None:
+            self._file_logger.info(json.dumps(entry, default=str))
+
+    def query(
+        self,
+        limit: int = 50,
+        application: Optional[str] = None,
+        min_ms: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Newest entries first, optionally filtered by application and duration"""
+        results = []
+        for entry in reversed(self.entries):
+            if application and entry.get("application") != application:
+                continue
+            if min_ms is not None and entry["duration_ms"] < min_ms:
+                continue
+            results.append(entry)
+            if len(results) >= limit:
+                break
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get journal statistics"""
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "buffered": len(self.entries),
+            "max_entries": self.entries.maxlen,
+            "path": self.path,
+            **self.stats
+        }
+
+    def close(self):
+        """Flush and stop the file writer thread"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
@@ -0,0 +1,213 @@
+"""
+Token Budgets for ThinkxLife Brain
+
+Limits LLM spend per user and per application in tokens per minute and per
+day. Each budget is a token bucket that refills continuously, so a user who
+spent their minute budget regains it gradually rather than all at once.
+
+Requests reserve their estimated cost before the provider call and settle the
+actual usage afterwards. A request that does not fit a budget is degraded
+(smaller model, shorter history, shorter answer) rather than rejected, and
+reserves only the tokens its buckets have left. Buckets go into debt only
+when settled usage exceeds what was reserved, and only a bucket that is
+already deep in debt rejects outright.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60.0
+DAY = 86400.0
+
+
+@dataclass
+class TokenReservation:
+    """Tokens held for an in-flight request, released by TokenBudgetManager.settle"""
+    buckets: List[Tuple[str, str]]  # (scope, key) pairs charged
+    reserved_tokens: int
+    degraded: bool = False
+    rejected: bool = False
+    overrides: Dict[str, Any] = field(default_factory=dict)
+    settled: bool = False
+
+
+class TokenBudgetManager:
+    """
+    Per-user and per-application token buckets with reserve/settle accounting
+
+    Configuration:
+        enabled: Turn budgets on or off
+        user: {"tokens_per_minute", "tokens_per_day"} applied to every user
+        applications: {application: {"tokens_per_minute", "tokens_per_day"}};
+            the "default" entry applies to applications without their own
+        degraded: Overrides used for over-budget requests
+            ({"model", "history_limit", "max_tokens"})
+        reject_debt_factor: Reject once a bucket owes more than this many
+            times its capacity (default 2.0)
+        expected_completion_tokens: Completion size assumed when estimating
+        max_keys: Maximum number of tracked buckets
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, clock: Callable[[], float] = time.monotonic):
+        self.config = config or {}
+        self.enabled = self.config.get("enabled", True)
+        self.user_limits = self._windows(self.config.get("user", {"tokens_per_minute": 20000, "tokens_per_day": 500000}))
+        self.application_limits = {
+            application: self._windows(limits)
+            for application, limits in self.config.get("applications", {}).items()
+        }
+        self.degraded_overrides = self.config.get("degraded", {"history_limit": 4, "max_tokens": 300})
+        self.reject_debt_factor = self.config.get("reject_debt_factor", 2.0)
+        self.expected_completion_tokens = self.config.get("expected_completion_tokens", 300)
+        self.max_keys = self.config.get("max_keys", 100000)
+        self.clock = clock
+
+        # (scope, key) -> [level per window..., last_refill]; LRU order
+        self._buckets: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self.stats = {
+            "reservations": 0,
+            "degraded": 0,
+            "rejected": 0,
+            "reserved_tokens": 0,
+            "settled_tokens": 0,
+            "refunded_tokens": 0
+        }
+
+    @staticmethod
+    def _windows(limits: Dict[str, Any]) -> List[Tuple[str, float, float]]:
+        """Translate a budget config into (name, capacity, refill per second) windows"""
+        windows = []
+        if limits.get("tokens_per_minute"):
+            windows.append(("per_minute", float(limits["tokens_per_minute"]), limits["tokens_per_minute"] / MINUTE))
+        if limits.get("tokens_per_day"):
+            windows.append(("per_day", float(limits["tokens_per_day"]), limits["tokens_per_day"] / DAY))
+        return windows
+
+    def estimate_tokens(self, request_data: Dict[str, Any], history_limit: int = 10, max_tokens: Optional[int] = None) -> int:
+        """Estimate the cost of a Brain request at about four characters per token"""
+        user_context = request_data.get("user_context") or {}
+        history = (user_context.get("conversation_history") or [])[-history_limit:] if history_limit else []
+        prompt_chars = len(request_data.get("message", "")) + len(user_context.get("conversation_summary") or "")
+        prompt_chars += sum(len(msg.get("content", "")) for msg in history)
+        completion = self.expected_completion_tokens if max_tokens is None else min(max_tokens, self.expected_completion_tokens)
+        # System prompts are around 300 tokens
+        return 300 + prompt_chars // 4 + completion
+
+    def reserve(self, user_id: Optional[str], application: str, request_data: Dict[str, Any]) -> TokenReservation:
+        """
+        Reserve the estimated cost of a request against its budgets
+
+        Returns:
+            Reservation; check `rejected`, and apply `overrides` if `degraded`
+        """
+        buckets = self._bucket_keys(user_id, application) if self.enabled else []
+        if not buckets:
+            return TokenReservation(buckets=[], reserved_tokens=0)
+
+        estimate = self.estimate_tokens(request_data)
+        now = self.clock()
+        levels = [self._refill(bucket, now) for bucket in buckets]
+
+        self.stats["reservations"] += 1
+        if any(
+            level < -capacity * self.reject_debt_factor
+            for bucket, bucket_levels in zip(buckets, levels)
+            for level, (_, capacity, _) in zip(bucket_levels, self._limits_for(bucket))
+        ):
+            self.stats["rejected"] += 1
+            return TokenReservation(buckets=[], reserved_tokens=0, rejected=True)
+
+        reservation = TokenReservation(buckets=buckets, reserved_tokens=estimate)
+        available = min((level for bucket_levels in levels for level in bucket_levels), default=estimate)
+        if available < estimate:
+            overrides = self.degraded_overrides
+            reservation.degraded = True
+            reservation.overrides = dict(overrides)
+            degraded_estimate = self.estimate_tokens(
+                request_data, overrides.get("history_limit", 10), overrides.get("max_tokens")
+            )
+            # Only what fits is held; usage beyond it is charged at settle time
+            reservation.reserved_tokens = max(0, min(degraded_estimate, int(available)))
+            self.stats["degraded"] += 1
+
+        for bucket in buckets:
+            self._charge(bucket, reservation.reserved_tokens)
+        self.stats["reserved_tokens"] += reservation.reserved_tokens
+        return reservation
+
+    def settle(self, reservation: TokenReservation, actual_tokens: Optional[int]):
+        """
+        Replace a reservation's estimate with the tokens actually used
+
+        Pass 0 for failed calls to refund the whole reservation; None (usage
+        unknown) keeps the estimate.
+        """
+        if reservation.settled or not reservation.buckets:
+            return
+        reservation.settled = True
+
+        if actual_tokens is None:
+            actual_tokens = reservation.reserved_tokens
+        delta = actual_tokens - reservation.reserved_tokens
+        for bucket in reservation.buckets:
+            if bucket in self._buckets:
+                self._charge(bucket, delta)
+
+        self.stats["settled_tokens"] += actual_tokens
+        if delta < 0:
+            self.stats["refunded_tokens"] -= delta
+
+    def _bucket_keys(self, user_id: Optional[str], application: str) -> List[Tuple[str, str]]:
+        buckets = []
+        if user_id and user_id != "anonymous" and self.user_limits:
+            buckets.append(("user", user_id))
+        if application in self.application_limits or "default" in self.application_limits:
+            buckets.append(("application", application))
+        return buckets
+
+    def _limits_for(self, bucket: Tuple[str, str]) -> List[Tuple[str, float, float]]:
+        scope, key = bucket
+        if scope == "user":
+            return self.user_limits
+        return self.application_limits.get(key) or self.application_limits.get("default", [])
+
+    def _refill(self, bucket: Tuple[str, str], now: float) -> List[float]:
+        """Bring a bucket's levels up to date and return them"""
+        limits = self._limits_for(bucket)
+        state = self._buckets.get(bucket)
+        if state is None:
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.popitem(last=False)
+            state = self._buckets[bucket] = [capacity for _, capacity, _ in limits] + [now]
+        else:
+            self._buckets.move_to_end(bucket)
+            elapsed = now - state[-1]
+            for i, (_, capacity, rate) in enumerate(limits):
+                state[i] = min(capacity, state[i] + elapsed * rate)
+            state[-1] = now
+        return state[:-1]
+
+    def _charge(self, bucket: Tuple[str, str], tokens: int):
+        state = self._buckets[bucket]
+        for i in range(len(state) - 1):
+            state[i] -= tokens
+
+    def get_remaining(self, user_id: Optional[str], application: str) -> Dict[str, Any]:
+        """Get the remaining tokens in each window for a user and application"""
+        now = self.clock()
+        remaining = {}
+        for bucket in self._bucket_keys(user_id, application):
+            levels = self._refill(bucket, now)
+            remaining[f"{bucket[0]}:{bucket[1]}"] = {
+                name: int(level) for (name, _, _), level in zip(self._limits_for(bucket), levels)
+            }
+        return remaining
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get budget statistics"""
+        return {"enabled": self.enabled, "tracked_buckets": len(self._buckets), **self.stats}
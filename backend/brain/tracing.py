@@ -0,0 +1,177 @@
+"""
+Request Tracing for ThinkxLife Brain
+
+Lightweight per-stage timing spans. A trace is started for a sampled request
+and kept in a contextvar, so code anywhere below the request (Zoe, the Brain,
+providers, TTS) can time a stage with:
+
+    with span("brain"):
+        ...
+
+without the trace being passed around. When the request is not sampled, or
+tracing is off, span() costs one contextvar lookup and returns a shared no-op.
+A StageTimer in place of a trace records spans the same way but has no trace
+ID and emits nothing; the slow request journal uses one for unsampled Brain
+requests. Spans use the monotonic perf_counter clock.
+"""
+
+import json
+import logging
+import random
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Structured span records go to their own logger so they can be routed separately
+span_logger = logging.getLogger("thinkxlife.trace")
+
+_current_trace: ContextVar[Optional["StageTimer"]] = ContextVar("thinkxlife_trace", default=None)
+
+
+class StageTimer:
+    """Stage durations for one request"""
+
+    __slots__ = ("start", "spans")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: List[Tuple[str, float, float]] = []  # (name, offset, duration) in seconds
+
+    def add(self, name: str, start: float, duration: float):
+        self.spans.append((name, start - self.start, duration))
+
+    def span_records(self) -> List[Dict[str, Any]]:
+        """Spans as dicts with offsets and durations in ms"""
+        return [
+            {"name": name, "offset_ms": round(offset * 1000, 3), "duration_ms": round(duration * 1000, 3)}
+            for name, offset, duration in self.spans
+        ]
+
+
+class Trace(StageTimer):
+    """Spans recorded for one sampled request"""
+
+    __slots__ = ("trace_id", "name")
+
+    def __init__(self, name: str):
+        super().__init__()
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+
+    def server_timing(self) -> str:
+        """Format the spans as a Server-Timing header value (durations in ms)"""
+        entries = [f"{name};dur={duration * 1000:.1f}" for name, _, duration in self.spans]
+        entries.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(entries)
+
+    def to_record(self, **fields: Any) -> Dict[str, Any]:
+        """Structured record of the trace and its spans (times in ms)"""
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "duration_ms": round((time.perf_counter() - self.start) * 1000, 3),
+            **fields,
+            "spans": self.span_records()
+        }
+
+
+class _Span:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace: StageTimer, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.trace.add(self.name, self.start, time.perf_counter() - self.start)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str):
+    """Time a stage of the current request; a no-op when it is not traced"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, name)
+
+
+def current_trace() -> Optional[StageTimer]:
+    """The trace (or stage timer) of the current request, if any"""
+    return _current_trace.get()
+
+
+def begin_trace(name: str):
+    """Unconditionally start a trace for the current context; returns (trace, token)"""
+    trace = Trace(name)
+    return trace, _current_trace.set(trace)
+
+
+def begin_stage_timer():
+    """Time stages of the current context without tracing it; returns (timer, token)"""
+    timer = StageTimer()
+    return timer, _current_trace.set(timer)
+
+
+def end_trace(token):
+    """Detach a trace or stage timer from the current context"""
+    _current_trace.reset(token)
+
+
+class Tracer:
+    """
+    Sampling decision and span record output
+
+    Configuration:
+        sample_rate: Fraction of requests traced (0 disables tracing)
+        log_spans: Write a structured JSON record per trace to the
+            "thinkxlife.trace" logger
+    """
+
+    def __init__(self, sample_rate: float = 0.0, log_spans: bool = True):
+        self.sample_rate = sample_rate
+        self.log_spans = log_spans
+        self.stats = {"traced": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def start(self, name: str):
+        """
+        Start a trace for the current context if the request is sampled
+
+        Returns:
+            (trace, token) to pass to finish(), or (None, None)
+        """
+        if self.sample_rate <= 0 or (self.sample_rate < 1 and random.random() >= self.sample_rate):
+            return None, None
+        return begin_trace(name)
+
+    def finish(self, trace: Optional[Trace], token, **fields: Any):
+        """End a trace started by start() and emit its span record"""
+        if trace is None:
+            return
+        end_trace(token)
+        self.stats["traced"] += 1
+        if self.log_spans and span_logger.isEnabledFor(logging.INFO):
+            span_logger.info(json.dumps(trace.to_record(**fields)))
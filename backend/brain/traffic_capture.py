@@ -0,0 +1,244 @@
+"""
+Traffic Capture for ThinkxLife Brain
+
+Records the shape of chat and Brain traffic so it can be replayed as a
+benchmark workload: when each request arrived, which endpoint and application
+it used, how long the message was, which conversation it continued and
+whether avatar mode (TTS) was on, and the HTTP status it got. Message text,
+user IDs and session IDs are never written; sessions are numbered in order of
+first appearance, which is all a replay needs for continuity.
+
+Events are buffered in memory and appended by a background task in a worker
+thread to a gzip file of JSON lines: a header object, then one compact array
+per request (see FIELDS). Each flush appends a gzip member, which gzip readers
+treat as one continuous stream.
+
+Each worker process writes its own file (capture_path_for_worker); use
+read_captures to read the files of several workers as one workload.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FORMAT = "thinkxlife-traffic"
+VERSION = 2
+
+# Order of values in each event array; version 1 files have no "status"
+FIELDS = ("t_ms", "endpoint", "application", "message_chars", "session", "new_session", "avatar_mode", "status")
+
+
+def capture_path_for_worker(path: str, pid: int) -> str:
+    """
+    The capture file of one worker process
+
+    "{pid}" in the path is replaced by the process ID; a path without it gets
+    the ID before its extensions ("logs/traffic.jsonl.gz" becomes
+    "logs/traffic.<pid>.jsonl.gz"), so workers never append to one file.
+    """
+    if "{pid}" not in path:
+        directory, name = os.path.split(path)
+        stem, dot, extensions = name.partition(".")
+        path = os.path.join(directory, f"{stem}.{{pid}}{dot}{extensions}")
+    return path.format(pid=pid)
+
+
+class TrafficCapture:
+    """
+    Anonymized request shapes written to a compact replay file
+
+    Configuration:
+        path: Capture file (gzip JSON lines); capture is off without one
+        flush_interval: Seconds between background flushes
+        max_sessions: Session IDs remembered for numbering; older ones get a
+            new number if they return
+    """
+
+    def __init__(self, path: str, flush_interval: float = 5.0, max_sessions: int = 100000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_sessions = max_sessions
+        self.started = time.monotonic()
+        self.started_at = datetime.now().isoformat()
+
+        self._sessions: "OrderedDict[str, int]" = OrderedDict()
+        self._next_session = 0
+        self._pending: List[list] = []
+        self._header_written = False
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"recorded": 0, "flushes": 0, "flush_errors": 0}
+
+    def record(
+        self,
+        endpoint: str,
+        application: str,
+        message: Optional[str],
+        arrived: float,
+        session_id: Optional[str] = None,
+        new_session: bool = False,
+        avatar_mode: bool = False,
+        status: int = 200
+    ):
+        """
+        Record one finished request, whether or not it succeeded
+
+        Args:
+            endpoint: Short endpoint name ("zoe", "chat", "brain")
+            application: Brain application
+            message: Only its length is kept
+            arrived: time.monotonic() when the request arrived
+            session_id: Conversation the request belonged to, if any
+            new_session: The request started that conversation
+            avatar_mode: TTS audio was requested
+            status: HTTP status of the response (503 when shed, 500 on errors)
+        """
+        self._pending.append([
+            round((arrived - self.started) * 1000),
+            endpoint,
+            application,
+            len(message or ""),
+            self._session_number(session_id) if session_id else None,
+            int(new_session),
+            int(bool(avatar_mode)),
+            status
+        ])
+        self.stats["recorded"] += 1
+
+    def _session_number(self, session_id: str) -> int:
+        number = self._sessions.get(session_id)
+        if number is None:
+            number = self._sessions[session_id] = self._next_session
+            self._next_session += 1
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return number
+
+    def start(self):
+        """Start periodic flushing on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop periodic flushing and write what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Append buffered events to the capture file in a worker thread"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        try:
+            await asyncio.to_thread(self._write, pending)
+            self.stats["flushes"] += 1
+        except OSError as e:
+            self._pending[:0] = pending
+            self.stats["flush_errors"] += 1
+            logger.error(f"Failed to write traffic capture: {str(e)}")
+
+    def _write(self, events: List[list]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lines = []
+        if not self._header_written:
+            lines.append(json.dumps({
+                "format": FORMAT,
+                "version": VERSION,
+                "fields": FIELDS,
+                "started_at": self.started_at
+            }))
+        lines.extend(json.dumps(event, separators=(",", ":")) for event in events)
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        self._header_written = True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get capture statistics"""
+        return {"path": self.path, "pending": len(self._pending), "sessions": self._next_session, **self.stats}
+
+
+def read_capture(path: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Read a capture file
+
+    Returns:
+        (headers, events); a file holds one header per capture run appended to
+        it, and each event is a dict keyed by FIELDS plus "run", the index of
+        its header. Events are sorted by run and arrival time. Fields a file's
+        version lacks are None.
+    """
+    headers: List[Dict[str, Any]] = []
+    events: List[Dict[str, Any]] = []
+    for item in _iter_lines(path):
+        if isinstance(item, dict):
+            if item.get("format") != FORMAT:
+                raise ValueError(f"{path} is not a traffic capture")
+            headers.append(item)
+            continue
+        event = dict.fromkeys(FIELDS)
+        event.update(zip(headers[-1]["fields"] if headers else FIELDS, item))
+        event["run"] = len(headers) - 1
+        events.append(event)
+    events.sort(key=lambda event: (event["run"], event["t_ms"]))
+    return headers, events
+
+
+def read_captures(paths: List[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Read the capture files of several workers as one workload
+
+    Runs are numbered across all files in the order given, so each run's
+    session numbers stay apart. Each header gets "start_ms", the start of its
+    run on a common clock (from its "started_at"), for lining up the runs of
+    workers that captured side by side.
+    """
+    headers: List[Dict[str, Any]] = []
+    events: List[Dict[str, Any]] = []
+    for path in paths:
+        file_headers, file_events = read_capture(path)
+        for event in file_events:
+            event["run"] += len(headers)
+        headers.extend(file_headers)
+        events.extend(file_events)
+
+    starts = []
+    for header in headers:
+        try:
+            starts.append(datetime.fromisoformat(header["started_at"]).timestamp() * 1000)
+        except (KeyError, TypeError, ValueError):
+            starts.append(None)
+    known = [start for start in starts if start is not None]
+    origin = min(known) if known else 0
+    for header, start in zip(headers, starts):
+        header["start_ms"] = round(start - origin) if start is not None else None
+    events.sort(key=lambda event: (event["run"], event["t_ms"]))
+    return headers, events
+
+
+def _iter_lines(path: str) -> Iterator[Any]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,240 @@
+"""
+Usage Ledger for ThinkxLife Brain
+
+Records prompt and completion tokens for every provider call, aggregated in
+memory per (UTC day, user, application, model) and flushed periodically to a
+local SQLite file by a background task. Aggregation keeps the request path to
+a dict update and the file to one row per key per day, however busy the day.
+
+Cost estimates come from a configurable price table in US dollars per million
+tokens, applied when the ledger is queried so price changes apply to history.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# USD per million tokens
+DEFAULT_PRICES = {
+    "gpt-4o-mini": {"prompt": 0.15, "completion": 0.60},
+    "gpt-4o": {"prompt": 2.50, "completion": 10.00},
+    "local-stand-in": {"prompt": 0.0, "completion": 0.0}
+}
+
+GROUP_FIELDS = ("day", "user_id", "application", "model")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    day TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    application TEXT NOT NULL,
+    model TEXT NOT NULL,
+    requests INTEGER NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    PRIMARY KEY (day, user_id, application, model)
+)
+"""
+
+_UPSERT = """
+INSERT INTO usage (day, user_id, application, model, requests, prompt_tokens, completion_tokens)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (day, user_id, application, model) DO UPDATE SET
+    requests = requests + excluded.requests,
+    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+    completion_tokens = completion_tokens + excluded.completion_tokens
+"""
+
+UsageKey = Tuple[str, str, str, str]
+
+
+class UsageLedger:
+    """
+    Token usage per day, user, application and model
+
+    Configuration:
+        enabled: Turn the ledger on or off
+        path: SQLite file
+        flush_interval: Seconds between background flushes
+        prices: {model: {"prompt", "completion"}} in USD per million tokens,
+            merged over DEFAULT_PRICES
+    """
+
+    def __init__(self, path: str, flush_interval: float = 30.0, prices: Optional[Dict[str, Dict[str, float]]] = None):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.prices = {**DEFAULT_PRICES, **(prices or {})}
+
+        # key -> [requests, prompt_tokens, completion_tokens] not yet flushed
+        self._pending: Dict[UsageKey, List[int]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"recorded": 0, "flushes": 0, "flushed_rows": 0, "flush_errors": 0}
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> Optional["UsageLedger"]:
+        """Create a ledger from the Brain's "usage_ledger" config, or None if disabled"""
+        config = config or {}
+        if not config.get("enabled", True) or not config.get("path"):
+            return None
+        return cls(config["path"], config.get("flush_interval", 30.0), config.get("prices"))
+
+    def record(
+        self,
+        user_id: Optional[str],
+        application: str,
+        model: Optional[str],
+        prompt_tokens: Optional[int],
+        completion_tokens: Optional[int]
+    ):
+        """Add one provider call's usage to today's totals"""
+        day = datetime.now(timezone.utc).date().isoformat()
+        key = (day, user_id or "anonymous", application, model or "unknown")
+        totals = self._pending.get(key)
+        if totals is None:
+            totals = self._pending[key] = [0, 0, 0]
+        totals[0] += 1
+        totals[1] += prompt_tokens or 0
+        totals[2] += completion_tokens or 0
+        self.stats["recorded"] += 1
+
+    def start(self):
+        """Start periodic flushing on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop periodic flushing and write what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                # flush() keeps what it could not write; stay alive for the next attempt
+                logger.error(f"Usage ledger flush failed: {str(e)}")
+
+    async def flush(self):
+        """Write pending totals to SQLite in a worker thread"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            await asyncio.to_thread(self._write, pending)
+            self.stats["flushes"] += 1
+            self.stats["flushed_rows"] += len(pending)
+        except (sqlite3.Error, OSError) as e:
+            # Keep the totals for the next attempt, merged with anything recorded meanwhile
+            for key, values in pending.items():
+                totals = self._pending.setdefault(key, [0, 0, 0])
+                for i, value in enumerate(values):
+                    totals[i] += value
+            self.stats["flush_errors"] += 1
+            logger.error(f"Failed to flush usage ledger: {str(e)}")
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        conn.execute(_SCHEMA)
+        return conn
+
+    def _write(self, pending: Dict[UsageKey, List[int]]):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(_UPSERT, [(*key, *values) for key, values in pending.items()])
+        finally:
+            conn.close()
+
+    def query(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        user_id: Optional[str] = None,
+        application: Optional[str] = None,
+        group_by: Iterable[str] = ("application", "model")
+    ) -> Dict[str, Any]:
+        """
+        Sum flushed usage over a range of days (inclusive, YYYY-MM-DD)
+
+        Returns:
+            {"rows": [...], "totals": {...}}; each row holds the group_by
+            fields, requests, token counts and estimated_cost_usd (None for
+            models missing from the price table)
+        """
+        group_by = [field for field in group_by if field in GROUP_FIELDS]
+        conditions, params = [], []
+        for column, operator, value in (
+            ("day", ">=", since), ("day", "<=", until),
+            ("user_id", "=", user_id), ("application", "=", application)
+        ):
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                params.append(value)
+
+        # Always group by model internally so each row can be priced
+        columns = list(dict.fromkeys(group_by + ["model"]))
+        sql = (
+            f"SELECT {', '.join(columns)}, SUM(requests), SUM(prompt_tokens), SUM(completion_tokens) FROM usage"
+            + (f" WHERE {' AND '.join(conditions)}" if conditions else "")
+            + f" GROUP BY {', '.join(columns)}"
+        )
+        conn = self._connect()
+        try:
+            fetched = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+        rows: Dict[Tuple, Dict[str, Any]] = {}
+        totals = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "estimated_cost_usd": 0.0}
+        for values in fetched:
+            fields = dict(zip(columns, values[:len(columns)]))
+            requests, prompt_tokens, completion_tokens = values[len(columns):]
+            cost = self.estimate_cost(fields["model"], prompt_tokens, completion_tokens)
+
+            key = tuple(fields[field] for field in group_by)
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = {
+                    **{field: fields[field] for field in group_by},
+                    "requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "estimated_cost_usd": 0.0
+                }
+            row["requests"] += requests
+            row["prompt_tokens"] += prompt_tokens
+            row["completion_tokens"] += completion_tokens
+            for target in (row, totals):
+                if cost is None or target["estimated_cost_usd"] is None:
+                    target["estimated_cost_usd"] = None
+                else:
+                    target["estimated_cost_usd"] += cost
+            totals["requests"] += requests
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+
+        return {"rows": list(rows.values()), "totals": totals}
+
+    def estimate_cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+        """Estimated cost in USD, or None when the model has no price"""
+        price = self.prices.get(model)
+        if price is None:
+            return None
+        return (prompt_tokens * price.get("prompt", 0.0) + completion_tokens * price.get("completion", 0.0)) / 1_000_000
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get ledger statistics"""
+        return {"path": self.path, "pending_keys": len(self._pending), **self.stats}
@@ -5,16 +5,20 @@ This is the main FastAPI application that integrates the ThinkxLife Brain
 system with existing chatbot functionality.
 """
 
+import asyncio
+import json
 import logging
 import os
+import time
 from contextlib import asynccontextmanager
-from datetime import datetime
-from typing import Dict, Any, Optional
+from datetime import date, datetime
+from typing import Dict, Any, Optional, Tuple
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
 
 # Load environment variables
 load_dotenv()
@@ -25,9 +29,21 @@ logger = logging.getLogger(__name__)
 
 # Import Brain system
 from brain import ThinkxLifeBrain
+from brain.audit_log import SecurityAuditLog
+from brain.load_shedder import LoadLevel, OverloadedError
+from brain.loop_monitor import LoopMonitor
+from brain.metrics import registry as metrics_registry
+from brain.profiler import ProfilerBusyError, SamplingProfiler, collapsed_text, top_functions, write_collapsed
+from brain.security_manager import SecurityManager
+from brain.shared_metrics import SharedMetrics
+from brain.tracing import Tracer
+from brain.traffic_capture import TrafficCapture, capture_path_for_worker
+from security_middleware import SecurityMiddleware
+from tracing_middleware import TracingMiddleware
 
 # Import Zoe AI Companion
 from zoe import ZoeCore
+from zoe.conversation_export import export_records, iter_manager_sessions, iter_ndjson
 
 # Import TTS Service
 from tts_service import tts_service
@@ -36,6 +52,111 @@ from tts_service import tts_service
 brain_instance = None
 zoe_instance = None
 
+# Shard worker mode (see shard_dispatcher.py)
+SHARD_WORKER = os.getenv("ZOE_SHARD_WORKER", "false").lower() == "true"
+SHARD_TOKEN = os.getenv("ZOE_SHARD_TOKEN")
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+
+# Rate limits and body size are enforced in middleware, before FastAPI parses requests
+security_manager = SecurityManager({
+    "rate_limiting": {
+        "enabled": os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true",
+        "max_requests_per_minute": int(os.getenv("RATE_LIMIT_PER_MINUTE", "60")),
+        "max_requests_per_hour": int(os.getenv("RATE_LIMIT_PER_HOUR", "1000")),
+        "ip_limit_multiplier": int(os.getenv("RATE_LIMIT_IP_MULTIPLIER", "5")),
+        # Shard workers on one host share limits through SQLite so N workers don't allow N times the rate
+        "backend": os.getenv("RATE_LIMIT_BACKEND", "sqlite" if SHARD_WORKER else "memory"),
+        # Kept in the application's own directory, not world-writable /tmp, so other
+        # local users cannot pre-create the file or change its counts
+        "sqlite_path": os.getenv("RATE_LIMIT_SQLITE_PATH", "logs/rate_limits.sqlite3")
+    },
+    "content_filtering": {
+        "enabled": True,
+        "blocked_words": [],
+        "trauma_safe_mode": True
+    },
+    "user_validation": {
+        "require_auth": True,
+        "allow_anonymous": False
+    },
+    "max_body_bytes": int(os.getenv("MAX_REQUEST_BODY_BYTES", str(64 * 1024))),
+    # A chat body is one message of at most 10,000 characters plus the user context
+    "path_body_limits": {
+        path: int(os.getenv("CHAT_MAX_BODY_BYTES", str(48 * 1024)))
+        for path in ("/api/zoe/chat", "/api/chat")
+    }
+})
+
+# Security events are written in batches by a background task instead of logged inline.
+# "{pid}" gives each worker process its own file; workers must not share a rotating file
+SECURITY_AUDIT_LOG_PATH = os.getenv(
+    "SECURITY_AUDIT_LOG_PATH", "logs/security_audit.{pid}.jsonl"
+).format(pid=os.getpid())
+if SECURITY_AUDIT_LOG_PATH:
+    security_manager.audit_log = SecurityAuditLog(
+        SECURITY_AUDIT_LOG_PATH,
+        max_file_bytes=int(os.getenv("SECURITY_AUDIT_LOG_MAX_MB", "10")) * 1024 * 1024,
+        backup_count=int(os.getenv("SECURITY_AUDIT_LOG_BACKUPS", "5"))
+    )
+
+
+# On-demand sampling profiler for admins; off unless PROFILER_ENABLED=true
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+PROFILER_OUTPUT_DIR = os.getenv("PROFILER_OUTPUT_DIR", "logs/profiles")
+profiler = SamplingProfiler(max_duration=float(os.getenv("PROFILER_MAX_SECONDS", "60")))
+
+# Per-stage span tracing; TRACE_SAMPLE_RATE=0 leaves it off entirely
+tracer = Tracer(
+    sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "0")),
+    log_spans=os.getenv("TRACE_LOG_SPANS", "true").lower() == "true"
+)
+
+# Metrics shared between worker processes on one host through per-worker snapshot
+# files in a private (0700) directory; on by default for shard workers, otherwise
+# only when METRICS_SHARED_DIR is set
+METRICS_SHARED_DIR = os.getenv("METRICS_SHARED_DIR", "logs/shared_metrics" if SHARD_WORKER else "")
+shared_metrics = SharedMetrics(
+    metrics_registry,
+    METRICS_SHARED_DIR,
+    flush_interval=float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+) if METRICS_SHARED_DIR else None
+
+# Event-loop lag is always measured; LOOP_BLOCK_THRESHOLD_MS > 0 (for debugging) also
+# captures the stack of anything blocking the loop for longer than that
+loop_monitor = LoopMonitor(
+    metrics_registry,
+    interval=float(os.getenv("LOOP_LAG_INTERVAL_MS", "250")) / 1000.0,
+    block_threshold_ms=float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "0"))
+) if os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true" else None
+
+# Opt-in capture of anonymized request shapes for benchmarks/traffic_replay.py; each
+# worker process writes its own file, with its pid at "{pid}" or before the extensions
+TRAFFIC_CAPTURE_PATH = os.getenv("TRAFFIC_CAPTURE_PATH", "")
+traffic_capture = TrafficCapture(
+    capture_path_for_worker(TRAFFIC_CAPTURE_PATH, os.getpid()),
+    flush_interval=float(os.getenv("TRAFFIC_CAPTURE_FLUSH_SECONDS", "5"))
+) if TRAFFIC_CAPTURE_PATH else None
+
+
+async def current_metrics():
+    """This worker's metrics, merged with the other workers' when shared"""
+    if shared_metrics:
+        return await shared_metrics.merged()
+    return metrics_registry
+
+
+async def current_analytics(brain: ThinkxLifeBrain) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Brain analytics and security stats, merged with the other workers' when shared"""
+    if not shared_metrics:
+        return await brain.get_analytics(metrics_registry), security_manager.get_stats()
+    metrics, sections = await shared_metrics.merged_all()
+    analytics = await brain.get_analytics(metrics)
+    analytics.update({name: stats for name, stats in sections.items() if name in analytics})
+    # Check timings come from the merged histogram; the section's copies are per worker
+    security_stats = dict(sections.get("security") or security_manager.get_stats())
+    security_stats["checks"] = security_manager.check_stats(metrics)
+    return analytics, security_stats
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -45,6 +166,15 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting ThinkxLife Backend with Brain and Zoe integration...")
     
+    if security_manager.audit_log:
+        security_manager.audit_log.start()
+    if shared_metrics:
+        shared_metrics.start()
+    if loop_monitor:
+        loop_monitor.start()
+    if traffic_capture:
+        traffic_capture.start()
+    
     # Initialize Brain
     brain_config = {
         "providers": {
@@ -53,24 +183,118 @@ async def lifespan(app: FastAPI):
                 "api_key": os.getenv("OPENAI_API_KEY"),
                 "model": os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
                 "max_tokens": int(os.getenv("OPENAI_MAX_TOKENS", "2000")),
-                "temperature": float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
+                "temperature": float(os.getenv("OPENAI_TEMPERATURE", "0.7")),
+                "summary_model": os.getenv("OPENAI_SUMMARY_MODEL", "gpt-4o-mini")
+            },
+            "local": {
+                "enabled": os.getenv("BRAIN_LOCAL_PROVIDER", "false").lower() == "true",
+                "latency_ms": float(os.getenv("BRAIN_LOCAL_PROVIDER_LATENCY_MS", "0"))
             }
+        },
+        "token_budgets": {
+            "enabled": os.getenv("TOKEN_BUDGETS_ENABLED", "true").lower() == "true",
+            "user": {
+                "tokens_per_minute": int(os.getenv("TOKEN_BUDGET_USER_PER_MINUTE", "20000")),
+                "tokens_per_day": int(os.getenv("TOKEN_BUDGET_USER_PER_DAY", "500000"))
+            },
+            "applications": {
+                "default": {
+                    "tokens_per_minute": int(os.getenv("TOKEN_BUDGET_APPLICATION_PER_MINUTE", "500000")),
+                    "tokens_per_day": int(os.getenv("TOKEN_BUDGET_APPLICATION_PER_DAY", "20000000"))
+                }
+            },
+            # Over-budget requests get a shorter history and answer, and optionally a cheaper model
+            "degraded": {
+                "model": os.getenv("TOKEN_BUDGET_DEGRADED_MODEL") or None,
+                "history_limit": int(os.getenv("TOKEN_BUDGET_DEGRADED_HISTORY", "4")),
+                "max_tokens": int(os.getenv("TOKEN_BUDGET_DEGRADED_MAX_TOKENS", "300"))
+            }
+        },
+        # Adaptive concurrency limit; near it, TTS is skipped and histories shortened, at it 503
+        "load_shedding": {
+            "enabled": os.getenv("LOAD_SHEDDING_ENABLED", "true").lower() == "true",
+            "initial_limit": float(os.getenv("LOAD_SHEDDING_INITIAL_LIMIT", "32")),
+            "min_limit": float(os.getenv("LOAD_SHEDDING_MIN_LIMIT", "4")),
+            "max_limit": float(os.getenv("LOAD_SHEDDING_MAX_LIMIT", "256")),
+            "tolerance": float(os.getenv("LOAD_SHEDDING_LATENCY_TOLERANCE", "2.0")),
+            "lag_threshold_ms": float(os.getenv("LOAD_SHEDDING_LOOP_LAG_MS", "100")),
+            "short_history_limit": int(os.getenv("LOAD_SHEDDING_HISTORY", "4"))
+        },
+        "slow_request_journal": {
+            "enabled": os.getenv("SLOW_REQUEST_JOURNAL_ENABLED", "true").lower() == "true",
+            "threshold_ms": float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "2000")),
+            "max_entries": int(os.getenv("SLOW_REQUEST_JOURNAL_SIZE", "500")),
+            # "{pid}" gives each worker process its own file; workers must not share a rotating file
+            "path": os.getenv("SLOW_REQUEST_JOURNAL_PATH", "logs/slow_requests.{pid}.jsonl").format(pid=os.getpid()) or None,
+            # Set to make message fingerprints comparable across workers and restarts
+            "hash_key": os.getenv("SLOW_REQUEST_HASH_KEY") or None
+        },
+        "usage_ledger": {
+            "path": os.getenv("USAGE_LEDGER_PATH", "logs/usage_ledger.sqlite3"),
+            "flush_interval": float(os.getenv("USAGE_LEDGER_FLUSH_SECONDS", "30")),
+            # JSON {"model": {"prompt": usd_per_million, "completion": usd_per_million}}
+            "prices": json.loads(os.getenv("USAGE_PRICE_TABLE", "{}"))
         }
     }
     
     brain_instance = ThinkxLifeBrain(brain_config)
+    if brain_instance.usage_ledger:
+        brain_instance.usage_ledger.start()
+    if brain_instance.load_shedder and loop_monitor:
+        brain_instance.load_shedder.loop_lag = lambda: loop_monitor.last_lag
     logger.info("Brain system initialized")
     
+    # Per-worker stats merged alongside the registry; names match the analytics keys
+    if shared_metrics:
+        shared_metrics.add_section("security", security_manager.get_stats)
+        shared_metrics.add_section("token_budgets", brain_instance.token_budget.get_stats)
+        if brain_instance.usage_ledger:
+            shared_metrics.add_section("usage_ledger", brain_instance.usage_ledger.get_stats)
+        if brain_instance.load_shedder:
+            shared_metrics.add_section("load_shedding", brain_instance.load_shedder.get_stats)
+        if brain_instance.slow_journal:
+            shared_metrics.add_section("slow_requests", brain_instance.slow_journal.get_stats)
+    
     # Initialize Zoe with Brain integration
-    zoe_instance = ZoeCore(brain_instance)
+    zoe_instance = ZoeCore(
+        brain_instance,
+        coalesce_duplicate_turns=os.getenv("ZOE_COALESCE_DUPLICATE_TURNS", "true").lower() == "true"
+    )
+    
+    # Bound resident session memory; least recently used sessions spill to disk
+    conversation_manager = zoe_instance.conversation_manager
+    conversation_manager.max_memory_bytes = int(os.getenv("ZOE_SESSION_MEMORY_MB", "256")) * 1024 * 1024
+    conversation_manager.spill_path = os.getenv("ZOE_SESSION_SPILL_PATH") or None
+    # The shard dispatcher assigns new session IDs so they hash to this worker
+    conversation_manager.adopt_session_ids = SHARD_WORKER
+    
+    # Restore sessions from the last snapshot and keep snapshotting for crash recovery.
+    # Opt-in: snapshots put every conversation on disk. A single process uses the
+    # configured path; `uvicorn --workers N` processes each claim a numbered slot of it
+    # (or use ZOE_WORKER_ID), which a restarted worker claims again
+    snapshot_path = os.getenv("ZOE_SNAPSHOT_PATH", "")
+    if snapshot_path:
+        restored = zoe_instance.load_snapshot(snapshot_path, os.getenv("ZOE_WORKER_ID") or None)
+        zoe_instance.start_periodic_snapshots(float(os.getenv("ZOE_SNAPSHOT_INTERVAL_SECONDS", "300")))
+        logger.info(f"Restored {restored} Zoe sessions from snapshot")
     logger.info("Zoe AI Companion initialized")
     
     yield
     
     # Shutdown
     logger.info("Shutting down ThinkxLife Backend...")
+    if zoe_instance:
+        await zoe_instance.shutdown()
     if brain_instance:
         await brain_instance.shutdown()
+    if security_manager.audit_log:
+        await security_manager.audit_log.stop()
+    if shared_metrics:
+        await shared_metrics.stop()
+    if loop_monitor:
+        await loop_monitor.stop()
+    if traffic_capture:
+        await traffic_capture.stop()
     logger.info("Shutdown complete")
 
 
@@ -82,6 +306,18 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Security checks sit inside CORS so rejections still carry CORS headers
+app.add_middleware(
+    SecurityMiddleware,
+    security_manager=security_manager,
+    trust_forwarded_for=SHARD_WORKER,
+    traffic_capture=traffic_capture
+)
+
+# Traced requests get a Server-Timing header covering the security checks too
+if tracer.enabled:
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -119,6 +355,58 @@ class HealthResponse(BaseModel):
     timestamp: str
 
 
+MAX_CHAT_MESSAGE_CHARS = 10000
+# Largest page of sessions returned by /api/zoe/sessions/{user_id}
+MAX_SESSIONS_PAGE = 100
+ACE_RESTRICTION_SCORE = 4
+ACE_RESTRICTION_MESSAGE = "Chat access is restricted for your safety. Please contact info@thinkround.org to learn more about our Trauma Transformation Training program."
+
+
+class ChatContextHeader(BaseModel):
+    """The only user_context field the chat checks need"""
+    ace_score: Optional[float] = 0
+
+
+class ChatRequestHeader(BaseModel):
+    """
+    Chat request fields checked before the body is fully parsed
+
+    Unknown fields, including the rest of user_context, are skipped by the
+    JSON parser instead of being built into Python objects.
+    """
+    message: Optional[str] = ""
+    user_context: Optional[ChatContextHeader] = None
+
+    @property
+    def restricted(self) -> bool:
+        return bool(self.user_context and (self.user_context.ace_score or 0) >= ACE_RESTRICTION_SCORE)
+
+
+class ChatRequest(BaseModel):
+    """Chat request model for Zoe and the legacy chat endpoint"""
+    message: Optional[str] = ""
+    user_id: Optional[str] = "anonymous"
+    session_id: Optional[str] = None
+    user_context: Optional[Dict[str, Any]] = None
+
+
+def parse_chat_body(body: bytes, model):
+    """Parse a chat body into a request model, rejecting malformed ones with 400"""
+    try:
+        return model.model_validate_json(body)
+    except ValidationError:
+        raise HTTPException(status_code=400, detail="Invalid request format")
+
+
+def service_unavailable(error: OverloadedError) -> HTTPException:
+    """503 for a request rejected by load shedding"""
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(int(error.retry_after))}
+    )
+
+
 def get_brain() -> ThinkxLifeBrain:
     """Get Brain instance"""
     if not brain_instance:
@@ -133,6 +421,18 @@ def get_zoe() -> ZoeCore:
     return zoe_instance
 
 
+def require_shard_token(x_shard_token: Optional[str] = Header(None)):
+    """Only the shard dispatcher may call internal shard endpoints"""
+    if not SHARD_WORKER or not SHARD_TOKEN or x_shard_token != SHARD_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints are disabled unless ADMIN_API_TOKEN is set"""
+    if not ADMIN_API_TOKEN or x_admin_token != ADMIN_API_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+
 # Brain API endpoints
 @app.options("/api/brain")
 async def brain_options():
@@ -150,6 +450,8 @@ async def process_brain_request(
     This is the main endpoint that all frontend applications use
     to interact with AI capabilities.
     """
+    arrived = time.monotonic()
+    status = 500
     try:
         # Validate application type
         valid_applications = [
@@ -169,6 +471,7 @@ async def process_brain_request(
             "message": request.message,
             "application": request.application,
             "user_context": request.user_context,
+            "user_id": request.user_context.get("user_id"),
             "metadata": request.metadata or {}
         }
         
@@ -176,7 +479,7 @@ async def process_brain_request(
         response_data = await brain.process_request(brain_request_data)
         
         # Return formatted response
-        return APIBrainResponse(
+        response = APIBrainResponse(
             success=response_data.get("success", False),
             message=response_data.get("message"),
             data=response_data.get("data"),
@@ -184,17 +487,32 @@ async def process_brain_request(
             metadata=response_data.get("metadata"),
             timestamp=response_data.get("timestamp", datetime.now().isoformat())
         )
+        status = 200
+        return response
         
+    except OverloadedError as e:
+        status = 503
+        raise service_unavailable(e)
+    except HTTPException as e:
+        status = e.status_code
+        raise
     except Exception as e:
         logger.error(f"Error processing Brain request: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if traffic_capture:
+            traffic_capture.record(
+                "brain", request.application, request.message, arrived,
+                session_id=request.session_id,
+                status=status
+            )
 
 
 @app.get("/api/brain/health", response_model=HealthResponse)
 async def get_brain_health(brain: ThinkxLifeBrain = Depends(get_brain)) -> HealthResponse:
     """Get Brain system health status"""
     try:
-        health_status = await brain.get_health_status()
+        health_status = await brain.get_health_status(await current_metrics())
         
         return HealthResponse(
             status=health_status.get("overall", "unknown"),
@@ -211,10 +529,17 @@ async def get_brain_health(brain: ThinkxLifeBrain = Depends(get_brain)) -> Healt
 async def get_brain_analytics(brain: ThinkxLifeBrain = Depends(get_brain)):
     """Get Brain system analytics"""
     try:
-        analytics = await brain.get_analytics()
+        analytics, security_stats = await current_analytics(brain)
         return {
             "success": True,
-            "data": analytics,
+            "data": {
+                **analytics,
+                "security": security_stats,
+                "tracing": tracer.stats,
+                "event_loop": loop_monitor.get_stats() if loop_monitor else None,
+                "traffic_capture": traffic_capture.get_stats() if traffic_capture else None,
+                "shared_metrics": shared_metrics.get_stats() if shared_metrics else None
+            },
             "timestamp": datetime.now().isoformat()
         }
         
@@ -223,6 +548,121 @@ async def get_brain_analytics(brain: ThinkxLifeBrain = Depends(get_brain)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/usage", dependencies=[Depends(require_admin_token)])
+async def get_usage(
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    user_id: Optional[str] = None,
+    application: Optional[str] = None,
+    group_by: str = "application,model",
+    brain: ThinkxLifeBrain = Depends(get_brain)
+):
+    """Token usage and estimated cost over a range of UTC days, grouped by day/user_id/application/model"""
+    ledger = brain.usage_ledger
+    if ledger is None:
+        raise HTTPException(status_code=404, detail="Usage ledger is disabled")
+    
+    # Include usage recorded since the last periodic flush
+    await ledger.flush()
+    usage = await asyncio.to_thread(
+        ledger.query,
+        since.isoformat() if since else None,
+        until.isoformat() if until else None,
+        user_id,
+        application,
+        [field.strip() for field in group_by.split(",")]
+    )
+    return {
+        "success": True,
+        "data": {**usage, "prices": ledger.prices},
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.post("/api/admin/profile", dependencies=[Depends(require_admin_token)])
+async def run_profiler(
+    seconds: float = 10.0,
+    interval_ms: float = 5.0,
+    top: int = 30,
+    include_idle: bool = False,
+    format: str = "json"
+):
+    """
+    Sample every thread for a number of seconds
+    
+    Returns the top functions by self and total samples and the path of the
+    collapsed-stack file, or the collapsed stacks themselves with
+    format=collapsed (pipe into flamegraph.pl or load into speedscope).
+    """
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    
+    # Sampling runs in a worker thread, so the event loop keeps serving requests
+    try:
+        profile = await asyncio.to_thread(profiler.run, seconds, interval_ms / 1000.0, include_idle)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    stacks = profile.pop("stacks")
+    path = await asyncio.to_thread(write_collapsed, stacks, PROFILER_OUTPUT_DIR)
+    if format == "collapsed":
+        return Response(content=collapsed_text(stacks), media_type="text/plain")
+    
+    return {
+        "success": True,
+        "data": {**profile, "collapsed_path": path, "top": top_functions(stacks, top)},
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/admin/slow-requests", dependencies=[Depends(require_admin_token)])
+async def get_slow_requests(
+    limit: int = 50,
+    application: Optional[str] = None,
+    min_ms: Optional[float] = None,
+    brain: ThinkxLifeBrain = Depends(get_brain)
+):
+    """Recent Brain requests over the slow-request threshold, newest first"""
+    journal = brain.slow_journal
+    if journal is None:
+        raise HTTPException(status_code=404, detail="Slow request journal is disabled")
+    return {
+        "success": True,
+        "data": {
+            "requests": journal.query(limit=limit, application=application, min_ms=min_ms),
+            "stats": journal.get_stats()
+        },
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/admin/event-loop", dependencies=[Depends(require_admin_token)])
+async def get_event_loop_report(limit: int = 20):
+    """
+    Event-loop lag summary, blocking hotspots and the latest captured stacks
+    
+    Hotspots and stacks are only collected while LOOP_BLOCK_THRESHOLD_MS is set.
+    """
+    if loop_monitor is None:
+        raise HTTPException(status_code=404, detail="Event loop monitor is disabled")
+    return {
+        "success": True,
+        "data": {
+            "stats": loop_monitor.get_stats(),
+            "hotspots": loop_monitor.top_hotspots(limit),
+            "blocks": loop_monitor.query(limit)
+        },
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Latency histograms and counters in Prometheus text format, across workers when shared"""
+    metrics = await current_metrics()
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # Zoe AI Companion endpoints
 @app.options("/api/zoe/chat")
 async def zoe_chat_options():
@@ -231,7 +671,7 @@ async def zoe_chat_options():
 
 @app.post("/api/zoe/chat")
 async def zoe_chat_endpoint(
-    request: Dict[str, Any],
+    http_request: Request,
     zoe: ZoeCore = Depends(get_zoe)
 ):
     """
@@ -240,60 +680,82 @@ async def zoe_chat_endpoint(
     This endpoint provides access to Zoe, the empathetic AI companion
     that integrates with the Brain system for LLM calls.
     """
+    arrived = time.monotonic()
+    status = 500
+    message = ""
+    session_id = None
+    new_session = False
+    avatar_mode = False
     try:
-        # Validate request structure
-        if not isinstance(request, dict):
-            raise HTTPException(status_code=400, detail="Invalid request format")
-        
-        # Extract request data
-        message = request.get("message", "")
-        user_id = request.get("user_id", "anonymous")
-        session_id = request.get("session_id")
-        user_context = request.get("user_context", {})
+        # SecurityMiddleware has already capped the body size while it was read
+        body = await http_request.body()
+        header = parse_chat_body(body, ChatRequestHeader)
         
         # Check ACE score restriction - prevent chat access for scores >= 4
-        ace_score = user_context.get("ace_score", 0)
-        if ace_score >= 4:
-            raise HTTPException(
-                status_code=403, 
-                detail="Chat access is restricted for your safety. Please contact info@thinkround.org to learn more about our Trauma Transformation Training program."
-            )
+        if header.restricted:
+            raise HTTPException(status_code=403, detail=ACE_RESTRICTION_MESSAGE)
         
         # Validate required fields
-        if not message or not message.strip():
+        message = header.message or ""
+        if not message.strip():
             raise HTTPException(status_code=400, detail="Message is required and cannot be empty")
         
-        if len(message) > 10000:
+        if len(message) > MAX_CHAT_MESSAGE_CHARS:
             raise HTTPException(status_code=400, detail="Message too long (max 10,000 characters)")
         
+        request = parse_chat_body(body, ChatRequest)
+        session_id = request.session_id
+        new_session = request.session_id is None
+        avatar_mode = bool((request.user_context or {}).get("avatar_mode"))
+        
         # Process message through Zoe with conversation management
         response = await zoe.process_message(
             message=message,
-            user_context=user_context,
+            user_context=request.user_context or {},
             application="chatbot",
-            session_id=session_id,
-            user_id=user_id
+            session_id=request.session_id,
+            user_id=request.user_id
         )
+        session_id = response.get("session_id")
+        status = 200
         
         return response
         
+    except OverloadedError as e:
+        status = 503
+        raise service_unavailable(e)
+    except HTTPException as e:
+        status = e.status_code
+        raise
     except Exception as e:
         logger.error(f"Error in Zoe chat endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if traffic_capture:
+            traffic_capture.record(
+                "zoe", "chatbot", message, arrived,
+                session_id=session_id,
+                new_session=new_session,
+                avatar_mode=avatar_mode,
+                status=status
+            )
 
 
 @app.get("/api/zoe/sessions/{user_id}")
 async def get_zoe_user_sessions(
     user_id: str,
-    limit: int = 10,
+    limit: int = Query(10, ge=0, le=MAX_SESSIONS_PAGE),
+    offset: int = Query(0, ge=0),
     zoe: ZoeCore = Depends(get_zoe)
 ):
-    """Get recent Zoe sessions for a user"""
+    """Get recent Zoe sessions for a user, most recent first"""
     try:
-        sessions = await zoe.get_user_sessions(user_id, limit)
+        sessions = zoe.get_user_sessions(user_id, limit=limit, offset=offset)
         return {
             "success": True,
             "sessions": sessions,
+            # Lets the shard dispatcher merge pages from several workers in order
+            "last_activity": [zoe.conversation_manager.get_last_activity(session_id) for session_id in sessions],
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -348,6 +810,34 @@ async def get_zoe_health(zoe: ZoeCore = Depends(get_zoe)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/zoe/export", dependencies=[Depends(require_admin_token)])
+async def export_zoe_sessions(
+    user_id: Optional[str] = None,
+    application: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_messages: bool = True,
+    zoe: ZoeCore = Depends(get_zoe)
+):
+    """Stream matching Zoe sessions as NDJSON, one session per line"""
+    records = export_records(
+        iter_manager_sessions(zoe.conversation_manager, user_id=user_id, since=since),
+        user_id=user_id,
+        application=application,
+        since=since,
+        until=until,
+        include_messages=include_messages
+    )
+
+    async def stream():
+        for count, line in enumerate(iter_ndjson(records), 1):
+            yield line
+            if count % 100 == 0:
+                await asyncio.sleep(0)  # Let chat requests run during large exports
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @app.get("/api/session-analytics")
 async def get_session_analytics(
     user_id: Optional[str] = None,
@@ -358,18 +848,24 @@ async def get_session_analytics(
     """Get session analytics and statistics"""
     try:
         # Get Brain analytics
-        brain_analytics = await brain.get_analytics()
+        brain_analytics, _ = await current_analytics(brain)
         
-        # Get session-specific data if requested
+        # Session figures come from running counters, not from scanning history
         session_data = {}
         if session_id:
-            session_data = await zoe.get_session_history(session_id)
+            session_data = zoe.get_session_stats(session_id) or {}
+        
+        user_data = {}
+        if user_id:
+            user_data = {"session_count": len(zoe.conversation_manager.user_sessions.get(user_id) or ())}
         
         return {
             "success": True,
             "data": {
                 "brain_analytics": brain_analytics,
+                "session_aggregates": zoe.get_aggregate_stats(),
                 "session_data": session_data,
+                "user_data": user_data,
                 "user_id": user_id,
                 "session_id": session_id
             },
@@ -389,7 +885,7 @@ async def chat_options():
 
 @app.post("/api/chat")
 async def legacy_chat_endpoint(
-    request: Dict[str, Any],
+    http_request: Request,
     zoe: ZoeCore = Depends(get_zoe)
 ):
     """
@@ -398,18 +894,22 @@ async def legacy_chat_endpoint(
     This endpoint maintains compatibility with existing frontend code
     while routing through Zoe AI Companion with full conversation management.
     """
+    arrived = time.monotonic()
+    # Malformed bodies get a 400, as FastAPI's own body parsing would
+    body = await http_request.body()
+    header = parse_chat_body(body, ChatRequestHeader)
+    # Errors are answered with a 200 apology; the capture records them as 500
+    status = 200
+    message = header.message or ""
+    session_id = None
+    new_session = False
+    tts_requested = False
+    
     try:
-        # Extract request data
-        message = request.get("message", "")
-        user_id = request.get("user_id", "anonymous")
-        session_id = request.get("session_id")
-        user_context = request.get("user_context", {})
-        
         # Check ACE score restriction - prevent chat access for scores >= 4
-        ace_score = user_context.get("ace_score", 0)
-        if ace_score >= 4:
+        if header.restricted:
             return {
-                "response": "Chat access is restricted for your safety. Please contact info@thinkround.org to learn more about our Trauma Transformation Training program.",
+                "response": ACE_RESTRICTION_MESSAGE,
                 "success": False,
                 "error": "ACE score restriction",
                 "restricted": True,
@@ -418,7 +918,7 @@ async def legacy_chat_endpoint(
 
         
         # Validate required fields
-        if not message or not message.strip():
+        if not message.strip():
             return {
                 "response": "I didn't receive a message. What would you like to talk about?",
                 "success": False,
@@ -426,7 +926,7 @@ async def legacy_chat_endpoint(
                 "timestamp": datetime.now().isoformat()
             }
         
-        if len(message) > 10000:
+        if len(message) > MAX_CHAT_MESSAGE_CHARS:
             return {
                 "response": "Your message is too long. Please keep it under 10,000 characters.",
                 "success": False,
@@ -434,21 +934,34 @@ async def legacy_chat_endpoint(
                 "timestamp": datetime.now().isoformat()
             }
         
+        request = parse_chat_body(body, ChatRequest)
+        user_context = request.user_context or {}
+        session_id = request.session_id
+        new_session = request.session_id is None
+        tts_requested = bool(user_context.get("avatar_mode") or user_context.get("test_tts"))
+        
         # Process through Zoe with conversation management
         zoe_response = await zoe.process_message(
             message=message,
             user_context=user_context,
             application="chatbot",
-            session_id=session_id,
-            user_id=user_id
+            session_id=request.session_id,
+            user_id=request.user_id
         )
         
+        session_id = zoe_response.get("session_id")
+        
         # Generate TTS audio if avatar mode is enabled
         audio_data = None
         avatar_mode = user_context.get("avatar_mode", False)
         test_tts = user_context.get("test_tts", False)
         
-        if (avatar_mode or test_tts) and zoe_response.get("success", False):
+        # Speech synthesis is the first thing dropped when nearing the concurrency limit;
+        # go by the level the turn was admitted at, not the load now
+        admitted_level = LoadLevel[zoe_response.get("load_level", "normal").upper()]
+        audio_skipped = bool((avatar_mode or test_tts) and admitted_level >= LoadLevel.SKIP_TTS)
+        
+        if (avatar_mode or test_tts) and zoe_response.get("success", False) and not audio_skipped:
             response_text = zoe_response.get("response", "")
             if response_text:
                 audio_data = await tts_service.generate_speech(response_text)
@@ -469,10 +982,16 @@ async def legacy_chat_endpoint(
         # Add audio data if generated
         if audio_data:
             response_data["audio_data"] = audio_data
+        elif audio_skipped:
+            response_data["audio_skipped"] = True
             
         return response_data
         
+    except OverloadedError as e:
+        status = 503
+        raise service_unavailable(e)
     except Exception as e:
+        status = 500
         logger.error(f"Error in legacy chat endpoint: {str(e)}")
         return {
             "response": "I apologize, but I'm experiencing technical difficulties. I'm still here for you though.",
@@ -480,6 +999,15 @@ async def legacy_chat_endpoint(
             "error": str(e),
             "timestamp": datetime.now().isoformat()
         }
+    finally:
+        if traffic_capture:
+            traffic_capture.record(
+                "chat", "chatbot", message, arrived,
+                session_id=session_id,
+                new_session=new_session,
+                avatar_mode=tts_requested,
+                status=status
+            )
 
 
 # Helper function for application-specific endpoints
@@ -537,6 +1065,34 @@ async def exterior_spaces_endpoint(
     return await create_application_endpoint(request, "exterior-spaces", brain)
 
 
+# Internal shard handover endpoints, used by the dispatcher when workers are added
+@app.post("/internal/shard/sessions/{session_id}/export", dependencies=[Depends(require_shard_token)])
+async def export_shard_session(session_id: str, zoe: ZoeCore = Depends(get_zoe)):
+    """Encode a session for another worker; it stays here until released"""
+    payload = zoe.conversation_manager.export_session_payload(session_id)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return Response(content=payload, media_type="application/octet-stream")
+
+
+@app.post("/internal/shard/sessions/{session_id}/release", dependencies=[Depends(require_shard_token)])
+async def release_shard_session(session_id: str, zoe: ZoeCore = Depends(get_zoe)):
+    """Drop a session once another worker has confirmed importing it"""
+    return {"success": True, "released": zoe.conversation_manager.release_session(session_id)}
+
+
+@app.post("/internal/shard/sessions/import", dependencies=[Depends(require_shard_token)])
+async def import_shard_session(request: Request, zoe: ZoeCore = Depends(get_zoe)):
+    """Take over a session exported by another worker"""
+    try:
+        session_id = zoe.conversation_manager.import_session_payload(await request.body())
+    except Exception as e:
+        logger.error(f"Error importing shard session: {str(e)}")
+        raise HTTPException(status_code=400, detail="Invalid session payload")
+    
+    return {"success": True, "session_id": session_id}
+
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -563,11 +1119,14 @@ async def root():
             "brain": "/api/brain",
             "brain_health": "/api/brain/health",
             "brain_analytics": "/api/brain/analytics",
+            "metrics": "/metrics",
+            "usage": "/api/usage",
             "zoe": {
                 "chat": "/api/zoe/chat",
                 "health": "/api/zoe/health",
                 "sessions": "/api/zoe/sessions/{user_id}",
-                "session_history": "/api/zoe/sessions/{session_id}/history"
+                "session_history": "/api/zoe/sessions/{session_id}/history",
+                "export": "/api/zoe/export"
             },
             "applications": {
                 "healing_rooms": "/api/healing-rooms",
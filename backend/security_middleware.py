@@ -0,0 +1,153 @@
+"""
+Security middleware for the ThinkxLife backend
+
+Raw ASGI middleware that applies the SecurityManager's request-level checks
+(body size and rate limits) before FastAPI routes the request or parses its
+body, so rejected requests never reach Pydantic, Zoe or a provider.
+"""
+
+import json
+import logging
+import time
+from typing import Iterable, Optional
+
+from fastapi import HTTPException
+
+from brain.security_manager import SecurityManager
+from brain.traffic_capture import TrafficCapture
+
+logger = logging.getLogger(__name__)
+
+# Captured endpoints: path -> (endpoint name, application) for traffic capture
+CAPTURED_PATHS = {
+    "/api/zoe/chat": ("zoe", "chatbot"),
+    "/api/chat": ("chat", "chatbot"),
+    "/api/brain": ("brain", "general")
+}
+
+
+class SecurityMiddleware:
+    """
+    Reject oversized and rate-limited requests early
+
+    - Requests whose Content-Length exceeds the path's limit get 413
+      immediately; bodies without a length are counted as they are read
+    - API requests are rate limited by client address and, when the caller
+      identifies itself with an X-User-Id header, by user
+    - Each check's duration is recorded on the SecurityManager
+    - Rejected chat and Brain requests are recorded in the traffic capture,
+      if any, with their status and without a message (its body is unread)
+    """
+
+    def __init__(
+        self,
+        app,
+        security_manager: SecurityManager,
+        rate_limited_prefixes: Iterable[str] = ("/api/",),
+        trust_forwarded_for: bool = False,
+        traffic_capture: Optional[TrafficCapture] = None
+    ):
+        self.app = app
+        self.security_manager = security_manager
+        self.rate_limited_prefixes = tuple(rate_limited_prefixes)
+        # Only enable behind a trusted proxy such as the shard dispatcher
+        self.trust_forwarded_for = trust_forwarded_for
+        self.traffic_capture = traffic_capture
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        security = self.security_manager
+        headers = dict(scope["headers"])
+        client_ip = self._client_ip(scope, headers)
+
+        # Body size
+        arrived = time.monotonic()
+        start = time.perf_counter()
+        max_body_bytes = security.body_limit_for(scope["path"])
+        content_length = headers.get(b"content-length")
+        too_large = False
+        if max_body_bytes and content_length is not None:
+            try:
+                too_large = int(content_length) > max_body_bytes
+            except ValueError:
+                security.record_rejection("bad_content_length", client_ip, {"path": scope["path"]})
+                await self._reject(send, 400, "Invalid Content-Length header")
+                return
+        security.record_check("body_size", time.perf_counter() - start)
+        if too_large:
+            security.record_rejection(
+                "body_too_large", client_ip, {"path": scope["path"], "content_length": int(content_length)}
+            )
+            self._capture(scope["path"], arrived, 413)
+            await self._reject(send, 413, "Request body too large")
+            return
+
+        # Rate limits
+        if scope["path"].startswith(self.rate_limited_prefixes):
+            start = time.perf_counter()
+            user_id = headers.get(b"x-user-id")
+            user_id = user_id.decode("latin-1") if user_id else None
+            retry_after = await security.check_request_limits_async(client_ip, user_id)
+            security.record_check("rate_limit", time.perf_counter() - start)
+            if retry_after:
+                security.record_rejection(
+                    "rate_limited", user_id or client_ip, {"path": scope["path"], "client_ip": client_ip}
+                )
+                self._capture(scope["path"], arrived, 429)
+                await self._reject(
+                    send, 429, "Rate limit exceeded",
+                    [(b"retry-after", str(int(retry_after) + 1).encode("latin-1"))]
+                )
+                return
+
+        if max_body_bytes and content_length is None:
+            receive = self._limit_body(receive, max_body_bytes, client_ip)
+        await self.app(scope, receive, send)
+
+    def _capture(self, path: str, arrived: float, status: int):
+        """Record a rejected request in the traffic capture"""
+        if self.traffic_capture is not None and path in CAPTURED_PATHS:
+            endpoint, application = CAPTURED_PATHS[path]
+            self.traffic_capture.record(endpoint, application, None, arrived, status=status)
+
+    def _client_ip(self, scope, headers) -> Optional[str]:
+        if self.trust_forwarded_for:
+            forwarded = headers.get(b"x-forwarded-for")
+            if forwarded:
+                return forwarded.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else None
+
+    def _limit_body(self, receive, max_body_bytes: int, client_ip: Optional[str]):
+        """Wrap receive to stop reading a streamed body once it exceeds the limit"""
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body_bytes:
+                    self.security_manager.record_rejection("body_too_large", client_ip, {"streamed": True})
+                    # Surfaces as a 413 response from FastAPI's body reader
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        return limited_receive
+
+    @staticmethod
+    async def _reject(send, status: int, detail: str, extra_headers: Optional[list] = None):
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                *(extra_headers or [])
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""
+Shard Dispatcher for ThinkxLife Backend
+
+Runs several backend worker processes behind a small ASGI front end that routes
+every Zoe session to a fixed worker using consistent hashing. Each session's
+conversation state stays hot in exactly one process while all cores are used.
+
+When workers are added, only the sessions whose ring position moved change
+owner. Those sessions are handed over lazily: on the first request after the
+change, the dispatcher exports the session from its previous owner, imports it
+into the new one and only then has the previous owner release it, so a failed
+handover leaves the session where it was.
+
+Usage:
+    python shard_dispatcher.py --workers 4 --port 8000
+"""
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import os
+import secrets
+import subprocess
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Endpoints whose JSON body carries the session ID
+SESSION_BODY_PATHS = {"/api/zoe/chat", "/api/chat"}
+
+# Bulk export endpoint, streamed from every worker in turn
+EXPORT_PATH = "/api/zoe/export"
+
+# Largest session page a worker serves (main.MAX_SESSIONS_PAGE); a worker keeps at
+# most max_sessions_per_user sessions per user, far fewer than this
+MAX_SESSIONS_PAGE = 100
+
+# Request body limits, matching the workers' (main.py)
+MAX_REQUEST_BODY_BYTES = int(os.getenv("MAX_REQUEST_BODY_BYTES", str(64 * 1024)))
+CHAT_MAX_BODY_BYTES = int(os.getenv("CHAT_MAX_BODY_BYTES", str(48 * 1024)))
+
+# Hop-by-hop and length headers that must not be copied between hops
+SKIPPED_HEADERS = {"host", "content-length", "transfer-encoding", "connection", "content-encoding"}
+
+
+class ConsistentHashRing:
+    """
+    Consistent hash ring with virtual nodes
+
+    Adding a node moves only the keys that land on its virtual nodes, roughly
+    1/N of all keys, so most sessions keep their worker.
+    """
+
+    def __init__(self, nodes: Optional[List[str]] = None, virtual_nodes: int = 160):
+        self.virtual_nodes = virtual_nodes
+        self.nodes: List[str] = []
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for node in nodes or []:
+            self.add_node(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def add_node(self, node: str):
+        """Add a node and its virtual nodes to the ring"""
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for replica in range(self.virtual_nodes):
+            point = self._hash(f"{node}#{replica}")
+            position = bisect.bisect(self._points, point)
+            self._points.insert(position, point)
+            self._owners.insert(position, node)
+
+    def get_node(self, key: str) -> str:
+        """Get the node owning a key"""
+        if not self._points:
+            raise RuntimeError("Hash ring has no nodes")
+        position = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[position]
+
+    def copy(self) -> "ConsistentHashRing":
+        """Copy the ring"""
+        ring = ConsistentHashRing(virtual_nodes=self.virtual_nodes)
+        ring.nodes = list(self.nodes)
+        ring._points = list(self._points)
+        ring._owners = list(self._owners)
+        return ring
+
+
+class ShardDispatcher:
+    """
+    ASGI front end that pins Zoe sessions to worker processes
+
+    Routing:
+    - Chat requests are routed by the session ID in their body; requests that
+      start a new session get an ID assigned here so they land on the worker
+      that will own it
+    - Session history and deletion are routed by the session ID in the path
+    - Listing a user's sessions fans out to every worker and merges the results
+    - Bulk exports stream every worker's NDJSON output one worker after another
+    - Everything else is stateless and spread round-robin
+    """
+
+    def __init__(
+        self,
+        workers: List[str],
+        shard_token: Optional[str] = None,
+        virtual_nodes: int = 160,
+        max_ring_history: int = 4,
+        max_body_bytes: int = MAX_REQUEST_BODY_BYTES,
+        path_body_limits: Optional[Dict[str, int]] = None
+    ):
+        self.ring = ConsistentHashRing(workers, virtual_nodes)
+        self.shard_token = shard_token
+        # Bodies are read in full before proxying, so they are capped here too
+        self.max_body_bytes = max_body_bytes
+        self.path_body_limits = (
+            path_body_limits if path_body_limits is not None
+            else {path: CHAT_MAX_BODY_BYTES for path in SESSION_BODY_PATHS}
+        )
+        self.max_ring_history = max_ring_history
+        self.request_timeout = 60.0
+
+        self._previous_rings: List[ConsistentHashRing] = []
+        self._settled_sessions: "OrderedDict[str, None]" = OrderedDict()
+        self._max_settled_sessions = 100000
+        self._migration_locks: Dict[str, asyncio.Lock] = {}
+        self._round_robin = 0
+        self._client: Optional[httpx.AsyncClient] = None
+
+        self.stats = {
+            "requests": 0,
+            "fanouts": 0,
+            "migrations": 0,
+            "upstream_errors": 0,
+            "rejected_bodies": 0
+        }
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.request_timeout)
+        return self._client
+
+    def add_worker(self, worker: str) -> bool:
+        """Add a worker; sessions that now hash to it are migrated on first use"""
+        if worker in self.ring.nodes:
+            return False
+
+        self._previous_rings.insert(0, self.ring.copy())
+        del self._previous_rings[self.max_ring_history:]
+        self._settled_sessions.clear()
+        self.ring.add_node(worker)
+
+        logger.info(f"Added shard worker {worker}; {len(self.ring.nodes)} workers in ring")
+        return True
+
+    def route(self, session_id: str) -> str:
+        """Get the worker owning a session"""
+        return self.ring.get_node(session_id)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._handle_lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        self.stats["requests"] += 1
+        method = scope["method"]
+        path = scope["path"]
+        query = scope.get("query_string", b"").decode("latin-1")
+        headers = {
+            key.decode("latin-1"): value.decode("latin-1")
+            for key, value in scope["headers"]
+            if key.decode("latin-1").lower() not in SKIPPED_HEADERS
+        }
+        client = scope.get("client")
+        if client:
+            # Workers rate limit by this address; replacing any inbound value prevents spoofing
+            headers["x-forwarded-for"] = client[0]
+        max_body_bytes = self.path_body_limits.get(path, self.max_body_bytes)
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None:
+            try:
+                too_large = int(content_length) > max_body_bytes
+            except ValueError:
+                await self._send_json(send, 400, {"detail": "Invalid Content-Length header"})
+                return
+            if too_large:
+                self.stats["rejected_bodies"] += 1
+                await self._send_json(send, 413, {"detail": "Request body too large"})
+                return
+        body = await self._read_body(receive, max_body_bytes)
+        if body is None:
+            self.stats["rejected_bodies"] += 1
+            await self._send_json(send, 413, {"detail": "Request body too large"})
+            return
+
+        try:
+            if path == "/shard/status":
+                await self._send_json(send, 200, self.get_status())
+                return
+
+            if path == "/shard/workers" and method == "POST":
+                await self._handle_add_worker(send, headers, body)
+                return
+
+            session_id = None
+            if method == "POST" and path in SESSION_BODY_PATHS:
+                body, session_id = self._assign_session_id(body)
+            else:
+                session_id = self._session_id_from_request(method, path, query)
+
+            if session_id is None and method == "GET" and self._is_user_sessions_path(path):
+                await self._fan_out_user_sessions(send, path, query, headers)
+                return
+
+            if method == "GET" and path == EXPORT_PATH:
+                await self._stream_export(send, query, headers)
+                return
+
+            if session_id:
+                worker = self.route(session_id)
+                await self._ensure_migrated(session_id, worker)
+            else:
+                worker = self.ring.nodes[self._round_robin % len(self.ring.nodes)]
+                self._round_robin += 1
+
+            response = await self.client.request(
+                method,
+                f"{worker}{path}",
+                params=query or None,
+                headers=headers,
+                content=body
+            )
+            response_headers = [
+                (key.encode("latin-1"), value.encode("latin-1"))
+                for key, value in response.headers.items()
+                if key.lower() not in SKIPPED_HEADERS
+            ]
+            response_headers.append((b"x-zoe-shard", worker.encode("latin-1")))
+            await self._send(send, response.status_code, response_headers, response.content)
+
+        except httpx.HTTPError as e:
+            self.stats["upstream_errors"] += 1
+            logger.error(f"Shard upstream error for {method} {path}: {str(e)}")
+            await self._send_json(send, 502, {"detail": "Shard worker unavailable"})
+        except ValueError as e:
+            await self._send_json(send, 400, {"detail": f"Invalid request: {str(e)}"})
+
+    def _assign_session_id(self, body: bytes):
+        """Read the session ID from a chat body, assigning one for new sessions"""
+        payload = json.loads(body or b"{}")
+        if not isinstance(payload, dict):
+            raise ValueError("request body must be a JSON object")
+
+        session_id = payload.get("session_id")
+        if not session_id:
+            session_id = str(uuid.uuid4())
+            payload["session_id"] = session_id
+            body = json.dumps(payload).encode("utf-8")
+        return body, str(session_id)
+
+    @staticmethod
+    def _is_user_sessions_path(path: str) -> bool:
+        parts = path.strip("/").split("/")
+        return len(parts) == 4 and parts[:3] == ["api", "zoe", "sessions"]
+
+    def _session_id_from_request(self, method: str, path: str, query: str) -> Optional[str]:
+        """Find the session a non-chat request refers to"""
+        parts = path.strip("/").split("/")
+        if parts[:3] == ["api", "zoe", "sessions"]:
+            if len(parts) == 5 and parts[4] == "history":
+                return parts[3]
+            if len(parts) == 4 and method == "DELETE":
+                return parts[3]
+        if path == "/api/session-analytics":
+            return parse_qs(query).get("session_id", [None])[0]
+        return None
+
+    async def _ensure_migrated(self, session_id: str, owner: str):
+        """Move a session to its owner if a ring change left it on another worker"""
+        if not self._previous_rings or session_id in self._settled_sessions:
+            return
+
+        lock = self._migration_locks.get(session_id)
+        if lock is None:
+            lock = self._migration_locks[session_id] = asyncio.Lock()
+
+        try:
+            async with lock:
+                if session_id in self._settled_sessions:
+                    return
+
+                previous_owners = []
+                for ring in self._previous_rings:
+                    candidate = ring.get_node(session_id)
+                    if candidate != owner and candidate not in previous_owners:
+                        previous_owners.append(candidate)
+
+                for previous_owner in previous_owners:
+                    exported = await self.client.post(
+                        f"{previous_owner}/internal/shard/sessions/{session_id}/export",
+                        headers=self._internal_headers()
+                    )
+                    if exported.status_code != 200:
+                        continue
+
+                    imported = await self.client.post(
+                        f"{owner}/internal/shard/sessions/import",
+                        headers=self._internal_headers(),
+                        content=exported.content
+                    )
+                    # On failure the previous owner still holds the session; the
+                    # next request for it retries the handover
+                    imported.raise_for_status()
+                    released = await self.client.post(
+                        f"{previous_owner}/internal/shard/sessions/{session_id}/release",
+                        headers=self._internal_headers()
+                    )
+                    if released.status_code != 200:
+                        # Both hold a copy; the new owner's is the one routed to from now on
+                        logger.warning(f"Previous owner {previous_owner} did not release session {session_id}")
+                    self.stats["migrations"] += 1
+                    logger.info(f"Migrated session {session_id} from {previous_owner} to {owner}")
+                    break
+
+                self._settled_sessions[session_id] = None
+                if len(self._settled_sessions) > self._max_settled_sessions:
+                    self._settled_sessions.popitem(last=False)
+        finally:
+            if not lock.locked():
+                self._migration_locks.pop(session_id, None)
+
+    async def _fan_out_user_sessions(self, send, path: str, query: str, headers: Dict[str, str]):
+        """
+        Merge a user's sessions from every worker, most recent first
+
+        Each worker returns its own first offset+limit sessions with their last
+        activity times; the page is cut once from the merged, re-sorted list.
+        """
+        self.stats["fanouts"] += 1
+        params = parse_qs(query)
+        limit = int(params.get("limit", ["10"])[0])
+        offset = int(params.get("offset", ["0"])[0])
+        if limit < 0 or offset < 0:
+            raise ValueError("limit and offset must not be negative")
+        worker_params = {**params, "limit": str(min(offset + limit, MAX_SESSIONS_PAGE)), "offset": "0"}
+
+        responses = await asyncio.gather(
+            *[
+                self.client.get(f"{worker}{path}", params=worker_params, headers=headers)
+                for worker in self.ring.nodes
+            ],
+            return_exceptions=True
+        )
+
+        sessions = []
+        for response in responses:
+            if isinstance(response, Exception) or response.status_code != 200:
+                self.stats["upstream_errors"] += 1
+                continue
+            data = response.json()
+            worker_sessions = data.get("sessions", [])
+            last_activity = data.get("last_activity") or [None] * len(worker_sessions)
+            sessions.extend(zip(worker_sessions, last_activity))
+
+        sessions.sort(key=lambda item: item[1] or 0.0, reverse=True)
+        page = sessions[offset:offset + limit]
+
+        await self._send_json(send, 200, {
+            "success": True,
+            "sessions": [session_id for session_id, _ in page],
+            "last_activity": [activity for _, activity in page],
+            "timestamp": datetime.now().isoformat()
+        })
+
+    async def _stream_export(self, send, query: str, headers: Dict[str, str]):
+        """Concatenate every worker's NDJSON export without buffering it"""
+        self.stats["fanouts"] += 1
+        started = False
+        for worker in list(self.ring.nodes):
+            try:
+                async with self.client.stream(
+                    "GET", f"{worker}{EXPORT_PATH}", params=query or None, headers=headers, timeout=None
+                ) as response:
+                    if response.status_code != 200:
+                        if not started:
+                            # Auth and validation errors are the same on every worker
+                            await self._send(send, response.status_code, [
+                                (b"content-type", response.headers.get("content-type", "application/json").encode("latin-1"))
+                            ], await response.aread())
+                            return
+                        self.stats["upstream_errors"] += 1
+                        continue
+
+                    if not started:
+                        await send({
+                            "type": "http.response.start",
+                            "status": 200,
+                            "headers": [(b"content-type", b"application/x-ndjson")]
+                        })
+                        started = True
+                    async for chunk in response.aiter_raw():
+                        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            except httpx.HTTPError as e:
+                self.stats["upstream_errors"] += 1
+                logger.error(f"Shard export from {worker} failed: {str(e)}")
+                if not started:
+                    await self._send_json(send, 502, {"detail": "Shard worker unavailable"})
+                    return
+
+        if not started:
+            await self._send(send, 200, [(b"content-type", b"application/x-ndjson")], b"")
+            return
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _handle_add_worker(self, send, headers: Dict[str, str], body: bytes):
+        """Admin endpoint: add a running worker to the ring"""
+        if not self.shard_token or headers.get("x-shard-token") != self.shard_token:
+            await self._send_json(send, 403, {"detail": "Forbidden"})
+            return
+
+        payload = json.loads(body or b"{}")
+        worker = payload.get("url") if isinstance(payload, dict) else None
+        if not worker or not isinstance(worker, str):
+            await self._send_json(send, 400, {"detail": "Worker url is required"})
+            return
+
+        added = self.add_worker(worker.rstrip("/"))
+        await self._send_json(send, 200, {"success": True, "added": added, "workers": self.ring.nodes})
+
+    def _internal_headers(self) -> Dict[str, str]:
+        return {"x-shard-token": self.shard_token} if self.shard_token else {}
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get dispatcher status"""
+        return {
+            "workers": self.ring.nodes,
+            "virtual_nodes": self.ring.virtual_nodes,
+            "ring_history": len(self._previous_rings),
+            **self.stats,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    async def _handle_lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._client is not None:
+                    await self._client.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _read_body(receive, max_bytes: int) -> Optional[bytes]:
+        """Read the request body; None as soon as it grows past max_bytes"""
+        chunks = []
+        received = 0
+        while True:
+            message = await receive()
+            chunk = message.get("body", b"")
+            received += len(chunk)
+            if received > max_bytes:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    @staticmethod
+    async def _send(send, status: int, headers: list, body: bytes):
+        headers = headers + [(b"content-length", str(len(body)).encode("latin-1"))]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _send_json(self, send, status: int, data: Dict[str, Any]):
+        body = json.dumps(data).encode("utf-8")
+        await self._send(send, status, [(b"content-type", b"application/json")], body)
+
+
+def launch_workers(count: int, base_port: int, shard_token: str, host: str = "127.0.0.1") -> List[subprocess.Popen]:
+    """Start backend worker processes in shard worker mode"""
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    snapshot_path = os.getenv("ZOE_SNAPSHOT_PATH", "")
+    processes = []
+    for index in range(count):
+        port = base_port + index
+        env = {
+            **os.environ,
+            "ZOE_SHARD_WORKER": "true",
+            "ZOE_SHARD_TOKEN": shard_token,
+            "ZOE_SNAPSHOT_PATH": ""
+        }
+        # Each worker snapshots the sessions it owns to its own file
+        if snapshot_path:
+            root, ext = os.path.splitext(snapshot_path)
+            env["ZOE_SNAPSHOT_PATH"] = f"{root}.shard{port}{ext}"
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", host, "--port", str(port), "--log-level", "warning"],
+            cwd=backend_dir,
+            env=env
+        ))
+    return processes
+
+
+def wait_for_workers(workers: List[str], timeout: float = 60.0):
+    """Block until every worker answers its health check"""
+    deadline = time.monotonic() + timeout
+    pending = list(workers)
+    while pending:
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Shard workers did not start: {pending}")
+        try:
+            if httpx.get(f"{pending[0]}/health", timeout=1.0).status_code == 200:
+                pending.pop(0)
+                continue
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--base-port", type=int, default=8100, help="Port of the first worker")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    shard_token = os.getenv("ZOE_SHARD_TOKEN") or secrets.token_hex(16)
+    workers = [f"http://127.0.0.1:{args.base_port + index}" for index in range(args.workers)]
+    processes = launch_workers(args.workers, args.base_port, shard_token)
+
+    try:
+        wait_for_workers(workers)
+        logger.info(f"Started {len(workers)} shard workers")
+
+        import uvicorn
+        uvicorn.run(ShardDispatcher(workers, shard_token=shard_token), host=args.host, port=args.port)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
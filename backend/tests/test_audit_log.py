@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+from brain.audit_log import SecurityAuditLog
+
+
+def read_events(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_repeats_are_carried_by_the_next_event(tmp_path):
+    audit = SecurityAuditLog(str(tmp_path / "audit.jsonl"), dedup_window=10.0)
+    for _ in range(4):
+        audit.record("rate_limited", "alice")
+    audit._recent[("rate_limited", "alice")][0] -= 10.0
+    audit.record("rate_limited", "alice")
+    events = list(audit._queue)
+    assert len(events) == 2
+    assert events[1]["suppressed_repeats"] == 3
+
+
+def test_expired_window_writes_a_summary(tmp_path):
+    audit = SecurityAuditLog(str(tmp_path / "audit.jsonl"), dedup_window=10.0)
+    audit.record("rate_limited", "alice")
+    audit.record("rate_limited", "alice")
+    audit.record("blocked_content", "bob")
+    written = audit._recent[("rate_limited", "alice")][0]
+
+    audit.expire(written + 5.0)
+    assert len(audit._queue) == 2
+
+    audit.expire(written + 10.0)
+    summary = audit._queue[-1]
+    assert summary["summary"] is True
+    assert summary["event"] == "rate_limited"
+    assert summary["user_id"] == "alice"
+    assert summary["suppressed_repeats"] == 1
+    assert len(audit._queue) == 3
+
+    # Keys without suppressed repeats are forgotten without a summary
+    audit.expire(written + 20.0)
+    assert len(audit._queue) == 3 and not audit._recent
+
+
+def test_stop_flushes_pending_counts(tmp_path):
+    path = tmp_path / "audit.jsonl"
+    audit = SecurityAuditLog(str(path))
+
+    async def run():
+        audit.start()
+        for _ in range(3):
+            audit.record("rate_limited", None)
+        await audit.stop()
+
+    asyncio.run(run())
+    events = read_events(path)
+    assert [event.get("suppressed_repeats") for event in events] == [None, 2]
+    assert events[1]["user_id"] is None
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+
+pytest.importorskip("httpx")  # shard_dispatcher's proxy client
+
+from shard_dispatcher import ConsistentHashRing, ShardDispatcher  # noqa: E402
+
+KEYS = [str(uuid.UUID(int=i * 7919 + 1)) for i in range(20000)]
+
+
+def test_keys_spread_evenly():
+    ring = ConsistentHashRing([f"worker-{i}" for i in range(4)])
+    counts = {}
+    for key in KEYS:
+        node = ring.get_node(key)
+        counts[node] = counts.get(node, 0) + 1
+    assert len(counts) == 4
+    assert all(0.15 < count / len(KEYS) < 0.35 for count in counts.values())
+
+
+def test_adding_a_node_moves_about_one_nth_of_keys_to_it():
+    ring = ConsistentHashRing([f"worker-{i}" for i in range(4)])
+    before = {key: ring.get_node(key) for key in KEYS}
+    grown = ring.copy()
+    grown.add_node("worker-4")
+
+    moved = [key for key in KEYS if grown.get_node(key) != before[key]]
+    assert 0.12 < len(moved) / len(KEYS) < 0.28
+    # Keys only ever move to the new node, never between existing ones
+    assert all(grown.get_node(key) == "worker-4" for key in moved)
+    # The copy left the original ring untouched
+    assert all(ring.get_node(key) == before[key] for key in KEYS[:1000])
+
+
+def test_empty_ring_has_no_owner():
+    with pytest.raises(RuntimeError):
+        ConsistentHashRing().get_node("session")
+
+
+def call(dispatcher, path, chunks, headers=(), method="POST"):
+    """Run one request through the dispatcher; returns (status, JSON body)"""
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "headers": list(headers), "query_string": b""}
+    asyncio.run(dispatcher(scope, receive, send))
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+
+def test_oversized_bodies_are_rejected_before_parsing():
+    dispatcher = ShardDispatcher(["http://worker"], max_body_bytes=100, path_body_limits={"/api/chat": 50})
+    status, _ = call(dispatcher, "/api/chat", [b"{}"], [(b"content-length", b"51")])
+    assert status == 413
+    status, _ = call(dispatcher, "/api/other", [b"{}"], [(b"content-length", b"nope")])
+    assert status == 400
+    # Streamed without a length, reading stops once the limit is passed
+    status, _ = call(dispatcher, "/api/chat", [b"x" * 30, b"x" * 30, b"never read"])
+    assert status == 413
+    assert dispatcher.stats["rejected_bodies"] == 2
+
+
+@pytest.mark.parametrize("body", [b"[]", b'"url"', b'{"url": 5}', b'{"url": ""}', b"{not json"])
+def test_add_worker_rejects_malformed_bodies(body):
+    dispatcher = ShardDispatcher(["http://worker"], shard_token="secret")
+    status, _ = call(dispatcher, "/shard/workers", [body], [(b"x-shard-token", b"secret")])
+    assert status == 400
+    assert dispatcher.ring.nodes == ["http://worker"]
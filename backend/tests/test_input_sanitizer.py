@@ -0,0 +1,46 @@
+import random
+import re
+import time
+
+from brain.input_sanitizer import sanitize_text, strip_markup, truncate_text
+
+
+def regex_strip(text):
+    """The regex pipeline the sanitizer replaces"""
+    text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.IGNORECASE | re.DOTALL)
+    return re.sub(r'<[^>]+>', '', text)
+
+
+TOKENS = ["<", ">", "a", " ", "<script>", "<SCRIPT x>", "</script>", "</ScRiPt>", "<script", "</script", "é", "\n"]
+
+
+def test_matches_regex_pipeline_on_random_markup():
+    rng = random.Random(0)
+    for _ in range(20000):
+        text = "".join(rng.choice(TOKENS) for _ in range(rng.randint(0, 12)))
+        assert strip_markup(text) == regex_strip(text), repr(text)
+
+
+def test_examples():
+    assert strip_markup("<p>Hello <b>there</b></p>") == "Hello there"
+    assert strip_markup("a<script>alert(1)</script>b") == "ab"
+    assert strip_markup("<a <script>x</script> b>c") == "c"
+    assert strip_markup("<<script>x</script>>") == "<>"
+    assert strip_markup("1 < 2 and <> 3") == "1  3"
+    assert strip_markup("a <> b") == "a <> b"
+    assert strip_markup("<script>never closed <b>") == "never closed "
+
+
+def test_truncates_by_characters_and_bytes():
+    assert truncate_text("abcdef", max_chars=4) == "abcd"
+    # "é" is two bytes; a partial trailing character is dropped
+    assert truncate_text("ééé", max_bytes=5) == "éé"
+    assert sanitize_text("  <b>" + "x" * 20, max_chars=10) == "xxxxx"
+
+
+def test_hostile_input_is_bounded_by_the_limit():
+    for hostile in ("<script>" * 200000, "<a " * 500000, "<" * 1000000):
+        started = time.perf_counter()
+        result = sanitize_text(hostile, max_chars=10000, max_bytes=40000)
+        assert len(result) <= 10000
+        assert time.perf_counter() - started < 0.5
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+import brain.load_shedder
+from brain.load_shedder import AdaptiveConcurrencyLimiter, LoadLevel, OverloadedError, current_load_level
+from brain.metrics import MetricsRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(brain.load_shedder.time, "perf_counter", clock)
+    return clock
+
+
+def make_limiter(**options):
+    return AdaptiveConcurrencyLimiter(MetricsRegistry(), **options)
+
+
+async def wave(limiter, clock, concurrency, rtt):
+    """Admit `concurrency` requests together; each takes `rtt` seconds"""
+    entered = 0
+    all_in = asyncio.Event()
+    release = asyncio.Event()
+
+    async def request():
+        nonlocal entered
+        async with limiter.admit():
+            entered += 1
+            if entered == concurrency:
+                all_in.set()
+            await release.wait()
+
+    tasks = [asyncio.create_task(request()) for _ in range(concurrency)]
+    await all_in.wait()
+    clock.now += rtt
+    release.set()
+    await asyncio.gather(*tasks)
+
+
+def run_waves(limiter, clock, waves):
+    async def run():
+        for concurrency, rtt, count in waves:
+            for _ in range(count):
+                await wave(limiter, clock, concurrency, rtt)
+    asyncio.run(run())
+
+
+def test_limit_shrinks_when_latency_climbs(clock):
+    limiter = make_limiter(initial_limit=32, min_limit=4)
+    run_waves(limiter, clock, [(1, 0.1, 50)])
+    assert limiter.limit == 32
+
+    run_waves(limiter, clock, [(1, 1.0, 30)])
+    assert limiter.min_limit <= limiter.limit < 16
+
+
+def test_loop_lag_shrinks_limit_at_steady_latency(clock):
+    lag = 0.0
+    limiter = make_limiter(initial_limit=32, min_limit=4, lag_threshold_ms=100, loop_lag=lambda: lag)
+    run_waves(limiter, clock, [(1, 0.1, 20)])
+    assert limiter.limit == 32
+
+    lag = 0.5
+    run_waves(limiter, clock, [(1, 0.1, 10)])
+    assert limiter.limit < 20
+
+
+def test_limit_grows_only_when_traffic_uses_it(clock):
+    limiter = make_limiter(initial_limit=16, max_limit=64)
+    # Few requests in flight: a healthy latency alone doesn't raise the limit
+    run_waves(limiter, clock, [(2, 0.1, 20)])
+    assert limiter.limit == 16
+
+    run_waves(limiter, clock, [(12, 0.1, 5)])
+    assert 16 < limiter.limit <= 64
+
+
+def test_levels_degrade_in_order_before_rejecting():
+    limiter = make_limiter(initial_limit=10, skip_tts_at=0.7, short_history_at=0.85)
+    levels = []
+
+    async def run():
+        release = asyncio.Event()
+        admitted = []
+
+        async def request():
+            async with limiter.admit() as level:
+                admitted.append(level)
+                await release.wait()
+
+        tasks = []
+        for _ in range(10):
+            tasks.append(asyncio.create_task(request()))
+            await asyncio.sleep(0)
+        levels.extend(admitted)
+        with pytest.raises(OverloadedError) as rejected:
+            async with limiter.admit():
+                pass
+        release.set()
+        await asyncio.gather(*tasks)
+        return rejected.value
+
+    error = asyncio.run(run())
+    assert levels == [LoadLevel.NORMAL] * 7 + [LoadLevel.SKIP_TTS] * 2 + [LoadLevel.SHORT_HISTORY]
+    assert error.retry_after >= 1
+    assert limiter.admissions.by_label("level") == {"normal": 7, "skip_tts": 2, "short_history": 1, "reject": 1}
+    assert limiter.in_flight == 0
+
+
+def test_nested_admission_counts_once():
+    limiter = make_limiter(initial_limit=10)
+
+    async def run():
+        async with limiter.admit() as outer:
+            async with limiter.admit() as inner:
+                assert inner is outer is current_load_level()
+                assert limiter.in_flight == 1
+        assert current_load_level() is LoadLevel.NORMAL
+
+    asyncio.run(run())
+    assert limiter.admissions.by_label("level") == {"normal": 1}
+    assert limiter.in_flight == 0
@@ -0,0 +1,182 @@
+import asyncio
+import random
+import threading
+
+import pytest
+
+from brain.metrics import MetricsRegistry, registry
+from brain.rate_limiter import GCRARateLimiter, SQLiteRateLimiter
+from brain.security_manager import SecurityManager
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_limiter(request, tmp_path):
+    created = []
+
+    def make(limits, clock, max_keys=1000):
+        if request.param == "memory":
+            return GCRARateLimiter(limits, max_keys, clock)
+        limiter = SQLiteRateLimiter(str(tmp_path / "limits.sqlite3"), limits, max_keys, "user", clock=clock)
+        created.append(limiter)
+        return limiter
+
+    yield make
+    for limiter in created:
+        limiter.close()
+
+
+def test_burst_then_steady_rate(make_limiter):
+    clock = FakeClock()
+    limiter = make_limiter([(5, 60.0)], clock)
+    assert [limiter.hit("alice") for _ in range(5)] == [0.0] * 5
+    assert limiter.hit("alice") == pytest.approx(12.0)
+    # Other keys are unaffected
+    assert limiter.allow("bob")
+
+    clock.now += 11.9
+    assert not limiter.allow("alice")
+    clock.now += 0.1
+    assert limiter.allow("alice")
+    assert not limiter.allow("alice")
+
+
+def test_any_span_is_bounded_by_burst_plus_rate(make_limiter):
+    clock = FakeClock()
+    limits = [(10, 60.0), (3, 1.0)]
+    limiter = make_limiter(limits, clock)
+    rng = random.Random(1)
+    admitted = []
+    for _ in range(2000):
+        clock.now += rng.expovariate(1.0)
+        if limiter.allow("alice"):
+            admitted.append(clock.now)
+
+    for count, period in limits:
+        for span in (period, 10 * period):
+            start = 0
+            for end, at in enumerate(admitted):
+                while admitted[start] <= at - span:
+                    start += 1
+                assert end - start + 1 <= count + span * count / period
+    # Steady state is one request per emission interval of the tighter limit
+    assert len(admitted) == pytest.approx(2000 / 6.0, rel=0.1)
+
+
+def test_rejected_requests_do_not_consume_capacity(make_limiter):
+    clock = FakeClock()
+    limiter = make_limiter([(2, 10.0)], clock)
+    limiter.hit("alice")
+    limiter.hit("alice")
+    for _ in range(50):
+        assert not limiter.allow("alice")
+    clock.now += 5.0
+    assert limiter.allow("alice")
+
+
+def test_memory_limiter_is_bounded():
+    clock = FakeClock()
+    limiter = GCRARateLimiter([(5, 60.0)], max_keys=10, clock=clock)
+    for i in range(100):
+        limiter.hit(f"user-{i}")
+    assert len(limiter) <= 10
+    assert limiter.get_stats()["evicted"] > 0
+    # Idle keys are dropped before anyone is evicted
+    clock.now += 61.0
+    evicted = limiter.stats["evicted"]
+    for i in range(5):
+        limiter.hit(f"late-{i}")
+    assert limiter.stats["evicted"] == evicted
+
+
+def test_sqlite_matches_memory_decisions(tmp_path):
+    clock = FakeClock()
+    limits = [(5, 10.0), (20, 120.0)]
+    memory = GCRARateLimiter(limits, 1000, clock)
+    shared = SQLiteRateLimiter(str(tmp_path / "limits.sqlite3"), limits, 1000, "user", clock=clock)
+    rng = random.Random(2)
+    for _ in range(500):
+        clock.now += rng.expovariate(0.8)
+        key = rng.choice(["alice", "bob"])
+        assert shared.hit(key) == pytest.approx(memory.hit(key), abs=1e-6)
+    shared.close()
+
+
+def test_sqlite_state_is_shared_between_instances(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "limits.sqlite3")
+    first = SQLiteRateLimiter(path, [(3, 60.0)], 1000, "user", clock=clock)
+    second = SQLiteRateLimiter(path, [(3, 60.0)], 1000, "user", clock=clock)
+    ip = SQLiteRateLimiter(path, [(3, 60.0)], 1000, "ip", clock=clock)
+    assert first.allow("alice") and second.allow("alice") and first.allow("alice")
+    assert not second.allow("alice")
+    # Namespaces keep user and IP limits apart in the same table
+    assert ip.allow("alice")
+    assert (len(first), len(ip)) == (1, 1)
+    for limiter in (first, second, ip):
+        limiter.close()
+
+
+def test_sqlite_prunes_expired_and_excess_keys(tmp_path):
+    clock = FakeClock()
+    limiter = SQLiteRateLimiter(str(tmp_path / "limits.sqlite3"), [(5, 60.0)], 10, "user", prune_interval=1000, clock=clock)
+    for i in range(30):
+        limiter.hit(f"user-{i}")
+    limiter.prune()
+    assert len(limiter) == 10
+    clock.now += 61.0
+    limiter.prune()
+    assert len(limiter) == 0
+    limiter.close()
+
+
+def test_sqlite_fails_open(tmp_path):
+    limiter = SQLiteRateLimiter(str(tmp_path / "limits.sqlite3"), [(1, 60.0)], 10, "user", clock=FakeClock())
+    limiter._conn.close()
+    assert limiter.allow("alice") and limiter.allow("alice")
+    assert limiter.get_stats()["errors"] == 2
+
+
+def test_shared_limits_are_checked_off_the_event_loop(tmp_path):
+    security = SecurityManager({"rate_limiting": {
+        "enabled": True,
+        "backend": "sqlite",
+        "sqlite_path": str(tmp_path / "limits.sqlite3"),
+        "max_requests_per_minute": 2,
+        "max_requests_per_hour": 100
+    }})
+    threads = []
+    hit = security.rate_limiter.hit
+    security.rate_limiter.hit = lambda key: (threads.append(threading.get_ident()), hit(key))[1]
+
+    async def check():
+        return [await security.check_request_limits_async(None, "alice") for _ in range(3)]
+
+    results = asyncio.run(check())
+    assert results[:2] == [0.0, 0.0] and results[2] > 0
+    assert threading.get_ident() not in threads
+
+
+def test_check_timings_come_from_the_shared_histogram():
+    security = SecurityManager()
+    before = security.check_stats().get("body_size", {}).get("count", 0)
+    security.record_check("body_size", 0.002)
+    security.record_check("body_size", 0.004)
+    assert security.get_stats()["checks"]["body_size"]["count"] == before + 2
+
+    # Stats over a merged registry include the other workers' checks
+    other = MetricsRegistry()
+    other.histogram("thinkxlife_security_check_seconds", "", ("check",)).observe(0.5, "rate_limit")
+    merged = MetricsRegistry()
+    merged.merge(registry.snapshot())
+    merged.merge(other.snapshot())
+    checks = security.check_stats(merged)
+    assert checks["rate_limit"]["count"] == 1 and checks["rate_limit"]["max"] == 0.5
+    assert checks["body_size"]["count"] == before + 2
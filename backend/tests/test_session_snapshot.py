@@ -0,0 +1,134 @@
+import asyncio
+import os
+import stat
+import time
+
+import pytest
+
+from zoe.conversation_manager import ZoeConversationManager
+from zoe.session_snapshot import SessionSnapshot, claim_snapshot_path, fcntl, write_snapshot
+import zoe.zoe_core
+from zoe.zoe_core import ZoeCore
+
+
+def populated_manager():
+    manager = ZoeConversationManager()
+    session_ids = []
+    for user_id in ("alice", "bob"):
+        for i in range(3):
+            session_id = manager.create_session(user_id, {"ace_score": i})
+            manager.add_message(session_id, "user", f"{user_id} says {i}")
+            manager.add_message(session_id, "assistant", f"reply to {user_id} {i}")
+            session_ids.append(session_id)
+    return manager, session_ids
+
+
+def test_snapshot_round_trip_loads_sessions_lazily(tmp_path):
+    path = str(tmp_path / "sessions.snapshot")
+    manager, session_ids = populated_manager()
+    stats = write_snapshot(path, manager.iter_session_records())
+    assert stats["sessions"] == len(session_ids)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+    restored = ZoeConversationManager()
+    snapshot = SessionSnapshot.open(path)
+    assert restored.attach_snapshot(snapshot) == len(session_ids)
+    # Only the index is read when attaching
+    assert snapshot.loaded_sessions == 0 and not restored.sessions
+    # Per-user session order survives the round trip
+    assert list(restored.user_sessions["alice"]) == session_ids[:3]
+
+    session = restored.get_session(session_ids[4])
+    assert [m.content for m in session.messages] == ["bob says 1", "reply to bob 1"]
+    assert session.user_context["ace_score"] == 1
+    assert snapshot.loaded_sessions == 1
+    assert snapshot.get_stats()["pending_sessions"] == len(session_ids) - 1
+    restored.close()
+
+
+def test_unreadable_snapshot_is_ignored(tmp_path):
+    path = tmp_path / "sessions.snapshot"
+    assert SessionSnapshot.open(str(path)) is None
+    path.write_bytes(b"not a snapshot at all, just some bytes")
+    assert SessionSnapshot.open(str(path)) is None
+
+    # A snapshot cut short by a crash is rejected rather than half-read
+    manager, _ = populated_manager()
+    write_snapshot(str(path), manager.iter_session_records())
+    data = path.read_bytes()
+    path.write_bytes(data[:-4])
+    assert SessionSnapshot.open(str(path)) is None
+
+
+def test_restart_restores_sessions_from_configured_path(tmp_path):
+    path = str(tmp_path / "sessions.snapshot")
+
+    async def run(add_message):
+        zoe = ZoeCore()
+        restored = zoe.load_snapshot(path)
+        if add_message:
+            session_id = zoe.conversation_manager.create_session("alice", {})
+            zoe.conversation_manager.add_message(session_id, "user", "hello")
+        await zoe.shutdown()
+        return zoe, restored
+
+    first, restored = asyncio.run(run(True))
+    assert restored == 0
+    # A single process uses the configured path as-is
+    assert first.snapshot_path == path and os.path.exists(path)
+
+    second, restored = asyncio.run(run(False))
+    assert restored == 1 and second.snapshot_path == path
+
+
+@pytest.mark.skipif(fcntl is None, reason="slots need fcntl")
+def test_workers_claim_stable_snapshot_slots(tmp_path):
+    path = str(tmp_path / "sessions.snapshot")
+    first, first_lock = claim_snapshot_path(path)
+    second, second_lock = claim_snapshot_path(path)
+    assert first == path
+    assert second == str(tmp_path / "sessions.1.snapshot")
+
+    # A restarted worker gets the slot its predecessor held
+    second_lock.close()
+    again, again_lock = claim_snapshot_path(path)
+    assert again == second
+    first_lock.close()
+    again_lock.close()
+
+    assert claim_snapshot_path(path, "w7")[0] == str(tmp_path / "sessions.w7.snapshot")
+
+
+def test_shutdown_waits_for_cancelled_snapshot_write(tmp_path, monkeypatch):
+    path = str(tmp_path / "sessions.snapshot")
+    started = []
+
+    def slow_write(target, records):
+        started.append(target)
+        time.sleep(0.2)
+        return write_snapshot(target, records)
+
+    monkeypatch.setattr(zoe.zoe_core, "write_snapshot", slow_write)
+
+    async def run():
+        zoe = ZoeCore()
+        zoe.load_snapshot(path)
+        for user_id in ("alice", "bob"):
+            session_id = zoe.conversation_manager.create_session(user_id, {})
+            zoe.conversation_manager.add_message(session_id, "user", "hello")
+        periodic = asyncio.create_task(zoe.save_snapshot())
+        while not started:
+            await asyncio.sleep(0.01)
+        # Cancelling the caller leaves the write thread running; shutdown must
+        # not start its own write on top of it
+        periodic.cancel()
+        await asyncio.gather(periodic, return_exceptions=True)
+        await zoe.shutdown()
+
+    asyncio.run(run())
+    assert len(started) == 2
+    snapshot = SessionSnapshot.open(path)
+    assert snapshot is not None and len(snapshot) == 2
+    snapshot.close()
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
@@ -0,0 +1,82 @@
+import os
+import stat
+
+from zoe.conversation_manager import ZoeConversationManager
+from zoe.session_store import SessionSpillStore
+
+
+def make_sessions(count, messages=3, user_id="alice"):
+    manager = ZoeConversationManager()
+    sessions = []
+    for i in range(count):
+        session_id = manager.create_session(user_id, {"ace_score": i})
+        for turn in range(messages):
+            manager.add_message(session_id, "user", f"message {i}-{turn} " + "x" * 200)
+            manager.add_message(session_id, "assistant", f"reply {i}-{turn}")
+        sessions.append(manager.sessions[session_id])
+    return sessions
+
+
+def test_round_trip_keeps_the_conversation():
+    store = SessionSpillStore()
+    try:
+        session = make_sessions(1)[0]
+        store.put(session)
+        assert session.session_id in store
+        user_id, last_activity = next(
+            (user, ts) for sid, user, ts, _ in store.iter_metadata() if sid == session.session_id
+        )
+        assert (user_id, last_activity) == ("alice", session.last_activity.timestamp())
+
+        restored = store.take(session.session_id)
+        assert session.session_id not in store
+        assert [m.content for m in restored.messages] == [m.content for m in session.messages]
+        assert restored.user_context == session.user_context
+        assert restored.stats.to_dict() == session.stats.to_dict()
+        assert restored.total_messages == session.total_messages
+    finally:
+        store.close()
+
+
+def test_rewrites_supersede_earlier_records():
+    store = SessionSpillStore()
+    try:
+        session = make_sessions(1)[0]
+        store.put(session)
+        session.summary = "updated"
+        store.put(session)
+        assert len(store) == 1
+        assert store.dead_bytes > 0
+        assert store.take(session.session_id).summary == "updated"
+    finally:
+        store.close()
+
+
+def test_compaction_keeps_live_sessions_readable():
+    store = SessionSpillStore()
+    store.compaction_min_bytes = 1
+    try:
+        sessions = make_sessions(20)
+        for session in sessions:
+            store.put(session)
+        size_before = store.get_stats()["file_bytes"]
+        # Dropping most sessions makes dead bytes outweigh live ones
+        for session in sessions[:15]:
+            store.discard(session.session_id)
+
+        stats = store.get_stats()
+        assert stats["dead_bytes"] < stats["live_bytes"]
+        assert stats["file_bytes"] < size_before / 2
+        for session in sessions[15:]:
+            assert store.take(session.session_id).messages[0].content == session.messages[0].content
+    finally:
+        store.close()
+
+
+def test_spill_file_is_private_and_removed_on_close():
+    store = SessionSpillStore()
+    directory = os.path.dirname(store.path)
+    assert stat.S_IMODE(os.stat(store.path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+    store.close()
+    assert not os.path.exists(directory)
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import stat
+import subprocess
+import sys
+
+import pytest
+
+from brain.metrics import MetricsRegistry
+from brain.shared_metrics import RETIRED_FILE, SharedMetrics
+
+
+def make_worker(directory, pid, requests, allowed, tracked):
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests").inc(amount=requests)
+    shared = SharedMetrics(registry, str(directory))
+    shared.path = os.path.join(str(directory), f"metrics-{pid}.json")
+    shared.add_section("security", lambda: {
+        "backend": "memory",
+        "allowed": allowed,
+        "tracked_keys": tracked,
+        "max_keys": 10,
+        "checks": {"rate_limit": {"count": 2, "seconds_total": allowed / 10, "seconds_max": allowed / 100, "seconds_avg": 0.0}}
+    })
+    return shared
+
+
+def test_sections_are_merged_by_field_kind(tmp_path):
+    local = make_worker(tmp_path, os.getpid(), 3, 3, 5)
+    other = make_worker(tmp_path, 999999, 4, 7, 1)
+
+    async def run():
+        await other.flush()
+        return await local.merged_all()
+
+    registry, sections = asyncio.run(run())
+    security = sections["security"]
+    assert registry.metrics["requests_total"].get() == 7
+    assert (security["allowed"], security["tracked_keys"], security["max_keys"]) == (10, 6, 10)
+    check = security["checks"]["rate_limit"]
+    assert check["count"] == 4
+    assert check["seconds_max"] == pytest.approx(0.07)
+    assert check["seconds_avg"] == pytest.approx(1.0 / 4)
+
+
+def test_counters_survive_a_worker_stopping(tmp_path):
+    local = make_worker(tmp_path, os.getpid(), 3, 3, 5)
+    other = make_worker(tmp_path, 999999, 4, 7, 1)
+
+    async def run():
+        await other.flush()
+        await other.stop()
+        return await local.merged_all()
+
+    registry, sections = asyncio.run(run())
+    assert registry.metrics["requests_total"].get() == 7
+    assert sections["security"]["allowed"] == 10
+    # The stopped worker's gauges are not carried over
+    assert sections["security"]["tracked_keys"] == 5
+    assert not os.path.exists(other.path)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="folding in exited workers needs fcntl")
+def test_exited_worker_is_folded_in_once(tmp_path):
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    local = make_worker(tmp_path, os.getpid(), 3, 3, 5)
+    crashed = make_worker(tmp_path, exited.pid, 10, 100, 50)
+
+    async def run():
+        await crashed.flush()
+        os.utime(crashed.path, (0, 0))
+        first = await local.merged_all()
+        second = await local.merged_all()
+        return first, second
+
+    (registry, sections), (again, _) = asyncio.run(run())
+    assert registry.metrics["requests_total"].get() == 13
+    assert again.metrics["requests_total"].get() == 13
+    assert sections["security"]["allowed"] == 103
+    assert not os.path.exists(crashed.path)
+
+
+def test_lone_worker_discards_the_retired_base(tmp_path):
+    other = make_worker(tmp_path, 999999, 4, 7, 1)
+
+    async def run():
+        await other.flush()
+        await other.stop()
+        assert os.path.exists(tmp_path / RETIRED_FILE)
+        fresh = SharedMetrics(MetricsRegistry(), str(tmp_path), flush_interval=0.01)
+        fresh.start()
+        await asyncio.sleep(0.05)
+        discarded = not os.path.exists(tmp_path / RETIRED_FILE)
+        await fresh.stop()
+        return discarded
+
+    assert asyncio.run(run())
+
+
+def test_directory_must_be_private(tmp_path):
+    shared = make_worker(tmp_path / "metrics", os.getpid(), 1, 1, 1)
+    asyncio.run(shared.flush())
+    assert shared.stats["flushes"] == 1
+    assert stat.S_IMODE(os.stat(shared.directory).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(shared.path).st_mode) == 0o600
+
+    # A directory other users can write to is refused
+    os.chmod(shared.directory, 0o777)
+    asyncio.run(shared.flush())
+    assert shared.stats["flush_errors"] == 1
+
+
+def test_planted_symlink_is_not_followed(tmp_path):
+    shared = make_worker(tmp_path / "metrics", os.getpid(), 1, 1, 1)
+    os.makedirs(shared.directory, mode=0o700)
+    target = tmp_path / "elsewhere"
+    target.write_text("untouched")
+    os.symlink(target, f"{shared.path}.tmp")
+    asyncio.run(shared.flush())
+    assert target.read_text() == "untouched"
+    assert shared.stats["flush_errors"] == 1
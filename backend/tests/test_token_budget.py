@@ -0,0 +1,79 @@
+from brain.token_budget import TokenBudgetManager
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_budget(**config):
+    clock = FakeClock()
+    config = {"user": {"tokens_per_minute": 1000}, **config}
+    return TokenBudgetManager(config, clock=clock), clock
+
+
+# 300 system + 400 // 4 prompt + 300 completion, with or without the degraded overrides
+REQUEST = {"message": "x" * 400}
+
+
+def outcome(reservation):
+    if reservation.rejected:
+        return "rejected"
+    return "degraded" if reservation.degraded else "allowed"
+
+
+def test_estimate_matches_turn_size():
+    budget, _ = make_budget()
+    assert budget.estimate_tokens(REQUEST) == 700
+    assert budget.estimate_tokens(REQUEST, history_limit=4, max_tokens=300) == 700
+
+
+def test_degraded_turns_are_not_rejected_right_after_the_budget_runs_out():
+    budget, _ = make_budget(reject_debt_factor=1.0)
+    results = []
+    for _ in range(4):
+        reservation = budget.reserve("alice", "general_chat", REQUEST)
+        results.append(outcome(reservation))
+    assert results == ["allowed", "degraded", "degraded", "degraded"]
+
+
+def test_degraded_reservation_holds_only_what_fits():
+    budget, _ = make_budget()
+    assert budget.reserve("alice", "general_chat", REQUEST).reserved_tokens == 700
+    degraded = budget.reserve("alice", "general_chat", REQUEST)
+    assert degraded.degraded and degraded.reserved_tokens == 300
+    assert budget.get_remaining("alice", "general_chat") == {"user:alice": {"per_minute": 0}}
+    assert budget.reserve("alice", "general_chat", REQUEST).reserved_tokens == 0
+
+
+def test_settled_usage_with_default_debt_factor():
+    budget, _ = make_budget()
+    results = []
+    for _ in range(6):
+        reservation = budget.reserve("alice", "general_chat", REQUEST)
+        results.append(outcome(reservation))
+        budget.settle(reservation, 700)
+    # 1000 -> 300 -> -400 -> -1100 -> -1800 -> -2500, rejected below -2000
+    assert results == ["allowed", "degraded", "degraded", "degraded", "degraded", "rejected"]
+
+
+def test_debt_is_repaid_by_refill():
+    budget, clock = make_budget()
+    for _ in range(5):
+        budget.settle(budget.reserve("alice", "general_chat", REQUEST), 700)
+    assert outcome(budget.reserve("alice", "general_chat", REQUEST)) == "rejected"
+    clock.now += 60.0
+    assert outcome(budget.reserve("alice", "general_chat", REQUEST)) == "degraded"
+    clock.now += 180.0
+    assert outcome(budget.reserve("alice", "general_chat", REQUEST)) == "allowed"
+
+
+def test_failed_call_refunds_reservation():
+    budget, _ = make_budget()
+    reservation = budget.reserve("alice", "general_chat", REQUEST)
+    budget.settle(reservation, 0)
+    assert budget.get_remaining("alice", "general_chat") == {"user:alice": {"per_minute": 1000}}
+    assert budget.stats["refunded_tokens"] == 700
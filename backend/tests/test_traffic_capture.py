@@ -0,0 +1,48 @@
+import asyncio
+import gzip
+import json
+import time
+
+from brain.traffic_capture import FIELDS, TrafficCapture, capture_path_for_worker, read_capture, read_captures
+
+
+def test_worker_paths_never_collide():
+    assert capture_path_for_worker("logs/traffic.{pid}.jsonl.gz", 7) == "logs/traffic.7.jsonl.gz"
+    assert capture_path_for_worker("logs/traffic.jsonl.gz", 7) == "logs/traffic.7.jsonl.gz"
+    assert capture_path_for_worker("traffic", 7) == "traffic.7"
+
+
+def test_failed_requests_are_captured_with_their_status(tmp_path):
+    path = str(tmp_path / "traffic.gz")
+    capture = TrafficCapture(path)
+    now = time.monotonic()
+    capture.record("zoe", "chatbot", "hello", now, session_id="a", new_session=True)
+    capture.record("chat", "chatbot", None, now, status=429)
+    asyncio.run(capture.stop())
+
+    headers, events = read_capture(path)
+    assert headers[0]["fields"] == list(FIELDS)
+    assert [(event["message_chars"], event["status"]) for event in events] == [(5, 200), (0, 429)]
+
+
+def test_version_1_files_still_read(tmp_path):
+    path = str(tmp_path / "old.gz")
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"format": "thinkxlife-traffic", "version": 1, "fields": list(FIELDS[:-1])}) + "\n")
+        f.write(json.dumps([10, "zoe", "chatbot", 4, 0, 1, 0]) + "\n")
+    _, events = read_capture(path)
+    assert events[0]["message_chars"] == 4 and events[0]["status"] is None
+
+
+def test_worker_files_share_one_clock(tmp_path):
+    first, second = str(tmp_path / "a.gz"), str(tmp_path / "b.gz")
+    for path, session in ((first, "x"), (second, "y")):
+        capture = TrafficCapture(path)
+        capture.record("zoe", "chatbot", "hi", time.monotonic(), session_id=session)
+        asyncio.run(capture.stop())
+        time.sleep(0.02)
+
+    headers, events = read_captures([first, second])
+    # Runs are numbered across files, so each keeps its own sessions
+    assert [event["run"] for event in events] == [0, 1]
+    assert headers[0]["start_ms"] == 0 and headers[1]["start_ms"] >= 20
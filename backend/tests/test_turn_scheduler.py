@@ -0,0 +1,159 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from brain.load_shedder import AdaptiveConcurrencyLimiter, LoadLevel, current_load_level
+from brain.metrics import MetricsRegistry
+from zoe.turn_scheduler import SessionTurnScheduler
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_turns_of_one_session_run_in_order():
+    async def scenario():
+        scheduler = SessionTurnScheduler(coalesce_duplicates=False)
+        events = []
+
+        def turn(name, delay):
+            async def body():
+                events.append(f"start {name}")
+                await asyncio.sleep(delay)
+                events.append(f"end {name}")
+                return name
+            return body
+
+        results = await asyncio.gather(
+            scheduler.run("s1", "a", turn("a", 0.02)),
+            scheduler.run("s1", "b", turn("b", 0.0)),
+            scheduler.run("s2", "c", turn("c", 0.0))
+        )
+        return scheduler, events, results
+
+    scheduler, events, results = run(scenario())
+    assert results == ["a", "b", "c"]
+    assert events.index("end a") < events.index("start b")
+    # Another session is not held up
+    assert events.index("end c") < events.index("end a")
+    assert scheduler.stats["queued_turns"] == 1
+    assert scheduler.get_status()["active_sessions"] == 0
+
+
+def test_duplicate_message_is_answered_once():
+    async def scenario():
+        scheduler = SessionTurnScheduler()
+        calls = []
+
+        async def turn():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"response": "hi"}
+
+        first, second = await asyncio.gather(scheduler.run("s1", "hello", turn), scheduler.run("s1", "hello", turn))
+        return scheduler, calls, first, second
+
+    scheduler, calls, first, second = run(scenario())
+    assert len(calls) == 1
+    assert first == second and first is not second
+    assert scheduler.stats["coalesced_turns"] == 1
+
+
+def test_duplicate_survives_the_first_caller_being_cancelled():
+    async def scenario():
+        scheduler = SessionTurnScheduler()
+
+        async def turn():
+            await asyncio.sleep(0.02)
+            return {"response": "done"}
+
+        first = asyncio.create_task(scheduler.run("s1", "hello", turn))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(scheduler.run("s1", "hello", turn))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert run(scenario()) == {"response": "done"}
+
+
+def test_turn_is_cancelled_when_every_caller_is():
+    async def scenario():
+        scheduler = SessionTurnScheduler()
+        finished = []
+
+        async def turn():
+            await asyncio.sleep(0.05)
+            finished.append(1)
+
+        callers = [asyncio.create_task(scheduler.run("s1", "hello", turn)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0.08)
+        return scheduler, finished
+
+    scheduler, finished = run(scenario())
+    assert finished == []
+    assert scheduler.get_status()["inflight_turns"] == 0
+
+
+def test_admission_is_taken_after_the_session_lock_and_not_for_duplicates():
+    async def scenario():
+        admitted = []
+
+        @asynccontextmanager
+        async def admit():
+            admitted.append(asyncio.get_running_loop().time())
+            yield LoadLevel.NORMAL
+
+        scheduler = SessionTurnScheduler(admit=admit)
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "slow"
+
+        async def fast():
+            return "fast"
+
+        start = asyncio.get_running_loop().time()
+        await asyncio.gather(
+            scheduler.run("s1", "one", slow),
+            scheduler.run("s1", "one", slow),
+            scheduler.run("s1", "two", fast)
+        )
+        return start, admitted
+
+    start, admitted = run(scenario())
+    # The duplicate of "one" took no admission; "two" was admitted only after "one" finished
+    assert len(admitted) == 2
+    assert admitted[1] - start >= 0.04
+
+
+def test_queue_wait_does_not_feed_the_latency_signal():
+    async def scenario():
+        limiter = AdaptiveConcurrencyLimiter(MetricsRegistry())
+        rtts = []
+        update = limiter._update
+        limiter._update = lambda rtt, in_flight: (rtts.append(rtt), update(rtt, in_flight))
+        scheduler = SessionTurnScheduler(admit=limiter.admit)
+        levels = []
+
+        def turn(delay):
+            async def body():
+                levels.append(current_load_level())
+                await asyncio.sleep(delay)
+            return body
+
+        await asyncio.gather(*(scheduler.run("s1", str(i), turn(0.02)) for i in range(3)))
+        return limiter, levels, rtts
+
+    limiter, levels, rtts = run(scenario())
+    assert levels == [LoadLevel.NORMAL] * 3
+    assert limiter.in_flight == 0
+    # Each turn's own 20ms; the later turns queued for 20ms and 40ms before that
+    assert len(rtts) == 3 and max(rtts) < 0.035
@@ -0,0 +1,39 @@
+import asyncio
+
+from brain.usage_ledger import UsageLedger
+
+
+def test_flush_keeps_totals_when_the_directory_cannot_be_created(tmp_path):
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    ledger = UsageLedger(str(blocker / "usage.sqlite3"))
+    ledger.record("alice", "general_chat", "gpt-4o-mini", 100, 50)
+
+    asyncio.run(ledger.flush())
+    assert ledger.stats["flush_errors"] == 1
+    assert list(ledger._pending.values()) == [[1, 100, 50]]
+
+    # Once the path is usable the kept totals are written with newer ones
+    ledger.path = str(tmp_path / "usage.sqlite3")
+    ledger.record("alice", "general_chat", "gpt-4o-mini", 10, 5)
+    asyncio.run(ledger.flush())
+    totals = ledger.query()["totals"]
+    assert (totals["requests"], totals["prompt_tokens"], totals["completion_tokens"]) == (2, 110, 55)
+
+
+def test_flush_loop_survives_errors(tmp_path):
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    ledger = UsageLedger(str(blocker / "usage.sqlite3"), flush_interval=0.01)
+    ledger.record("alice", "general_chat", "gpt-4o-mini", 1, 1)
+
+    async def run():
+        ledger.start()
+        await asyncio.sleep(0.1)
+        assert not ledger._task.done()
+        ledger.path = str(tmp_path / "usage.sqlite3")
+        await ledger.stop()
+
+    asyncio.run(run())
+    assert ledger.stats["flush_errors"] >= 2
+    assert ledger.query()["totals"]["requests"] == 1
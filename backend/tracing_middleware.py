@@ -0,0 +1,52 @@
+"""
+Tracing middleware for the ThinkxLife backend
+
+Raw ASGI middleware that starts a trace for sampled requests, adds a
+Server-Timing header with the stage spans recorded while the request was
+handled, and emits the trace's structured span record when it completes.
+"""
+
+import logging
+
+from brain.tracing import Tracer
+
+logger = logging.getLogger(__name__)
+
+
+class TracingMiddleware:
+    """Per-request span tracing with Server-Timing response headers"""
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace, token = self.tracer.start(f"{scope['method']} {scope['path']}")
+        if trace is None:
+            await self.app(scope, receive, send)
+            return
+
+        status = None
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # Spans finished by now cover the whole handler for non-streaming responses
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"server-timing", trace.server_timing().encode("latin-1"))
+                    ]
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            self.tracer.finish(trace, token, status=status)
@@ -12,6 +12,8 @@ from typing import Optional
 import httpx
 from dotenv import load_dotenv
 
+from brain.tracing import span
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -56,33 +58,35 @@ class TTSService:
             
             logger.info(f"Generating TTS for text: {clean_text[:50]}{'...' if len(clean_text) > 50 else ''}")
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.base_url,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "input": clean_text,
-                        "voice": self.voice,
-                        "response_format": "mp3",
-                        "speed": 1.0
-                    },
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    # Convert audio bytes to base64
-                    audio_bytes = response.content
+            with span("tts"):
+                async with httpx.AsyncClient() as client:
+                    response = await client.post(
+                        self.base_url,
+                        headers={
+                            "Authorization": f"Bearer {self.api_key}",
+                            "Content-Type": "application/json"
+                        },
+                        json={
+                            "model": self.model,
+                            "input": clean_text,
+                            "voice": self.voice,
+                            "response_format": "mp3",
+                            "speed": 1.0
+                        },
+                        timeout=30.0
+                    )
+            
+            if response.status_code == 200:
+                # Convert audio bytes to base64
+                audio_bytes = response.content
+                with span("tts_encode"):
                     audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-                    
-                    logger.info(f"TTS generated successfully: {len(audio_bytes)} bytes")
-                    return audio_base64
-                else:
-                    logger.error(f"OpenAI TTS API error: {response.status_code} - {response.text}")
-                    return None
+                
+                logger.info(f"TTS generated successfully: {len(audio_bytes)} bytes")
+                return audio_base64
+            else:
+                logger.error(f"OpenAI TTS API error: {response.status_code} - {response.text}")
+                return None
                     
         except Exception as e:
             logger.error(f"TTS generation error: {str(e)}")
@@ -6,5 +6,6 @@ Integrates with the Brain module for LLM calls and responses with full conversat
 from .zoe_core import ZoeCore
 from .conversation_manager import ZoeConversationManager
 from .personality import ZoePersonality
+from .summarizer import ConversationSummarizer
 
-__all__ = ["ZoeCore", "ZoeConversationManager", "ZoePersonality"] 
\ No newline at end of file
+__all__ = ["ZoeCore", "ZoeConversationManager", "ZoePersonality", "ConversationSummarizer"] 
\ No newline at end of file
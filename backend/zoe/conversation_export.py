@@ -0,0 +1,318 @@
+"""
+Zoe Conversation Export
+
+Streaming bulk export of conversation sessions for research. Sessions are
+iterated lazily and written one record (NDJSON) or one record batch (Arrow,
+Parquet) at a time, so memory use stays constant however many sessions are
+exported.
+"""
+
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional
+
+from .conversation_manager import ConversationSession, ZoeConversationManager
+from .session_store import decode_session
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+EXPORT_FORMATS = ("ndjson", "arrow", "parquet")
+
+
+def iter_manager_sessions(
+    manager: ZoeConversationManager,
+    user_id: Optional[str] = None,
+    since: Optional[datetime] = None
+) -> Iterator[ConversationSession]:
+    """
+    Lazily iterate a manager's sessions, oldest first per user
+
+    Spilled and snapshot sessions are decoded for the export only and are not
+    loaded into the resident cache.
+    """
+    if user_id is not None:
+        user_indexes = [(user_id, manager.user_sessions.get(user_id) or {})]
+    else:
+        user_indexes = list(manager.user_sessions.items())
+
+    since_ts = since.timestamp() if since else None
+    for _, user_index in user_indexes:
+        for session_id in list(user_index):
+            session = manager.sessions.get(session_id)
+            if session is not None:
+                yield session
+                continue
+
+            for store in manager._cold_stores():
+                entry = store.index.get(session_id)
+                if entry is None:
+                    continue
+                # Skip decoding sessions that cannot match the time filter
+                if since_ts is None or entry[3] >= since_ts:
+                    yield decode_session(store.read_payload(session_id))
+                break
+
+
+def iter_snapshot_sessions(snapshot) -> Iterator[ConversationSession]:
+    """Lazily iterate the sessions of a SessionSnapshot without consuming it"""
+    for session_id, *_ in snapshot.iter_metadata():
+        payload = snapshot.read_payload(session_id)
+        if payload is not None:
+            yield decode_session(payload)
+
+
+def filter_sessions(
+    sessions: Iterable[ConversationSession],
+    user_id: Optional[str] = None,
+    application: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> Iterator[ConversationSession]:
+    """
+    Filter sessions by user, application and time
+
+    A session matches the time range if it was active at any point in it:
+    last activity at or after `since` and creation at or before `until`.
+    """
+    for session in sessions:
+        if user_id is not None and session.user_id != user_id:
+            continue
+        if since is not None and session.last_activity < since:
+            continue
+        if until is not None and session.created_at > until:
+            continue
+        if application is not None and application not in session.stats.applications:
+            continue
+        yield session
+
+
+def session_to_record(session: ConversationSession, include_messages: bool = True) -> Dict[str, Any]:
+    """Flatten a session into an export record with columnar message statistics"""
+    stats = session.stats
+    record = {
+        "session_id": session.session_id,
+        "user_id": session.user_id,
+        "created_at": session.created_at.isoformat(),
+        "last_activity": session.last_activity.isoformat(),
+        "active": session.active,
+        "applications": sorted(stats.applications),
+        "total_messages": session.total_messages,
+        "retained_messages": len(session.messages),
+        "user_messages": stats.user_messages,
+        "assistant_messages": stats.assistant_messages,
+        "total_chars": stats.total_chars,
+        "total_tokens": stats.total_tokens,
+        "redirect_count": stats.redirects,
+        "error_count": stats.errors,
+        "first_message_at": stats.first_message_at.isoformat() if stats.first_message_at else None,
+        "last_message_at": stats.last_message_at.isoformat() if stats.last_message_at else None,
+        "summary": session.summary
+    }
+
+    if include_messages:
+        record["messages"] = [
+            {
+                "id": msg.id,
+                "role": msg.role,
+                "content": msg.content,
+                "timestamp": msg.timestamp.isoformat(),
+                "application": (msg.metadata or {}).get("application")
+            }
+            for msg in session.messages
+        ]
+
+    return record
+
+
+def iter_ndjson(records: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Encode records as newline-delimited JSON lines"""
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+
+
+def write_ndjson(records: Iterable[Dict[str, Any]], out: IO[bytes]) -> int:
+    """Stream records to a binary file as NDJSON, returning the record count"""
+    count = 0
+    for line in iter_ndjson(records):
+        out.write(line)
+        count += 1
+    return count
+
+
+def _arrow_schema(include_messages: bool):
+    fields = [
+        ("session_id", pa.string()),
+        ("user_id", pa.string()),
+        ("created_at", pa.timestamp("us")),
+        ("last_activity", pa.timestamp("us")),
+        ("active", pa.bool_()),
+        ("applications", pa.list_(pa.string())),
+        ("total_messages", pa.int64()),
+        ("retained_messages", pa.int64()),
+        ("user_messages", pa.int64()),
+        ("assistant_messages", pa.int64()),
+        ("total_chars", pa.int64()),
+        ("total_tokens", pa.int64()),
+        ("redirect_count", pa.int64()),
+        ("error_count", pa.int64()),
+        ("first_message_at", pa.timestamp("us")),
+        ("last_message_at", pa.timestamp("us")),
+        ("summary", pa.string())
+    ]
+    if include_messages:
+        fields.append(("messages", pa.list_(pa.struct([
+            ("id", pa.string()),
+            ("role", pa.string()),
+            ("content", pa.string()),
+            ("timestamp", pa.timestamp("us")),
+            ("application", pa.string())
+        ]))))
+    return pa.schema(fields)
+
+
+def _to_arrow_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert ISO timestamps back to datetimes for Arrow timestamp columns"""
+    row = dict(record)
+    for key in ("created_at", "last_activity", "first_message_at", "last_message_at"):
+        if row.get(key):
+            row[key] = datetime.fromisoformat(row[key])
+    if "messages" in row:
+        row["messages"] = [
+            {**msg, "timestamp": datetime.fromisoformat(msg["timestamp"])} for msg in row["messages"]
+        ]
+    return row
+
+
+def write_arrow(
+    records: Iterable[Dict[str, Any]],
+    path: str,
+    file_format: str = "parquet",
+    include_messages: bool = True,
+    batch_size: int = 1000
+) -> int:
+    """
+    Stream records to an Arrow IPC or Parquet file in record batches
+
+    Returns:
+        Number of records written
+    """
+    if not ARROW_AVAILABLE:
+        raise ImportError("pyarrow package not available. Install with: pip install pyarrow")
+
+    schema = _arrow_schema(include_messages)
+    if file_format == "parquet":
+        writer = pq.ParquetWriter(path, schema)
+        write_batch = writer.write_batch
+    else:
+        sink = pa.OSFile(path, "wb")
+        writer = pa.ipc.new_file(sink, schema)
+        write_batch = writer.write_batch
+
+    count = 0
+    batch: List[Dict[str, Any]] = []
+    try:
+        for record in records:
+            batch.append(_to_arrow_row(record))
+            if len(batch) >= batch_size:
+                write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+            count += len(batch)
+    finally:
+        writer.close()
+        if file_format != "parquet":
+            sink.close()
+
+    return count
+
+
+def _as_local_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Session timestamps are naive local time; align timezone-aware filters"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def export_records(
+    sessions: Iterable[ConversationSession],
+    user_id: Optional[str] = None,
+    application: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_messages: bool = True
+) -> Iterator[Dict[str, Any]]:
+    """Filter sessions and flatten them into export records"""
+    since, until = _as_local_naive(since), _as_local_naive(until)
+    for session in filter_sessions(sessions, user_id, application, since, until):
+        yield session_to_record(session, include_messages)
+
+
+def main():
+    """Export sessions from a snapshot file written by a running backend"""
+    import argparse
+    import sys
+
+    from .session_snapshot import SessionSnapshot
+
+    parser = argparse.ArgumentParser(description="Export Zoe conversations from a session snapshot")
+    parser.add_argument("snapshot", help="Path to a session snapshot (ZOE_SNAPSHOT_PATH)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--output", "-o", help="Output file (NDJSON defaults to stdout)")
+    parser.add_argument("--user-id")
+    parser.add_argument("--application")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="ISO timestamp")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="ISO timestamp")
+    parser.add_argument("--no-messages", action="store_true", help="Only export per-session statistics")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.format != "ndjson" and not args.output:
+        parser.error(f"--output is required for {args.format} exports")
+    if args.format != "ndjson" and not ARROW_AVAILABLE:
+        parser.error("pyarrow package not available. Install with: pip install pyarrow")
+
+    snapshot = SessionSnapshot.open(args.snapshot)
+    if snapshot is None:
+        parser.error(f"{args.snapshot} is not a readable session snapshot")
+
+    try:
+        records = export_records(
+            iter_snapshot_sessions(snapshot),
+            user_id=args.user_id,
+            application=args.application,
+            since=args.since,
+            until=args.until,
+            include_messages=not args.no_messages
+        )
+        if args.format == "ndjson":
+            if args.output:
+                with open(args.output, "wb") as out:
+                    count = write_ndjson(records, out)
+            else:
+                count = write_ndjson(records, sys.stdout.buffer)
+        else:
+            count = write_arrow(
+                records,
+                args.output,
+                file_format=args.format,
+                include_messages=not args.no_messages,
+                batch_size=args.batch_size
+            )
+    finally:
+        snapshot.close()
+
+    print(f"Exported {count} sessions", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,12 @@ Integrates with the Brain's ContextManager for comprehensive conversation tracki
 
 import uuid
 import logging
-from typing import Dict, List, Optional, Any, Tuple
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 # Import Brain context manager
 import sys
@@ -22,8 +25,14 @@ except ImportError as e:
     logging.warning(f"Brain context manager import failed: {e}")
     ContextManager = None
 
+from brain.metrics import registry
+
 logger = logging.getLogger(__name__)
 
+# Rough per-object overheads used for in-memory size accounting
+SESSION_OVERHEAD_BYTES = 2048
+MESSAGE_OVERHEAD_BYTES = 640
+
 
 @dataclass
 class ConversationMessage:
@@ -35,6 +44,84 @@ class ConversationMessage:
     metadata: Optional[Dict[str, Any]] = None
 
 
+@dataclass
+class SessionStats:
+    """Running message counters for a session, updated as messages are added"""
+    user_messages: int = 0
+    assistant_messages: int = 0
+    total_chars: int = 0
+    total_tokens: int = 0
+    redirects: int = 0
+    errors: int = 0
+    first_message_at: Optional[datetime] = None
+    last_message_at: Optional[datetime] = None
+    applications: Dict[str, int] = field(default_factory=dict)  # application -> messages
+    
+    def add(self, message: ConversationMessage) -> Tuple[int, bool, bool]:
+        """
+        Count a new message
+        
+        Returns:
+            Tuple of (tokens_used, redirected, error) for aggregate counters
+        """
+        metadata = message.metadata or {}
+        tokens = (metadata.get("brain_metadata") or {}).get("tokens_used") or 0
+        redirected = bool(metadata.get("redirected"))
+        error = bool(metadata.get("error"))
+        
+        if message.role == "user":
+            self.user_messages += 1
+        elif message.role == "assistant":
+            self.assistant_messages += 1
+        self.total_chars += len(message.content)
+        self.total_tokens += tokens
+        self.redirects += redirected
+        self.errors += error
+        if self.first_message_at is None:
+            self.first_message_at = message.timestamp
+        self.last_message_at = message.timestamp
+        application = metadata.get("application")
+        if application:
+            self.applications[application] = self.applications.get(application, 0) + 1
+        
+        return tokens, redirected, error
+    
+    @classmethod
+    def from_messages(cls, messages: List[ConversationMessage]) -> "SessionStats":
+        """Rebuild counters from retained messages (for sessions stored without them)"""
+        stats = cls()
+        for message in messages:
+            stats.add(message)
+        return stats
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "user_messages": self.user_messages,
+            "assistant_messages": self.assistant_messages,
+            "total_chars": self.total_chars,
+            "total_tokens": self.total_tokens,
+            "redirects": self.redirects,
+            "errors": self.errors,
+            "first_message_at": self.first_message_at.isoformat() if self.first_message_at else None,
+            "last_message_at": self.last_message_at.isoformat() if self.last_message_at else None,
+            "applications": dict(self.applications)
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SessionStats":
+        return cls(
+            user_messages=data["user_messages"],
+            assistant_messages=data["assistant_messages"],
+            total_chars=data["total_chars"],
+            total_tokens=data["total_tokens"],
+            redirects=data["redirects"],
+            errors=data["errors"],
+            first_message_at=datetime.fromisoformat(data["first_message_at"]) if data["first_message_at"] else None,
+            last_message_at=datetime.fromisoformat(data["last_message_at"]) if data["last_message_at"] else None,
+            applications=dict(data["applications"])
+        )
+
+
 @dataclass
 class ConversationSession:
     """Represents a conversation session"""
@@ -46,6 +133,14 @@ class ConversationSession:
     user_context: Dict[str, Any]
     summary: Optional[str] = None
     active: bool = True
+    total_messages: int = 0  # Messages ever added, including ones trimmed from history
+    summarized_count: int = 0  # Leading messages already folded into the summary
+    stats: SessionStats = field(default_factory=SessionStats)  # Counts every message ever added
+    # Provider-ready {"role", "content"} views of `messages`, kept aligned in add_message
+    ai_messages: List[Dict[str, str]] = field(default_factory=list, repr=False)
+    # Cached context handed to the Brain; rebuilt only when user context changes
+    ai_context: Dict[str, Any] = field(default_factory=dict, repr=False)
+    approx_bytes: int = field(default=0, repr=False)  # Estimated in-memory footprint
 
 
 class ZoeConversationManager:
@@ -59,11 +154,16 @@ class ZoeConversationManager:
     - Automatic session cleanup
     - User preference storage
     - Conversation summarization for long sessions
+    - Byte-budgeted session cache with LRU spill to disk
+    - Lazy restore from memory-mapped snapshots for warm restarts
     """
     
     def __init__(self, brain_context_manager: Optional[ContextManager] = None):
-        self.sessions: Dict[str, ConversationSession] = {}
-        self.user_sessions: Dict[str, List[str]] = {}  # user_id -> [session_ids]
+        # Resident sessions in LRU order, most recently used last
+        self.sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        # user_id -> ordered {session_id: None}; insertion order is creation order,
+        # so membership, removal and oldest-first eviction are all O(1)
+        self.user_sessions: Dict[str, "OrderedDict[str, None]"] = {}
         
         # Initialize or use provided context manager
         if brain_context_manager:
@@ -80,13 +180,56 @@ class ZoeConversationManager:
         self.session_timeout_hours = 24
         self.auto_cleanup_interval = 3600  # 1 hour in seconds
         self.max_sessions_per_user = 10
+        # Accept caller-chosen IDs for unknown sessions; used by shard workers, whose
+        # dispatcher assigns the ID of a new session so it hashes to the right worker
+        self.adopt_session_ids = False
+        
+        # Memory budget for resident sessions. Least recently used sessions beyond
+        # it are spilled to disk and loaded back transparently by get_session.
+        self.max_memory_bytes: Optional[int] = 256 * 1024 * 1024
+        self.spill_path: Optional[str] = None  # Defaults to a file in a private temp directory
+        self.spill_store = None
+        self.snapshot = None  # Snapshot sessions not yet loaded since startup
+        self.resident_bytes = 0
+        self._pinned: Dict[str, int] = {}  # session_id -> active users; never evicted
+        self.storage_stats = {
+            "evictions": 0,
+            "reloads": 0,
+            "spilled_bytes_total": 0,
+            "spill_seconds_total": 0.0,
+            "spill_seconds_max": 0.0,
+            "reload_seconds_total": 0.0,
+            "reload_seconds_max": 0.0
+        }
+        
+        self.session_lookups = registry.counter(
+            "thinkxlife_zoe_session_lookups_total",
+            "Session lookups by where the session was found",
+            ("result",)
+        )
+        
+        # Running totals across every session, so analytics never scan sessions
+        self.aggregate_stats = {
+            "sessions_created": 0,
+            "sessions_ended": 0,
+            "sessions_expired": 0,
+            "messages": 0,
+            "user_messages": 0,
+            "assistant_messages": 0,
+            "total_chars": 0,
+            "total_tokens": 0,
+            "redirects": 0,
+            "errors": 0
+        }
+        self.tracked_sessions = 0  # Sessions in the user index, resident or not
         
         logger.info("Zoe Conversation Manager initialized")
     
     def create_session(
         self, 
         user_id: str, 
-        user_context: Optional[Dict[str, Any]] = None
+        user_context: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None
     ) -> str:
         """
         Create a new conversation session
@@ -94,11 +237,12 @@ class ZoeConversationManager:
         Args:
             user_id: User identifier
             user_context: Initial user context (age, preferences, etc.)
+            session_id: Optional pre-assigned session ID (defaults to a new UUID)
             
         Returns:
             session_id: Unique session identifier
         """
-        session_id = str(uuid.uuid4())
+        session_id = session_id or str(uuid.uuid4())
         now = datetime.now()
         
         session = ConversationSession(
@@ -110,14 +254,15 @@ class ZoeConversationManager:
             user_context=user_context or {},
             active=True
         )
+        self._reset_ai_context(session)
         
         # Store session
         self.sessions[session_id] = session
+        self._track_bytes(session, self._estimate_session_bytes(session))
         
         # Track user sessions
-        if user_id not in self.user_sessions:
-            self.user_sessions[user_id] = []
-        self.user_sessions[user_id].append(session_id)
+        self._add_to_user_index(user_id, session_id)
+        self.aggregate_stats["sessions_created"] += 1
         
         # Limit sessions per user
         self._limit_user_sessions(user_id)
@@ -126,12 +271,26 @@ class ZoeConversationManager:
         if self.context_manager:
             self.context_manager.get_context(session_id)
         
+        self._enforce_memory_budget()
+        
         logger.info(f"Created new conversation session {session_id} for user {user_id}")
         return session_id
     
     def get_session(self, session_id: str) -> Optional[ConversationSession]:
-        """Get a conversation session by ID"""
-        return self.sessions.get(session_id)
+        """Get a conversation session by ID, loading it back from disk if it was spilled"""
+        session = self.sessions.get(session_id)
+        if session is not None:
+            self.sessions.move_to_end(session_id)
+            self.session_lookups.inc("resident")
+            return session
+        
+        for store in self._cold_stores():
+            if session_id in store:
+                self.session_lookups.inc("reloaded")
+                return self._reload_session(store, session_id)
+        
+        self.session_lookups.inc("missing")
+        return None
     
     def get_or_create_session(
         self, 
@@ -145,14 +304,17 @@ class ZoeConversationManager:
         Returns:
             Tuple of (session_id, session)
         """
-        if session_id and session_id in self.sessions:
-            session = self.sessions[session_id]
+        session = self.get_session(session_id) if session_id else None
+        if session:
             if self._is_session_valid(session):
                 session.last_activity = datetime.now()
                 return session_id, session
         
         # Create new session
-        new_session_id = self.create_session(user_id, user_context)
+        adopted_id = None
+        if self.adopt_session_ids and session_id and not session:
+            adopted_id = session_id
+        new_session_id = self.create_session(user_id, user_context, session_id=adopted_id)
         return new_session_id, self.sessions[new_session_id]
     
     def add_message(
@@ -190,17 +352,39 @@ class ZoeConversationManager:
         
         # Add to session
         session.messages.append(message)
+        session.ai_messages.append({"role": role, "content": content})
+        session.total_messages += 1
         session.last_activity = datetime.now()
+        self._track_bytes(session, MESSAGE_OVERHEAD_BYTES + len(content))
+        
+        # Update running counters
+        tokens, redirected, error = session.stats.add(message)
+        aggregates = self.aggregate_stats
+        aggregates["messages"] += 1
+        if role in ("user", "assistant"):
+            aggregates[f"{role}_messages"] += 1
+        aggregates["total_chars"] += len(content)
+        aggregates["total_tokens"] += tokens
+        aggregates["redirects"] += redirected
+        aggregates["errors"] += error
         
         # Limit message history
-        if len(session.messages) > self.max_message_history:
+        excess = len(session.messages) - self.max_message_history
+        if excess > 0:
             # Remove oldest messages but keep system/important ones
-            session.messages = session.messages[-self.max_message_history:]
+            trimmed_bytes = sum(
+                MESSAGE_OVERHEAD_BYTES + len(msg.content) for msg in session.messages[:excess]
+            )
+            del session.messages[:excess]
+            del session.ai_messages[:excess]
+            self._track_bytes(session, -trimmed_bytes)
         
         # Update Brain context manager if available
         if self.context_manager:
             self.context_manager.add_message(session_id, role, content)
         
+        self._enforce_memory_budget()
+        
         logger.debug(f"Added {role} message to session {session_id}")
         return True
     
@@ -242,35 +426,97 @@ class ZoeConversationManager:
         """
         Get formatted context for AI processing
         
-        Returns context suitable for Brain/OpenAI processing
+        Returns context suitable for Brain/OpenAI processing. The returned dict is
+        a new shallow copy of the session's cached context, which callers may add
+        per-turn keys to without them leaking into later turns; its conversation
+        history is a window over the provider-ready messages maintained by
+        add_message, so the per-turn cost does not grow with the length of the
+        conversation.
         """
         session = self.get_session(session_id)
         if not session:
             return {}
         
-        # Get recent conversation history (last 10 messages for AI context)
-        recent_messages = session.messages[-10:] if session.messages else []
-        
-        conversation_history = [
-            {
-                "role": msg.role,
-                "content": msg.content,
-                "timestamp": msg.timestamp.isoformat()
-            }
-            for msg in recent_messages
-        ]
+        # Get recent conversation history (last 10 messages for AI context).
+        # Turns already folded into the rolling summary are sent as the summary instead.
+        start = max(self._unsummarized_start(session), len(session.ai_messages) - 10)
         
-        # Combine with user context
         ai_context = {
-            **session.user_context,
-            "conversation_history": conversation_history,
-            "session_id": session_id,
+            **session.ai_context,
+            "conversation_history": session.ai_messages[start:],
             "conversation_length": len(session.messages),
-            "session_duration": (datetime.now() - session.created_at).total_seconds(),
+            "session_duration": (datetime.now() - session.created_at).total_seconds()
         }
         
+        if session.summary:
+            ai_context["conversation_summary"] = session.summary
+        
         return ai_context
     
+    def replace_last_assistant_message(
+        self,
+        session_id: str,
+        content: str,
+        metadata_updates: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Replace the content of the latest assistant message
+        
+        Keeps the provider-ready message cache in sync with the stored history.
+        
+        Returns:
+            bool: True if an assistant message was updated
+        """
+        session = self.get_session(session_id)
+        if not session or not session.messages or session.messages[-1].role != "assistant":
+            return False
+        
+        message = session.messages[-1]
+        delta = len(content) - len(message.content)
+        self._track_bytes(session, delta)
+        session.stats.total_chars += delta
+        self.aggregate_stats["total_chars"] += delta
+        message.content = content
+        if metadata_updates:
+            message.metadata.update(metadata_updates)
+        session.ai_messages[-1]["content"] = content
+        return True
+    
+    def get_unsummarized_messages(self, session_id: str) -> List[ConversationMessage]:
+        """Get the messages that have not yet been folded into the session summary"""
+        session = self.get_session(session_id)
+        if not session:
+            return []
+        
+        return session.messages[self._unsummarized_start(session):]
+    
+    def apply_summary(self, session_id: str, summary: str, summarized_count: int) -> bool:
+        """
+        Store a rolling summary for a session
+        
+        Args:
+            session_id: Session identifier
+            summary: Summary covering the first `summarized_count` messages
+            summarized_count: Absolute number of leading messages the summary covers
+            
+        Returns:
+            bool: Success status
+        """
+        session = self.get_session(session_id)
+        if not session:
+            return False
+        
+        # A slower summarization pass must not roll back a newer one
+        if summarized_count < session.summarized_count:
+            return False
+        
+        self._track_bytes(session, len(summary) - len(session.summary or ""))
+        session.summary = summary
+        session.summarized_count = min(summarized_count, session.total_messages)
+        
+        logger.debug(f"Updated summary for session {session_id} ({session.summarized_count} messages folded)")
+        return True
+    
     def update_user_context(
         self, 
         session_id: str, 
@@ -282,6 +528,7 @@ class ZoeConversationManager:
             return False
         
         session.user_context.update(context_updates)
+        session.ai_context.update(context_updates)
         session.last_activity = datetime.now()
         
         # Update Brain context manager if available
@@ -296,15 +543,38 @@ class ZoeConversationManager:
         if not session:
             return False
         
+        if session.active:
+            self.aggregate_stats["sessions_ended"] += 1
         session.active = False
         session.last_activity = datetime.now()
         
         logger.info(f"Ended conversation session {session_id}")
         return True
     
-    def get_user_sessions(self, user_id: str) -> List[str]:
-        """Get all session IDs for a user"""
-        return self.user_sessions.get(user_id, [])
+    def get_user_sessions(
+        self,
+        user_id: str,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> List[str]:
+        """
+        Get session IDs for a user, most recent first
+        
+        Args:
+            user_id: User identifier
+            limit: Maximum number of session IDs to return
+            offset: Number of most recent sessions to skip
+            
+        Returns:
+            List of session IDs
+        """
+        user_index = self.user_sessions.get(user_id)
+        if not user_index:
+            return []
+        
+        offset = max(offset, 0)
+        stop = offset + max(limit, 0) if limit is not None else None
+        return list(islice(reversed(user_index), offset, stop))
     
     def cleanup_expired_sessions(self) -> int:
         """
@@ -318,47 +588,66 @@ class ZoeConversationManager:
         
         for session_id, session in self.sessions.items():
             if not self._is_session_valid(session, now):
-                expired_sessions.append(session_id)
+                expired_sessions.append((session_id, session.user_id))
+        
+        # Spilled and snapshot sessions are checked from index metadata without loading them
+        timeout_seconds = self.session_timeout_hours * 3600
+        now_ts = now.timestamp()
+        for store in self._cold_stores():
+            for session_id, user_id, last_activity, active in store.iter_metadata():
+                if not active or now_ts - last_activity >= timeout_seconds:
+                    expired_sessions.append((session_id, user_id))
         
         # Remove expired sessions
-        for session_id in expired_sessions:
-            session = self.sessions.pop(session_id, None)
-            if session:
-                # Remove from user sessions
-                user_sessions = self.user_sessions.get(session.user_id, [])
-                if session_id in user_sessions:
-                    user_sessions.remove(session_id)
+        for session_id, user_id in expired_sessions:
+            self._drop_session(session_id)
+            self._remove_from_user_index(user_id, session_id)
         
         # Cleanup Brain contexts if available
         if self.context_manager:
             self.context_manager.cleanup_expired_contexts()
         
+        self.aggregate_stats["sessions_expired"] += len(expired_sessions)
         if expired_sessions:
             logger.info(f"Cleaned up {len(expired_sessions)} expired sessions")
         
         return len(expired_sessions)
     
     def get_session_stats(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """Get statistics for a session"""
+        """Get statistics for a session from its running counters"""
         session = self.get_session(session_id)
         if not session:
             return None
         
-        user_messages = [msg for msg in session.messages if msg.role == "user"]
-        assistant_messages = [msg for msg in session.messages if msg.role == "assistant"]
-        
+        stats = session.stats
         return {
             "session_id": session_id,
             "user_id": session.user_id,
             "created_at": session.created_at.isoformat(),
             "last_activity": session.last_activity.isoformat(),
-            "total_messages": len(session.messages),
-            "user_messages": len(user_messages),
-            "assistant_messages": len(assistant_messages),
+            "total_messages": session.total_messages,
+            "retained_messages": len(session.messages),
+            **stats.to_dict(),
             "session_duration_minutes": (datetime.now() - session.created_at).total_seconds() / 60,
             "active": session.active
         }
     
+    def get_aggregate_stats(self) -> Dict[str, Any]:
+        """Get statistics across all sessions from running totals"""
+        aggregates = self.aggregate_stats
+        return {
+            **aggregates,
+            "tracked_sessions": self.tracked_sessions,
+            "resident_sessions": len(self.sessions),
+            "users": len(self.user_sessions),
+            "avg_messages_per_session": (
+                aggregates["messages"] / aggregates["sessions_created"] if aggregates["sessions_created"] else 0.0
+            ),
+            "avg_tokens_per_assistant_message": (
+                aggregates["total_tokens"] / aggregates["assistant_messages"] if aggregates["assistant_messages"] else 0.0
+            )
+        }
+    
     def _is_session_valid(self, session: ConversationSession, now: Optional[datetime] = None) -> bool:
         """Check if a session is still valid"""
         if not session.active:
@@ -370,23 +659,307 @@ class ZoeConversationManager:
         time_since_activity = now - session.last_activity
         return time_since_activity.total_seconds() < (self.session_timeout_hours * 3600)
     
+    def _reset_ai_context(self, session: ConversationSession):
+        """Rebuild the cached AI context and message views for a session"""
+        session.ai_messages = [{"role": msg.role, "content": msg.content} for msg in session.messages]
+        session.ai_context = {
+            **session.user_context,
+            "session_id": session.session_id
+        }
+    
+    def _unsummarized_start(self, session: ConversationSession) -> int:
+        """Position in session.messages of the first message not covered by the summary"""
+        first_retained = session.total_messages - len(session.messages)
+        return min(max(session.summarized_count - first_retained, 0), len(session.messages))
+    
     def _limit_user_sessions(self, user_id: str):
         """Limit the number of sessions per user"""
-        user_sessions = self.user_sessions.get(user_id, [])
-        
-        if len(user_sessions) > self.max_sessions_per_user:
-            # Remove oldest sessions
-            sessions_to_remove = len(user_sessions) - self.max_sessions_per_user
-            oldest_sessions = sorted(
-                [(sid, self.sessions[sid].created_at) for sid in user_sessions if sid in self.sessions],
-                key=lambda x: x[1]
-            )[:sessions_to_remove]
+        user_index = self.user_sessions.get(user_id)
+        if not user_index:
+            return
+        
+        # The index is kept in creation order, so the oldest sessions are at the head
+        while len(user_index) > self.max_sessions_per_user:
+            oldest_session_id, _ = user_index.popitem(last=False)
+            self.tracked_sessions -= 1
+            self._drop_session(oldest_session_id)
+    
+    def pin_session(self, session_id: str):
+        """Keep a session resident while a turn is working on it"""
+        self._pinned[session_id] = self._pinned.get(session_id, 0) + 1
+    
+    def unpin_session(self, session_id: str):
+        """Release a pin taken with pin_session"""
+        remaining = self._pinned.get(session_id, 0) - 1
+        if remaining > 0:
+            self._pinned[session_id] = remaining
+        else:
+            self._pinned.pop(session_id, None)
+    
+    def get_storage_stats(self) -> Dict[str, Any]:
+        """Get memory tier and spill statistics"""
+        stats = self.storage_stats
+        return {
+            "resident_sessions": len(self.sessions),
+            "resident_bytes": self.resident_bytes,
+            "max_memory_bytes": self.max_memory_bytes,
+            **stats,
+            "spill_seconds_avg": stats["spill_seconds_total"] / stats["evictions"] if stats["evictions"] else 0.0,
+            "reload_seconds_avg": stats["reload_seconds_total"] / stats["reloads"] if stats["reloads"] else 0.0,
+            "spill_store": self.spill_store.get_stats() if self.spill_store is not None else None,
+            "snapshot": self.snapshot.get_stats() if self.snapshot is not None else None
+        }
+    
+    def attach_snapshot(self, snapshot) -> int:
+        """
+        Register the sessions of a memory-mapped snapshot for lazy loading
+        
+        Only the snapshot index is read here; each session is decoded on its first
+        get_session call.
+        
+        Args:
+            snapshot: SessionSnapshot opened from a previous run
             
-            for session_id, _ in oldest_sessions:
-                if session_id in self.sessions:
-                    del self.sessions[session_id]
-                if session_id in user_sessions:
-                    user_sessions.remove(session_id)
+        Returns:
+            Number of sessions restored
+        """
+        if self.snapshot is not None:
+            self.snapshot.close()
+        self.snapshot = snapshot
+        
+        timeout_seconds = self.session_timeout_hours * 3600
+        now_ts = datetime.now().timestamp()
+        restored = 0
+        
+        # Snapshot order is per-user creation order, which the user index relies on
+        for session_id, user_id, last_activity, active in snapshot.iter_metadata():
+            if not active or now_ts - last_activity >= timeout_seconds or session_id in self.sessions:
+                snapshot.discard(session_id)
+                continue
+            
+            self._add_to_user_index(user_id, session_id)
+            restored += 1
+        
+        logger.info(f"Restored {restored} sessions from snapshot {snapshot.path}")
+        return restored
+    
+    def iter_session_records(self) -> Iterator[Tuple[str, str, float, bool, bytes]]:
+        """
+        Iterate every session as a snapshot record
+        
+        Yields (session_id, user_id, last_activity_ts, active, payload) with each
+        user's sessions oldest first. Resident sessions are encoded on the fly;
+        spilled and not-yet-loaded snapshot sessions are passed through as stored.
+        """
+        from .session_store import encode_session
+        
+        for user_id, user_index in list(self.user_sessions.items()):
+            for session_id in list(user_index):
+                session = self.sessions.get(session_id)
+                if session is not None:
+                    yield (
+                        session_id,
+                        user_id,
+                        session.last_activity.timestamp(),
+                        session.active,
+                        encode_session(session)
+                    )
+                    continue
+                
+                for store in self._cold_stores():
+                    entry = store.index.get(session_id)
+                    if entry is not None:
+                        yield session_id, user_id, entry[3], entry[4], store.read_payload(session_id)
+                        break
+    
+    def export_session_payload(self, session_id: str) -> Optional[bytes]:
+        """
+        Encode a session for handover to another process
+        
+        The session stays here until release_session is called, so a handover
+        whose import fails leaves it with its current owner.
+        
+        Returns:
+            Encoded session, or None if the session is unknown
+        """
+        from .session_store import encode_session
+        
+        session = self.get_session(session_id)
+        if not session:
+            return None
+        return encode_session(session)
+    
+    def release_session(self, session_id: str) -> bool:
+        """
+        Remove a session another process has taken over
+        
+        Returns:
+            bool: True if the session was held here
+        """
+        user_id = self.get_session_user_id(session_id)
+        if user_id is None:
+            return False
+        self._drop_session(session_id)
+        self._remove_from_user_index(user_id, session_id)
+        return True
+    
+    def get_session_user_id(self, session_id: str) -> Optional[str]:
+        """User of a resident or cold session, without loading it"""
+        session = self.sessions.get(session_id)
+        if session is not None:
+            return session.user_id
+        for store in self._cold_stores():
+            entry = store.index.get(session_id)
+            if entry is not None:
+                return entry[2]
+        return None
+    
+    def get_last_activity(self, session_id: str) -> Optional[float]:
+        """Last activity timestamp of a resident or cold session, without loading it"""
+        session = self.sessions.get(session_id)
+        if session is not None:
+            return session.last_activity.timestamp()
+        for store in self._cold_stores():
+            entry = store.index.get(session_id)
+            if entry is not None:
+                return entry[3]
+        return None
+    
+    def import_session_payload(self, payload: bytes) -> str:
+        """
+        Take over a session exported by another process
+        
+        Returns:
+            The imported session ID
+        """
+        from .session_store import decode_session
+        
+        session = decode_session(payload)
+        self._drop_session(session.session_id)
+        self._reset_ai_context(session)
+        self.sessions[session.session_id] = session
+        self._track_bytes(session, self._estimate_session_bytes(session))
+        
+        self._add_to_user_index(session.user_id, session.session_id)
+        
+        self._enforce_memory_budget()
+        return session.session_id
+    
+    def close(self):
+        """Release the spill file and snapshot mapping"""
+        if self.spill_store is not None:
+            self.spill_store.close()
+            self.spill_store = None
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+    
+    def _cold_stores(self):
+        """Stores holding sessions that are not resident in memory"""
+        if self.spill_store is not None:
+            yield self.spill_store
+        if self.snapshot is not None:
+            yield self.snapshot
+    
+    def _estimate_session_bytes(self, session: ConversationSession) -> int:
+        """Approximate in-memory footprint of a session"""
+        size = SESSION_OVERHEAD_BYTES + len(repr(session.user_context)) + len(session.summary or "")
+        for msg in session.messages:
+            size += MESSAGE_OVERHEAD_BYTES + len(msg.content)
+        return size
+    
+    def _track_bytes(self, session: ConversationSession, delta: int):
+        """Account for a change in a resident session's footprint"""
+        session.approx_bytes += delta
+        self.resident_bytes += delta
+    
+    def _enforce_memory_budget(self):
+        """Spill least recently used sessions until resident sessions fit the budget"""
+        if self.max_memory_bytes is None:
+            return
+        
+        # Pinned sessions are rotated to the MRU end; stop once only they remain
+        candidates = len(self.sessions) - 1  # Never evict the most recently used session
+        while self.resident_bytes > self.max_memory_bytes and candidates > 0:
+            candidates -= 1
+            session_id = next(iter(self.sessions))
+            if session_id in self._pinned:
+                self.sessions.move_to_end(session_id)
+                continue
+            self._spill_session(session_id)
+    
+    def _spill_session(self, session_id: str):
+        """Move a resident session to the spill file"""
+        if self.spill_store is None:
+            from .session_store import SessionSpillStore
+            self.spill_store = SessionSpillStore(self.spill_path)
+        
+        start = time.perf_counter()
+        session = self.sessions.pop(session_id)
+        self.resident_bytes -= session.approx_bytes
+        written = self.spill_store.put(session)
+        elapsed = time.perf_counter() - start
+        
+        stats = self.storage_stats
+        stats["evictions"] += 1
+        stats["spilled_bytes_total"] += written
+        stats["spill_seconds_total"] += elapsed
+        stats["spill_seconds_max"] = max(stats["spill_seconds_max"], elapsed)
+        logger.debug(f"Spilled session {session_id} to disk ({written} bytes)")
+    
+    def _reload_session(self, store, session_id: str) -> Optional[ConversationSession]:
+        """Load a spilled or snapshot session back into memory"""
+        start = time.perf_counter()
+        session = store.take(session_id)
+        if session is None:
+            return None
+        
+        self._reset_ai_context(session)
+        session.approx_bytes = 0
+        self.sessions[session_id] = session
+        self._track_bytes(session, self._estimate_session_bytes(session))
+        elapsed = time.perf_counter() - start
+        
+        stats = self.storage_stats
+        stats["reloads"] += 1
+        stats["reload_seconds_total"] += elapsed
+        stats["reload_seconds_max"] = max(stats["reload_seconds_max"], elapsed)
+        logger.debug(f"Reloaded session {session_id} from {store.path}")
+        
+        self._enforce_memory_budget()
+        return session
+    
+    def _drop_session(self, session_id: str):
+        """Remove a session from memory or the spill file"""
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            self.resident_bytes -= session.approx_bytes
+            return
+        
+        for store in self._cold_stores():
+            if store.discard(session_id):
+                return
+    
+    def _add_to_user_index(self, user_id: str, session_id: str):
+        """Add a session to its user's index, which is kept in creation order"""
+        user_index = self.user_sessions.get(user_id)
+        if user_index is None:
+            user_index = self.user_sessions[user_id] = OrderedDict()
+        if session_id not in user_index:
+            self.tracked_sessions += 1
+        user_index[session_id] = None
+    
+    def _remove_from_user_index(self, user_id: str, session_id: str):
+        """Remove a session from its user's index, dropping empty indexes"""
+        user_index = self.user_sessions.get(user_id)
+        if user_index is None:
+            return
+        
+        if session_id in user_index:
+            del user_index[session_id]
+            self.tracked_sessions -= 1
+        if not user_index:
+            del self.user_sessions[user_id]
     
     def export_conversation(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Export a conversation for external use"""
@@ -0,0 +1,224 @@
+"""
+Zoe Session Snapshots
+
+Binary snapshots of conversation manager state for fast warm restarts.
+
+Layout:
+    magic | record* | index | footer
+
+Each record is a 4-byte big-endian length followed by a session payload in the
+same encoding the spill store uses. The index is zlib-compressed JSON listing
+[session_id, user_id, offset, length, last_activity_ts, active] per session,
+and the footer holds the index location followed by the magic again. Loading a
+snapshot memory-maps the file and reads only the index; session payloads are
+decoded on first access.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import uuid
+import zlib
+from typing import IO, Any, Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+from brain.private_files import create_private_file
+
+from .conversation_manager import ConversationSession
+from .session_store import RECORD_HEADER, decode_session
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"ZOESNAP1"
+SNAPSHOT_FOOTER = struct.Struct(">QI8s")  # index offset, index length, magic
+
+# (session_id, user_id, last_activity_ts, active, payload)
+SnapshotRecord = Tuple[str, str, float, bool, bytes]
+
+MAX_SNAPSHOT_SLOTS = 1024
+
+
+def claim_snapshot_path(path: str, worker_id: Optional[str] = None) -> Tuple[str, Optional[IO]]:
+    """
+    The snapshot file this process should use, and the lock that reserves it
+
+    A single process uses `path` itself. Worker processes started from the same
+    configuration (`uvicorn --workers N`) each take the lowest free slot under
+    an exclusive lock: slot 0 is `path`, slot n is `root.n.ext`. The lock is
+    released when the process exits, so a restarted worker takes a slot back
+    and finds the sessions of the worker it replaces. An explicit worker_id
+    names the file instead (`root.<worker_id>.ext`) and takes no lock. Without
+    fcntl every process uses `path`.
+
+    Keep the returned lock open for as long as the path is in use.
+    """
+    root, ext = os.path.splitext(path)
+    if worker_id:
+        return f"{root}.{worker_id}{ext}", None
+    if fcntl is None:
+        return path, None
+
+    flags = os.O_CREAT | os.O_RDWR | getattr(os, "O_NOFOLLOW", 0)
+    for slot in range(MAX_SNAPSHOT_SLOTS):
+        slot_path = path if slot == 0 else f"{root}.{slot}{ext}"
+        lock = os.fdopen(os.open(f"{slot_path}.lock", flags, 0o600), "r+b")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            continue
+        return slot_path, lock
+    raise OSError(f"No free session snapshot slot for {path}")
+
+
+def write_snapshot(path: str, records: Iterable[SnapshotRecord]) -> Dict[str, Any]:
+    """
+    Write a snapshot atomically
+
+    The snapshot holds conversation text, so it is created readable only by
+    this user (0600). Records are written in the order given; loading restores per-user session
+    order from it, so callers should yield each user's sessions oldest first.
+
+    Returns:
+        Snapshot statistics
+    """
+    start = time.perf_counter()
+    # A temp name of its own, so an overlapping write can't truncate this one
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    index = []
+
+    try:
+        with create_private_file(tmp_path, "wb") as out:
+            out.write(SNAPSHOT_MAGIC)
+            position = len(SNAPSHOT_MAGIC)
+            for session_id, user_id, last_activity, active, payload in records:
+                out.write(RECORD_HEADER.pack(len(payload)))
+                out.write(payload)
+                index.append([session_id, user_id, position, len(payload), last_activity, active])
+                position += RECORD_HEADER.size + len(payload)
+
+            index_bytes = zlib.compress(json.dumps(index, separators=(",", ":")).encode("utf-8"))
+            out.write(index_bytes)
+            out.write(SNAPSHOT_FOOTER.pack(position, len(index_bytes), SNAPSHOT_MAGIC))
+            out.flush()
+            os.fsync(out.fileno())
+
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    stats = {
+        "path": path,
+        "sessions": len(index),
+        "bytes": position + len(index_bytes) + SNAPSHOT_FOOTER.size,
+        "seconds": time.perf_counter() - start
+    }
+    logger.info(
+        f"Wrote session snapshot with {stats['sessions']} sessions "
+        f"({stats['bytes']} bytes) in {stats['seconds'] * 1000:.1f}ms"
+    )
+    return stats
+
+
+class SessionSnapshot:
+    """
+    Read-only, memory-mapped view of a session snapshot
+
+    Sessions are handed out once: take() decodes a session and forgets it, after
+    which the conversation manager owns it. The mapping stays valid even if a
+    newer snapshot replaces the file.
+    """
+
+    def __init__(self, path: str, mapped: mmap.mmap, index: Dict[str, Tuple[int, int, str, float, bool]]):
+        self.path = path
+        self._mmap = mapped
+        # session_id -> (offset, length, user_id, last_activity_ts, active), in file order
+        self.index = index
+        self.loaded_sessions = 0
+
+    @classmethod
+    def open(cls, path: str) -> Optional["SessionSnapshot"]:
+        """Map a snapshot file, returning None if it is missing or unreadable"""
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            if len(mapped) < len(SNAPSHOT_MAGIC) + SNAPSHOT_FOOTER.size or mapped[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                raise ValueError("not a session snapshot")
+
+            index_offset, index_length, magic = SNAPSHOT_FOOTER.unpack(mapped[-SNAPSHOT_FOOTER.size:])
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError("truncated snapshot")
+
+            entries = json.loads(zlib.decompress(mapped[index_offset:index_offset + index_length]))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable session snapshot {path}: {str(e)}")
+            return None
+
+        index = {
+            session_id: (offset, length, user_id, last_activity, active)
+            for session_id, user_id, offset, length, last_activity, active in entries
+        }
+        logger.info(f"Mapped session snapshot {path} with {len(index)} sessions")
+        return cls(path, mapped, index)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def take(self, session_id: str) -> Optional[ConversationSession]:
+        """Decode a session and remove it from the snapshot view"""
+        entry = self.index.pop(session_id, None)
+        if entry is None:
+            return None
+
+        offset, length = entry[0] + RECORD_HEADER.size, entry[1]
+        self.loaded_sessions += 1
+        return decode_session(self._mmap[offset:offset + length])
+
+    def discard(self, session_id: str) -> bool:
+        """Forget a session without decoding it"""
+        return self.index.pop(session_id, None) is not None
+
+    def iter_metadata(self) -> Iterator[Tuple[str, str, float, bool]]:
+        """Iterate (session_id, user_id, last_activity_ts, active) in file order"""
+        for session_id, (_, _, user_id, last_activity, active) in list(self.index.items()):
+            yield session_id, user_id, last_activity, active
+
+    def read_payload(self, session_id: str) -> Optional[bytes]:
+        """Get the raw payload of a session without decoding or removing it"""
+        entry = self.index.get(session_id)
+        if entry is None:
+            return None
+        offset = entry[0] + RECORD_HEADER.size
+        return self._mmap[offset:offset + entry[1]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get snapshot statistics"""
+        return {
+            "path": self.path,
+            "pending_sessions": len(self.index),
+            "loaded_sessions": self.loaded_sessions,
+            "mapped_bytes": len(self._mmap)
+        }
+
+    def close(self):
+        """Unmap the snapshot"""
+        if not self._mmap.closed:
+            self._mmap.close()
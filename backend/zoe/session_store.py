@@ -0,0 +1,238 @@
+"""
+Zoe Session Store
+
+Compact on-disk storage for conversation sessions that are not resident in
+memory. Sessions are serialized as zlib-compressed JSON and written as
+length-prefixed records to an append-only file.
+"""
+
+import json
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from brain.private_files import create_private_file
+
+from .conversation_manager import ConversationMessage, ConversationSession, SessionStats
+
+logger = logging.getLogger(__name__)
+
+SPILL_FILE_MAGIC = b"ZOESPIL1"
+RECORD_HEADER = struct.Struct(">I")  # Payload length
+
+
+def encode_session(session: ConversationSession) -> bytes:
+    """Serialize a session to a compressed record payload"""
+    data = {
+        "session_id": session.session_id,
+        "user_id": session.user_id,
+        "created_at": session.created_at.timestamp(),
+        "last_activity": session.last_activity.timestamp(),
+        "user_context": session.user_context,
+        "summary": session.summary,
+        "active": session.active,
+        "total_messages": session.total_messages,
+        "summarized_count": session.summarized_count,
+        "stats": session.stats.to_dict(),
+        "messages": [
+            [msg.id, msg.role, msg.content, msg.timestamp.timestamp(), msg.metadata]
+            for msg in session.messages
+        ]
+    }
+    raw = json.dumps(data, separators=(",", ":"), default=str).encode("utf-8")
+    return zlib.compress(raw, 6)
+
+
+def decode_session(payload: bytes) -> ConversationSession:
+    """Deserialize a session from a record payload produced by encode_session"""
+    data = json.loads(zlib.decompress(payload))
+    messages = [
+        ConversationMessage(
+            id=msg_id,
+            role=role,
+            content=content,
+            timestamp=datetime.fromtimestamp(timestamp),
+            metadata=metadata
+        )
+        for msg_id, role, content, timestamp, metadata in data["messages"]
+    ]
+    # Records written before running counters existed rebuild them from history
+    stats = SessionStats.from_dict(data["stats"]) if "stats" in data else SessionStats.from_messages(messages)
+    return ConversationSession(
+        session_id=data["session_id"],
+        user_id=data["user_id"],
+        created_at=datetime.fromtimestamp(data["created_at"]),
+        last_activity=datetime.fromtimestamp(data["last_activity"]),
+        messages=messages,
+        user_context=data["user_context"],
+        summary=data["summary"],
+        active=data["active"],
+        total_messages=data["total_messages"],
+        summarized_count=data["summarized_count"],
+        stats=stats
+    )
+
+
+class SessionSpillStore:
+    """
+    Append-only spill file for sessions evicted from memory
+
+    Each record is a 4-byte big-endian length followed by an encoded session.
+    An in-memory index maps session IDs to record locations together with the
+    metadata needed for expiry checks, so spilled sessions never have to be
+    read back just to be cleaned up. Space held by superseded records is
+    reclaimed by compaction once it outweighs the live data.
+
+    Spilled sessions hold conversation text, so the file is created 0600 and,
+    without an explicit path, inside a new private (0700) temp directory. Both
+    are removed on close.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._private_dir = None
+        if path is None:
+            self._private_dir = tempfile.mkdtemp(prefix="zoe_sessions_")
+            path = os.path.join(self._private_dir, "sessions.spill")
+        self.path = path
+        # session_id -> (offset, length, user_id, last_activity_ts, active)
+        self.index: Dict[str, Tuple[int, int, str, float, bool]] = {}
+        self.live_bytes = 0
+        self.dead_bytes = 0
+        self.compaction_min_bytes = 4 * 1024 * 1024
+
+        # A spill file only holds sessions of the process that wrote it
+        self._file = create_private_file(path)
+        self._file.write(SPILL_FILE_MAGIC)
+        self._file.flush()
+        self._end = len(SPILL_FILE_MAGIC)
+
+        logger.info(f"Session spill store opened at {path}")
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def put(self, session: ConversationSession) -> int:
+        """
+        Write a session to the spill file
+
+        Returns:
+            Number of payload bytes written
+        """
+        payload = encode_session(session)
+        self.discard(session.session_id)
+
+        offset = self._end
+        self._file.seek(offset)
+        self._file.write(RECORD_HEADER.pack(len(payload)))
+        self._file.write(payload)
+        self._file.flush()
+        self._end = offset + RECORD_HEADER.size + len(payload)
+
+        self.index[session.session_id] = (
+            offset,
+            len(payload),
+            session.user_id,
+            session.last_activity.timestamp(),
+            session.active
+        )
+        self.live_bytes += RECORD_HEADER.size + len(payload)
+        return len(payload)
+
+    def take(self, session_id: str) -> Optional[ConversationSession]:
+        """Read a session back and remove it from the store"""
+        entry = self.index.get(session_id)
+        if entry is None:
+            return None
+
+        offset, length = entry[0], entry[1]
+        payload = os.pread(self._file.fileno(), length, offset + RECORD_HEADER.size)
+        session = decode_session(payload)
+        self.discard(session_id)
+        return session
+
+    def discard(self, session_id: str) -> bool:
+        """Drop a session from the store without reading it"""
+        entry = self.index.pop(session_id, None)
+        if entry is None:
+            return False
+
+        record_bytes = RECORD_HEADER.size + entry[1]
+        self.live_bytes -= record_bytes
+        self.dead_bytes += record_bytes
+        self._maybe_compact()
+        return True
+
+    def iter_metadata(self) -> Iterator[Tuple[str, str, float, bool]]:
+        """Iterate (session_id, user_id, last_activity_ts, active) for spilled sessions"""
+        for session_id, (_, _, user_id, last_activity, active) in list(self.index.items()):
+            yield session_id, user_id, last_activity, active
+
+    def read_payload(self, session_id: str) -> Optional[bytes]:
+        """Get the raw payload of a spilled session without decoding or removing it"""
+        entry = self.index.get(session_id)
+        if entry is None:
+            return None
+        return os.pread(self._file.fileno(), entry[1], entry[0] + RECORD_HEADER.size)
+
+    def _maybe_compact(self):
+        """Rewrite the file without dead records once they dominate it"""
+        if self.dead_bytes < self.compaction_min_bytes or self.dead_bytes < self.live_bytes:
+            return
+
+        start = time.perf_counter()
+        tmp_path = f"{self.path}.compact"
+        fd = self._file.fileno()
+        new_index = {}
+
+        with create_private_file(tmp_path, "wb") as out:
+            out.write(SPILL_FILE_MAGIC)
+            position = len(SPILL_FILE_MAGIC)
+            for session_id, (offset, length, *meta) in self.index.items():
+                record = os.pread(fd, RECORD_HEADER.size + length, offset)
+                out.write(record)
+                new_index[session_id] = (position, length, *meta)
+                position += len(record)
+
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, "r+b")
+        self._end = position
+        self.index = new_index
+        self.dead_bytes = 0
+
+        logger.info(
+            f"Compacted session spill file to {position} bytes "
+            f"in {(time.perf_counter() - start) * 1000:.1f}ms"
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get spill store statistics"""
+        return {
+            "path": self.path,
+            "spilled_sessions": len(self.index),
+            "file_bytes": self._end,
+            "live_bytes": self.live_bytes,
+            "dead_bytes": self.dead_bytes
+        }
+
+    def close(self, remove: bool = True):
+        """Close the spill file, removing it (and its private directory) by default"""
+        if self._file.closed:
+            return
+        self._file.close()
+        if remove:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            if self._private_dir is not None:
+                shutil.rmtree(self._private_dir, ignore_errors=True)
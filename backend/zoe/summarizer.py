@@ -0,0 +1,142 @@
+"""
+Zoe Conversation Summarizer
+
+Folds older conversation turns into a rolling per-session summary so long
+conversations keep their context at a bounded prompt size.
+"""
+
+import asyncio
+import contextvars
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from brain.providers.local import extractive_summary
+
+from .conversation_manager import ZoeConversationManager
+
+logger = logging.getLogger(__name__)
+
+# (previous_summary, turns, user_id) -> new summary; turns are {"role", "content"} dicts
+SummarizeFn = Callable[[Optional[str], List[Dict[str, str]], Optional[str]], Awaitable[str]]
+
+
+class ConversationSummarizer:
+    """
+    Background rolling summarizer for Zoe conversation sessions
+
+    Features:
+    - Triggers once a session's unsummarized turns pass a token threshold
+    - Runs as a background task, never on the request path
+    - Uses a cheap model when available, with a local extractive fallback
+    - At most one summarization pass per session at a time
+    """
+
+    def __init__(
+        self,
+        conversation_manager: ZoeConversationManager,
+        summarize_fn: Optional[SummarizeFn] = None
+    ):
+        self.conversation_manager = conversation_manager
+        self.summarize_fn = summarize_fn
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+        # Configuration
+        self.token_threshold = 1500  # Unsummarized tokens before a pass is triggered
+        self.keep_recent_messages = 6  # Most recent turns always sent verbatim
+        self.max_summary_chars = 2000
+
+        logger.info("Zoe conversation summarizer initialized")
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Rough token estimate (about four characters per token for English text)"""
+        return len(text) // 4 + 1
+
+    def maybe_schedule(self, session_id: str) -> bool:
+        """
+        Schedule a background summarization pass if the session needs one
+
+        Returns:
+            bool: True if a new pass was scheduled
+        """
+        if session_id in self._tasks:
+            return False
+
+        pending = self.conversation_manager.get_unsummarized_messages(session_id)
+        if len(pending) <= self.keep_recent_messages:
+            return False
+
+        pending_tokens = sum(self.estimate_tokens(msg.content) for msg in pending)
+        if pending_tokens < self.token_threshold:
+            return False
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+
+        # A fresh context: the pass outlives the turn that scheduled it, so it
+        # must not run under that turn's load shedding admission or trace
+        task = contextvars.Context().run(loop.create_task, self._summarize_session(session_id))
+        self._tasks[session_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(session_id, None))
+        return True
+
+    async def _summarize_session(self, session_id: str):
+        """Fold all but the most recent turns of a session into its summary"""
+        session = self.conversation_manager.get_session(session_id)
+        if not session:
+            return
+
+        pending = self.conversation_manager.get_unsummarized_messages(session_id)
+        fold_count = len(pending) - self.keep_recent_messages
+        if fold_count <= 0:
+            return
+
+        turns = [{"role": msg.role, "content": msg.content} for msg in pending[:fold_count]]
+        summarized_count = session.total_messages - len(pending) + fold_count
+        previous_summary = session.summary
+
+        summary = None
+        if self.summarize_fn:
+            try:
+                summary = await self.summarize_fn(previous_summary, turns, session.user_id)
+            except Exception as e:
+                logger.warning(f"Model summarization failed for session {session_id}, using local summary: {str(e)}")
+
+        if not summary or not summary.strip():
+            summary = self.summarize_locally(previous_summary, turns, self.max_summary_chars)
+
+        self.conversation_manager.apply_summary(
+            session_id,
+            summary.strip()[-self.max_summary_chars:],
+            summarized_count
+        )
+        logger.info(f"Summarized {fold_count} messages for session {session_id}")
+
+    @staticmethod
+    def summarize_locally(
+        previous_summary: Optional[str],
+        turns: List[Dict[str, str]],
+        max_chars: int = 2000
+    ) -> str:
+        """Extractive stand-in summarizer that needs no model call; the local provider uses the same"""
+        return extractive_summary(previous_summary, turns, max_chars)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get summarizer status"""
+        return {
+            "pending_tasks": len(self._tasks),
+            "model_summarization": self.summarize_fn is not None,
+            "token_threshold": self.token_threshold,
+            "keep_recent_messages": self.keep_recent_messages
+        }
+
+    async def shutdown(self):
+        """Cancel any in-flight summarization passes"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
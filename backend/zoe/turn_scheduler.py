@@ -0,0 +1,172 @@
+"""
+Zoe Turn Scheduler
+
+Serializes conversation turns per session so concurrent submissions for the
+same session (double-submits, several open tabs) never interleave, while
+turns for different sessions still run fully in parallel.
+"""
+
+import asyncio
+import copy
+import logging
+import time
+from typing import Any, AsyncContextManager, Awaitable, Callable, Dict, Optional, Tuple
+
+from brain.metrics import registry
+from brain.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class _InflightTurn:
+    """A running turn and the number of callers waiting for it"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SessionTurnScheduler:
+    """
+    Per-session turn serialization for Zoe conversations
+
+    Features:
+    - One asyncio lock per active session, created on demand and dropped
+      as soon as no turn is running or queued for that session
+    - Optional coalescing: an identical message submitted for a session while
+      the same message is still in flight reuses the in-flight result instead
+      of triggering a second LLM call
+    - Optional admission (load shedding): taken once a turn holds its
+      session's lock, so time queued behind the session's earlier turns does
+      not count as turn latency, and never taken for coalesced duplicates
+    """
+
+    def __init__(
+        self,
+        coalesce_duplicates: bool = True,
+        admit: Optional[Callable[[], AsyncContextManager[Any]]] = None
+    ):
+        self.coalesce_duplicates = coalesce_duplicates
+        self.admit = admit
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+        self._inflight: Dict[Tuple[str, str], _InflightTurn] = {}
+
+        self.stats = {
+            "turns": 0,
+            "queued_turns": 0,
+            "coalesced_turns": 0
+        }
+        self.queue_wait_seconds = registry.histogram(
+            "thinkxlife_zoe_turn_queue_wait_seconds",
+            "Time session turns waited behind an earlier turn of the same session"
+        )
+        self.coalesced = registry.counter(
+            "thinkxlife_zoe_coalesced_turns_total",
+            "Duplicate turns answered from an in-flight turn"
+        )
+
+    async def run(
+        self,
+        session_id: Optional[str],
+        message: str,
+        turn: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Run a conversation turn, serialized with other turns of the same session
+
+        The turn runs in its own task, shared with any duplicates coalesced onto
+        it. A caller that is cancelled (a client disconnecting) stops waiting,
+        but the turn keeps running for the other callers; it is only cancelled
+        once no caller is left waiting for it.
+
+        Args:
+            session_id: Session the turn belongs to; turns without one start a
+                new session and need no serialization
+            message: User message, used to detect duplicate submissions
+            turn: Zero-argument coroutine function that processes the turn
+
+        Returns:
+            The turn's result
+        """
+        self.stats["turns"] += 1
+        if not session_id:
+            return await self._admitted(turn)
+
+        key = (session_id, message)
+        if self.coalesce_duplicates:
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                self.stats["coalesced_turns"] += 1
+                self.coalesced.inc()
+                logger.info(f"Coalesced duplicate message for session {session_id}")
+                return copy.copy(await self._wait(inflight))
+
+        inflight = _InflightTurn(asyncio.create_task(self._run_serialized(session_id, turn)))
+        if self.coalesce_duplicates:
+            self._inflight[key] = inflight
+        inflight.task.add_done_callback(lambda task: self._turn_done(key, inflight))
+        return await self._wait(inflight)
+
+    async def _wait(self, inflight: "_InflightTurn") -> Any:
+        """Wait for a shared turn; cancel it if the last waiter is cancelled"""
+        inflight.waiters += 1
+        try:
+            return await asyncio.shield(inflight.task)
+        finally:
+            inflight.waiters -= 1
+            if not inflight.waiters and not inflight.task.done():
+                inflight.task.cancel()
+
+    def _turn_done(self, key: Tuple[str, str], inflight: "_InflightTurn"):
+        if self._inflight.get(key) is inflight:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter had gone
+        if not inflight.task.cancelled():
+            inflight.task.exception()
+
+    async def _run_serialized(self, session_id: str, turn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run a turn once the session's earlier turns have finished"""
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        self._lock_users[session_id] = self._lock_users.get(session_id, 0) + 1
+
+        try:
+            if lock.locked():
+                self.stats["queued_turns"] += 1
+                queued_at = time.perf_counter()
+                with span("turn_queue"):
+                    await lock.acquire()
+                self.queue_wait_seconds.observe(time.perf_counter() - queued_at)
+            else:
+                await lock.acquire()
+            try:
+                return await self._admitted(turn)
+            finally:
+                lock.release()
+        finally:
+            remaining = self._lock_users[session_id] - 1
+            if remaining:
+                self._lock_users[session_id] = remaining
+            else:
+                del self._lock_users[session_id]
+                del self._locks[session_id]
+
+    async def _admitted(self, turn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run a turn under an admission, if the scheduler has one"""
+        if self.admit is None:
+            return await turn()
+        async with self.admit():
+            return await turn()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get scheduler status"""
+        return {
+            **self.stats,
+            "active_sessions": len(self._locks),
+            "inflight_turns": len(self._inflight),
+            "coalesce_duplicates": self.coalesce_duplicates
+        }
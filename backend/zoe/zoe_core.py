@@ -5,6 +5,7 @@ Zoe is ThinkxLife's empathetic AI companion designed with trauma-informed care p
 This module integrates with the ThinkxLife Brain system and manages conversation context.
 """
 
+import asyncio
 import logging
 import uuid
 from typing import Dict, Optional, Any, List
@@ -23,9 +24,15 @@ except ImportError as e:
     ThinkxLifeBrain = None
     ContextManager = None
 
+from brain.load_shedder import current_load_level
+from brain.tracing import span
+
 # Zoe imports
 from .personality import ZoePersonality
 from .conversation_manager import ZoeConversationManager
+from .summarizer import ConversationSummarizer
+from .turn_scheduler import SessionTurnScheduler
+from .session_snapshot import SessionSnapshot, claim_snapshot_path, write_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -43,7 +50,11 @@ class ZoeCore:
     Enhanced with full conversation management for contextual responses.
     """
     
-    def __init__(self, brain_instance: Optional[ThinkxLifeBrain] = None):
+    def __init__(
+        self,
+        brain_instance: Optional[ThinkxLifeBrain] = None,
+        coalesce_duplicate_turns: bool = True
+    ):
         self.brain = brain_instance
         self.personality = ZoePersonality()
         
@@ -57,6 +68,30 @@ class ZoeCore:
         
         self.conversation_manager = ZoeConversationManager(brain_context_manager)
         
+        # Turns for the same session run one at a time; optionally an identical
+        # message already in flight for the session is answered only once. The
+        # Brain's load shedding admits each turn once it is no longer queued
+        load_shedder = self.brain.load_shedder if self.brain else None
+        self.turn_scheduler = SessionTurnScheduler(
+            coalesce_duplicates=coalesce_duplicate_turns,
+            admit=load_shedder.admit if load_shedder is not None else None
+        )
+        
+        # Rolling summaries keep long conversations at a bounded prompt size
+        self.summarizer = ConversationSummarizer(
+            self.conversation_manager,
+            summarize_fn=self.brain.summarize_conversation if self.brain else None
+        )
+        
+        # Session snapshots for warm restarts
+        self.snapshot_path: Optional[str] = None
+        self.last_snapshot: Optional[Dict[str, Any]] = None
+        self._snapshot_task: Optional[asyncio.Task] = None
+        self._snapshot_slot = None  # Lock reserving snapshot_path among workers
+        # Snapshot writes run one at a time; the thread of the latest one
+        self._snapshot_write_lock = asyncio.Lock()
+        self._snapshot_write: Optional[asyncio.Future] = None
+        
         logger.info("Zoe AI Companion initialized with Brain integration and conversation management")
     
     async def process_message(
@@ -78,26 +113,55 @@ class ZoeCore:
             user_id: User identifier for session management
             
         Returns:
-            Dictionary containing Zoe's response and metadata
+            Dictionary containing Zoe's response and metadata; "load_level" is
+            the load shedding level the turn was admitted at
+        
+        Raises:
+            OverloadedError: When the Brain's load shedding rejects the turn
         """
+        async def turn():
+            # One admission covers the whole turn, including its Brain request
+            response = await self._process_turn(message, user_context, application, session_id, user_id)
+            response["load_level"] = current_load_level().name.lower()
+            return response
+        
+        return await self.turn_scheduler.run(session_id, message, turn)
+    
+    async def _process_turn(
+        self,
+        message: str,
+        user_context: Optional[Dict[str, Any]],
+        application: str,
+        session_id: Optional[str],
+        user_id: str
+    ) -> Dict[str, Any]:
+        """Process a single conversation turn; serialized per session by process_message"""
+        pinned_session_id = None
         try:
-            # Get or create conversation session
-            session_id, session = self.conversation_manager.get_or_create_session(
-                session_id=session_id,
-                user_id=user_id,
-                user_context=user_context
-            )
-            
-            # Add user message to conversation history
-            self.conversation_manager.add_message(
-                session_id=session_id,
-                role="user",
-                content=message,
-                metadata={"application": application}
-            )
+            with span("session"):
+                # Get or create conversation session
+                session_id, session = self.conversation_manager.get_or_create_session(
+                    session_id=session_id,
+                    user_id=user_id,
+                    user_context=user_context
+                )
+                
+                # Keep the session resident for the whole turn
+                self.conversation_manager.pin_session(session_id)
+                pinned_session_id = session_id
+                
+                # Add user message to conversation history
+                self.conversation_manager.add_message(
+                    session_id=session_id,
+                    role="user",
+                    content=message,
+                    metadata={"application": application}
+                )
             
             # Check if message needs redirection (off-topic or harmful)
-            if self.personality.is_off_topic_request(message):
+            with span("classify"):
+                off_topic = self.personality.is_off_topic_request(message)
+            if off_topic:
                 # Check if it's a harmful request for safety response
                 is_harmful = self.personality._is_harmful_request(message.lower())
                 redirect_response = self.personality.get_redirect_response(is_harmful=is_harmful)
@@ -113,6 +177,7 @@ class ZoeCore:
                         "application": application
                     }
                 )
+                self.summarizer.maybe_schedule(session_id)
                 
                 return {
                     "success": True,
@@ -124,11 +189,12 @@ class ZoeCore:
                 }
             
             # Get enhanced context with conversation history
-            enhanced_context = self._prepare_brain_context_with_history(
-                session_id=session_id,
-                user_context=user_context or {},
-                message=message
-            )
+            with span("context"):
+                enhanced_context = self._prepare_brain_context_with_history(
+                    session_id=session_id,
+                    user_context=user_context or {},
+                    message=message
+                )
             
             # Create Brain request with conversation context
             brain_request_data = {
@@ -137,6 +203,7 @@ class ZoeCore:
                 "application": application,
                 "user_context": enhanced_context,
                 "session_id": session_id,
+                "user_id": user_id,
                 "metadata": {
                     "source": "zoe",
                     "personality_mode": "empathetic_companion",
@@ -146,7 +213,8 @@ class ZoeCore:
             }
             
             # Process through Brain system
-            brain_response = await self.brain.process_request(brain_request_data)
+            with span("brain"):
+                brain_response = await self.brain.process_request(brain_request_data)
             
             if brain_response.get("success", False):
                 ai_response = brain_response.get("message", "")
@@ -163,17 +231,23 @@ class ZoeCore:
                 )
                 
                 # Apply Zoe's personality post-processing
-                final_response = self.personality.post_process_response(
-                    ai_response, 
-                    enhanced_context
-                )
+                with span("post_process"):
+                    final_response = self.personality.post_process_response(
+                        ai_response, 
+                        enhanced_context
+                    )
                 
                 # Update final response in conversation history
                 if final_response != ai_response:
                     # Update the last message with personality-processed response
-                    if session.messages and session.messages[-1].role == "assistant":
-                        session.messages[-1].content = final_response
-                        session.messages[-1].metadata["personality_processed"] = True
+                    self.conversation_manager.replace_last_assistant_message(
+                        session_id,
+                        final_response,
+                        {"personality_processed": True}
+                    )
+                
+                # Fold older turns into the rolling summary off the request path
+                self.summarizer.maybe_schedule(session_id)
                 
                 return {
                     "success": True,
@@ -225,6 +299,10 @@ class ZoeCore:
                 "error": str(e),
                 "timestamp": datetime.now().isoformat()
             }
+        
+        finally:
+            if pinned_session_id:
+                self.conversation_manager.unpin_session(pinned_session_id)
     
     def _prepare_brain_context_with_history(
         self,
@@ -243,18 +321,21 @@ class ZoeCore:
         Returns:
             Enhanced context dictionary with conversation history
         """
-        # Get conversation context from conversation manager
-        conversation_context = self.conversation_manager.get_context_for_ai(session_id)
+        # Get conversation context from conversation manager: a fresh per-turn dict
+        # over the session's cached context that shares the cached history window
+        enhanced_context = self.conversation_manager.get_context_for_ai(session_id)
         
-        # Merge with user context
-        enhanced_context = {
-            **user_context,
-            **conversation_context,
-            "current_message": message,
-            "zoe_personality_active": True,
-            "trauma_informed_mode": True,
-            "empathetic_responses": True
-        }
+        # Request context only fills keys the session does not already define
+        session = self.conversation_manager.get_session(session_id)
+        session_user_context = session.user_context if session else {}
+        for key, value in user_context.items():
+            if key not in session_user_context:
+                enhanced_context[key] = value
+        
+        enhanced_context["current_message"] = message
+        enhanced_context["zoe_personality_active"] = True
+        enhanced_context["trauma_informed_mode"] = True
+        enhanced_context["empathetic_responses"] = True
         
         # Add personality-specific context
         personality_context = self.personality.get_context_enhancements(enhanced_context)
@@ -270,9 +351,18 @@ class ZoeCore:
         """Get statistics for a conversation session"""
         return self.conversation_manager.get_session_stats(session_id)
     
-    def get_user_sessions(self, user_id: str) -> List[str]:
-        """Get all session IDs for a user"""
-        return self.conversation_manager.get_user_sessions(user_id)
+    def get_aggregate_stats(self) -> Dict[str, Any]:
+        """Get statistics across all sessions"""
+        return self.conversation_manager.get_aggregate_stats()
+    
+    def get_user_sessions(
+        self,
+        user_id: str,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> List[str]:
+        """Get session IDs for a user, most recent first"""
+        return self.conversation_manager.get_user_sessions(user_id, limit, offset)
     
     def end_session(self, session_id: str) -> bool:
         """End a conversation session"""
@@ -288,4 +378,104 @@ class ZoeCore:
     
     def update_user_context(self, session_id: str, context_updates: Dict[str, Any]) -> bool:
         """Update user context for a session"""
-        return self.conversation_manager.update_user_context(session_id, context_updates) 
\ No newline at end of file
+        return self.conversation_manager.update_user_context(session_id, context_updates)
+    
+    async def health_check(self) -> Dict[str, Any]:
+        """Get Zoe health status"""
+        return {
+            "status": "healthy" if self.brain else "degraded",
+            "brain_connected": self.brain is not None,
+            "users": len(self.conversation_manager.user_sessions),
+            "session_storage": self.conversation_manager.get_storage_stats(),
+            "turn_scheduler": self.turn_scheduler.get_status(),
+            "summarizer": self.summarizer.get_status(),
+            "last_snapshot": self.last_snapshot,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    def load_snapshot(self, path: str, worker_id: Optional[str] = None) -> int:
+        """
+        Restore sessions from a snapshot written by a previous run
+        
+        The snapshot is memory-mapped and only its index is read, so startup time
+        does not depend on how much conversation data it holds. Sessions are
+        decoded on first access. Workers sharing one configured path each get
+        their own file (see claim_snapshot_path); a single process uses `path`.
+        
+        Returns:
+            Number of sessions restored
+        """
+        self.snapshot_path, self._snapshot_slot = claim_snapshot_path(path, worker_id)
+        snapshot = SessionSnapshot.open(path)
+        if snapshot is None:
+            return 0
+        return self.conversation_manager.attach_snapshot(snapshot)
+    
+    async def save_snapshot(self, path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Write a snapshot of all sessions without blocking the event loop
+        
+        Sessions are collected on the event loop in small batches, then the file
+        is written from a worker thread. Writes never overlap: cancelling the
+        caller does not stop the thread, so the next write waits for it.
+        """
+        path = path or self.snapshot_path
+        if not path:
+            return None
+        
+        async with self._snapshot_write_lock:
+            await self._wait_for_snapshot_write()
+            records = []
+            for record in self.conversation_manager.iter_session_records():
+                records.append(record)
+                if len(records) % 200 == 0:
+                    await asyncio.sleep(0)
+            
+            self._snapshot_write = asyncio.ensure_future(asyncio.to_thread(write_snapshot, path, records))
+            self.last_snapshot = await asyncio.shield(self._snapshot_write)
+        return self.last_snapshot
+    
+    async def _wait_for_snapshot_write(self):
+        """Wait until the thread of the last snapshot write has finished"""
+        if self._snapshot_write is not None:
+            await asyncio.wait([self._snapshot_write])
+    
+    def start_periodic_snapshots(self, interval_seconds: float):
+        """Snapshot sessions in the background for crash recovery"""
+        if not self.snapshot_path or interval_seconds <= 0 or self._snapshot_task:
+            return
+        self._snapshot_task = asyncio.create_task(self._snapshot_loop(interval_seconds))
+    
+    async def _snapshot_loop(self, interval_seconds: float):
+        """Background loop behind start_periodic_snapshots"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.save_snapshot()
+            except Exception as e:
+                logger.error(f"Periodic session snapshot failed: {str(e)}")
+    
+    async def shutdown(self):
+        """Stop background conversation work and snapshot sessions"""
+        if self._snapshot_task:
+            self._snapshot_task.cancel()
+            await asyncio.gather(self._snapshot_task, return_exceptions=True)
+            self._snapshot_task = None
+        await self._wait_for_snapshot_write()
+        
+        await self.summarizer.shutdown()
+        
+        if self.snapshot_path:
+            try:
+                self.last_snapshot = write_snapshot(
+                    self.snapshot_path,
+                    self.conversation_manager.iter_session_records()
+                )
+            except Exception as e:
+                logger.error(f"Failed to write shutdown session snapshot: {str(e)}")
+        if self._snapshot_slot is not None:
+            self._snapshot_slot.close()
+            self._snapshot_slot = None
+        
+        self.conversation_manager.close()
+        logger.info("Zoe AI Companion shutdown complete") 
\ No newline at end of file